@@ -3,7 +3,10 @@ Configuration de l'administration pour les utilisateurs.
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+
+from litrevu.changelists import EstimatedCountPaginator
+
+from .models import User, username_prefix_filter
 
 
 @admin.register(User)
@@ -12,3 +15,19 @@ class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'is_staff', 'date_joined')
     list_filter = ('is_staff', 'is_superuser', 'is_active')
     search_fields = ('username', 'email')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # L'autocomplétion des filtres et des formulaires des autres modèles
+        # cherche les noms par préfixe dans l'index des noms sans casse ; la
+        # liste des utilisateurs garde la recherche par nom et adresse
+        match = request.resolver_match
+        if match is None or match.url_name != 'autocomplete':
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(**username_prefix_filter(search_term)), False
@@ -0,0 +1,43 @@
+"""
+Backend d'authentification qui garde en cache l'utilisateur connecté.
+
+AuthenticationMiddleware relit l'utilisateur de la session à chaque
+requête. CachedModelBackend le conserve AUTH_USER_CACHE_TIMEOUT secondes
+dans le cache : les pages suivantes n'interrogent plus la table des
+utilisateurs. L'entrée est supprimée dès qu'une écriture sur l'utilisateur
+est validée (save(), dont le changement de mot de passe, suppression,
+compteurs) : un changement de mot de passe déconnecte donc aussitôt les
+autres sessions, comme avec ModelBackend.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+# Durée de vie par défaut d'un utilisateur en cache, en secondes
+AUTH_USER_CACHE_TIMEOUT = 60
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def forget_user(user_id):
+    """Retire l'utilisateur user_id du cache."""
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend dont get_user() passe par le cache."""
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, getattr(
+                settings, 'AUTH_USER_CACHE_TIMEOUT', AUTH_USER_CACHE_TIMEOUT
+            ))
+        return user if self.user_can_authenticate(user) else None
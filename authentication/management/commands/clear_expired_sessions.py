@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authentication.sessions import (
+    SESSION_CLEANUP_BATCH_SIZE, clear_expired_sessions,
+    schedule_session_cleanup,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les sessions expirées par paquets, ou programme leur "
+        "nettoyage quotidien par le worker (--schedule)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=SESSION_CLEANUP_BATCH_SIZE,
+            help="Sessions supprimées par transaction."
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help="Attente (secondes) entre deux paquets."
+        )
+        parser.add_argument(
+            '--schedule', action='store_true',
+            help="Programmer la tâche périodique au lieu de nettoyer "
+                 "maintenant."
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            job = schedule_session_cleanup()
+            self.stdout.write(self.style.SUCCESS(
+                f"Nettoyage programmé (tâche #{job.id}), puis toutes les "
+                "24 h par run_worker."
+            ))
+            return
+
+        start = time.perf_counter()
+        deleted = clear_expired_sessions(
+            options['batch_size'], options['pause']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} sessions expirées supprimées en "
+            f"{time.perf_counter() - start:.2f} s."
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_photo_variants_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_user_profile_photo_variants_ready'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Abonnés'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Abonnements'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Critiques'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='tickets_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Billets'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+def fold_usernames(apps, schema_editor):
+    """Remplit username_folded pour les utilisateurs existants."""
+    User = apps.get_model('authentication', 'User')
+    batch = []
+    for user in User.objects.only('id', 'username').iterator(chunk_size=2000):
+        user.username_folded = user.username.casefold()
+        batch.append(user)
+        if len(batch) >= 2000:
+            User.objects.bulk_update(batch, ['username_folded'])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ['username_folded'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('authentication', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='username_folded',
+            field=models.CharField(default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(fold_usernames, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['username_folded'], name='user_username_folded_idx'),
+        ),
+    ]
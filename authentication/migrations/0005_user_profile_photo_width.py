@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_username_folded'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_photo_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -4,22 +4,137 @@ Modèle utilisateur personnalisé pour l'application LITRevu.
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from jobs.queue import enqueue_on_commit
+from litrevu.images import delete_variants_on_commit, has_new_upload
+
+
+# Plus grand caractère Unicode : borne haute des noms commençant par un
+# préfixe donné
+_MAX_CHAR = '\U0010ffff'
+
+
+def fold_username(username):
+    """Forme sans casse d'un nom d'utilisateur, pour la recherche."""
+    return username.casefold()
+
+
+def username_prefix_filter(prefix):
+    """
+    Conditions de filter() retenant les noms qui commencent par prefix,
+    sans tenir compte de la casse : l'intervalle [préfixe, préfixe +
+    U+10FFFF) est parcouru dans l'ordre de l'index user_username_folded_idx.
+    """
+    folded = fold_username(prefix)
+    return {
+        'username_folded__gte': folded,
+        'username_folded__lt': folded + _MAX_CHAR,
+    }
+
 
 class User(AbstractUser):
     """
     Modèle utilisateur personnalisé étendant AbstractUser.
     Permet d'ajouter des champs supplémentaires si nécessaire.
     """
+    # Nom d'utilisateur sans casse, indexé pour la recherche par préfixe
+    username_folded = models.CharField(
+        max_length=150,
+        default='',
+        editable=False
+    )
     profile_photo = models.ImageField(
         upload_to='profile_photos/',
         blank=True,
         null=True,
         verbose_name="Photo de profil"
     )
+    profile_photo_variants_ready = models.BooleanField(
+        default=False,
+        editable=False
+    )
+    # Largeur de la photo d'origine, relevée avec ses variantes
+    profile_photo_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False
+    )
+    # Compteurs dénormalisés, tenus à jour par reviews.counters
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Abonnés"
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Abonnements"
+    )
+    tickets_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Billets"
+    )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Critiques"
+    )
+
+    COUNTER_FIELDS = (
+        'followers_count', 'following_count', 'tickets_count',
+        'reviews_count',
+    )
 
     class Meta:
         verbose_name = "Utilisateur"
         verbose_name_plural = "Utilisateurs"
+        indexes = [
+            models.Index(
+                fields=['username_folded'],
+                name='user_username_folded_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Photo enregistrée, dont les variantes suivent un remplacement
+        instance._saved_photo = instance.__dict__.get('profile_photo')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.username_folded = fold_username(self.username)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'username' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'username_folded'}
+        # Les compteurs ne sont modifiés que par reviews.counters : ne pas
+        # écraser une valeur changée depuis le chargement de l'utilisateur
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        # Une nouvelle photo n'a pas encore de variantes redimensionnées
+        new_photo = has_new_upload(self.profile_photo)
+        if new_photo or not self.profile_photo:
+            self.profile_photo_variants_ready = False
+            self.profile_photo_width = None
+        super().save(*args, **kwargs)
+        # Les variantes d'une photo remplacée ou effacée sont supprimées
+        previous = getattr(self, '_saved_photo', None)
+        if previous and previous != self.profile_photo.name:
+            delete_variants_on_commit(self.profile_photo.storage, previous)
+        self._saved_photo = self.profile_photo.name
+        if new_photo:
+            # Le redimensionnement est fait par un worker, hors de la requête
+            enqueue_on_commit(
+                'authentication.profile_photo_variants',
+                {'user_id': self.id, 'name': self.profile_photo.name},
+                idempotency_key=(
+                    f'profile_photo:{self.id}:{self.profile_photo.name}'
+                ),
+            )
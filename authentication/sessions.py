@@ -0,0 +1,55 @@
+"""
+Nettoyage des sessions expirées.
+
+clearsessions supprime toutes les sessions expirées en un seul DELETE, qui
+bloque les écritures de la base SQLite le temps de parcourir la table.
+clear_expired_sessions() les supprime par paquets de clés, chacun dans sa
+propre courte transaction. La tâche authentication.clear_expired_sessions
+le fait périodiquement et se reprogramme elle-même.
+"""
+import time
+
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+from jobs.queue import enqueue
+
+
+SESSION_CLEANUP_BATCH_SIZE = 500
+# Intervalle entre deux nettoyages programmés, en secondes
+SESSION_CLEANUP_INTERVAL = 24 * 60 * 60
+
+
+def clear_expired_sessions(batch_size=SESSION_CLEANUP_BATCH_SIZE, pause=0):
+    """
+    Supprime les sessions expirées par paquets de batch_size, avec une
+    pause (secondes) entre deux paquets. Retourne le nombre supprimé.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        keys = list(Session.objects.filter(
+            expire_date__lt=now
+        ).values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+        if len(keys) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+def schedule_session_cleanup(delay=0):
+    """
+    Programme le prochain nettoyage dans delay secondes. La clé
+    d'idempotence (la période visée) évite les doublons quand plusieurs
+    processus le programment.
+    """
+    run_at = timezone.now().timestamp() + delay
+    period = int(run_at // SESSION_CLEANUP_INTERVAL)
+    return enqueue(
+        'authentication.clear_expired_sessions',
+        idempotency_key=f'clear_expired_sessions:{period}',
+        delay=delay,
+    )
@@ -0,0 +1,39 @@
+"""
+Signaux invalidant l'utilisateur gardé en cache par CachedModelBackend et
+supprimant les variantes de la photo d'un utilisateur supprimé.
+"""
+from functools import partial
+
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from litrevu.images import delete_variants_on_commit
+
+from .backends import forget_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Oublier l'utilisateur une fois l'écriture validée : une requête
+    concurrente ne peut plus remettre en cache l'ancienne version.
+    """
+    transaction.on_commit(partial(forget_user, instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """Supprimer les variantes de la photo de profil."""
+    delete_variants_on_commit(
+        instance.profile_photo.storage, instance.profile_photo.name
+    )
+
+
+@receiver(user_logged_in)
+def user_logged_in_forget(sender, user, **kwargs):
+    """Une nouvelle connexion repart de l'utilisateur lu en base."""
+    forget_user(user.pk)
@@ -0,0 +1,35 @@
+"""
+Tâches d'arrière-plan de l'application authentication.
+"""
+from django.conf import settings
+
+from jobs.queue import task
+from litrevu.images import process_upload
+
+from .models import User
+from .sessions import (
+    SESSION_CLEANUP_INTERVAL, clear_expired_sessions,
+    schedule_session_cleanup,
+)
+
+
+@task('authentication.profile_photo_variants')
+def profile_photo_variants(user_id, name):
+    """Génère les variantes de la photo de profil d'un utilisateur."""
+    user = User.objects.filter(id=user_id).first()
+    # L'utilisateur a pu être supprimé ou sa photo remplacée entre-temps
+    if user is None or user.profile_photo.name != name:
+        return
+    process_upload(
+        user, 'profile_photo', 'profile_photo_variants_ready',
+        'profile_photo_width'
+    )
+
+
+@task('authentication.clear_expired_sessions')
+def clear_expired_sessions_task():
+    """Supprime les sessions expirées puis programme le nettoyage suivant."""
+    clear_expired_sessions()
+    # Sans worker, la tâche suivante s'exécuterait aussitôt, sans fin
+    if not getattr(settings, 'JOBS_RUN_INLINE', False):
+        schedule_session_cleanup(delay=SESSION_CLEANUP_INTERVAL)
@@ -1,3 +1,117 @@
+"""
+Tests des sessions et de l'utilisateur connecté gardé en cache.
+"""
+import runpy
+from datetime import timedelta
+from unittest import mock
 
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from .sessions import clear_expired_sessions
+
+
+User = get_user_model()
+
+
+class CachedUserTests(TestCase):
+    """Session et utilisateur lus dans le cache, invalidés à l'écriture."""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice', password='alice123')
+        self.bob = User.objects.create_user('bob')
+        self.client.force_login(self.alice)
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [
+            query['sql'] for query in queries
+            if 'django_session' in query['sql']
+            or 'authentication_user"."password' in query['sql']
+        ]
+
+    def test_pages_skip_session_and_user_queries(self):
+        self.client.get(reverse('feed'))
+        response, queries = self.auth_queries(reverse('feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_counters_and_password_change_invalidate_cache(self):
+        self.client.get(reverse('follows'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('follows'), {'username': 'bob'})
+        response, queries = self.auth_queries(reverse('follows'))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['user'].following_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.set_password('nouveau123')
+            self.alice.save()
+        # L'ancienne session ne correspond plus au mot de passe
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_expired_sessions_are_deleted_in_batches(self):
+        past = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create([
+            Session(session_key=f'expired{i}', session_data='',
+                    expire_date=past)
+            for i in range(5)
+        ])
+        valid = Session.objects.count() - 5
+        self.assertEqual(clear_expired_sessions(batch_size=2), 5)
+        self.assertEqual(Session.objects.count(), valid)
+
+
+class UserAdminSearchTests(TestCase):
+    """Recherche des utilisateurs dans l'administration."""
+
+    def test_changelist_searches_email_and_autocomplete_prefix(self):
+        admin = User.objects.create_superuser('admin', password='x')
+        User.objects.create_user('bob', email='robert@example.com')
+        User.objects.create_user('rob')
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse('admin:authentication_user_changelist'),
+            {'q': 'robert@'}
+        )
+        self.assertEqual(
+            [user.username for user in response.context['cl'].result_list],
+            ['bob']
+        )
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'reviews', 'model_name': 'ticket',
+            'field_name': 'user', 'term': 'Ro',
+        })
+        self.assertEqual(
+            [user['text'] for user in response.json()['results']], ['rob']
+        )
+
+
+class ProductionCacheTests(TestCase):
+    """La production exige un cache partagé entre les processus."""
+
+    def settings_prod(self, **environ):
+        with mock.patch.dict('os.environ', environ, clear=True):
+            return runpy.run_module('litrevu.settings_prod')
+
+    def test_production_requires_shared_cache(self):
+        with self.assertRaises(RuntimeError):
+            self.settings_prod(DJANGO_SECRET_KEY='secret')
+        settings = self.settings_prod(
+            DJANGO_SECRET_KEY='secret',
+            DJANGO_REDIS_URL='redis://127.0.0.1:6379/0',
+        )
+        self.assertEqual(
+            settings['CACHES']['default']['BACKEND'],
+            'django.core.cache.backends.redis.RedisCache'
+        )
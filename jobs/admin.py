@@ -0,0 +1,16 @@
+"""
+Configuration de l'administration pour les tâches d'arrière-plan.
+"""
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Administration pour le modèle Job."""
+    list_display = (
+        'name', 'status', 'attempts', 'run_at', 'created_at', 'finished_at'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'idempotency_key')
+    readonly_fields = ('started_at', 'finished_at', 'last_error')
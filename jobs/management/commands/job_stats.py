@@ -0,0 +1,51 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche, par tâche, l'attente en file et la durée de traitement "
+        "des tâches terminées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--last',
+            type=int,
+            default=1000,
+            help="Nombre de tâches terminées analysées par nom."
+        )
+
+    def handle(self, *args, **options):
+        names = Job.objects.values_list('name', flat=True).distinct()
+        for name in names.order_by('name'):
+            finished = Job.objects.filter(
+                name=name, status=Job.DONE
+            ).order_by('-finished_at').values_list(
+                'created_at', 'started_at', 'finished_at'
+            )[:options['last']]
+            waits, runs = [], []
+            for created_at, started_at, finished_at in finished:
+                waits.append((started_at - created_at).total_seconds() * 1000)
+                runs.append((finished_at - started_at).total_seconds() * 1000)
+            counts = {
+                status: Job.objects.filter(name=name, status=status).count()
+                for status, _ in Job.STATUS_CHOICES
+            }
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write("  " + ", ".join(
+                f"{status}: {count}" for status, count in counts.items()
+            ))
+            if runs:
+                self.stdout.write(
+                    f"  attente en file : médiane "
+                    f"{statistics.median(waits):.1f} ms"
+                    f", max {max(waits):.1f} ms"
+                )
+                self.stdout.write(
+                    f"  traitement : médiane {statistics.median(runs):.1f} ms"
+                    f", max {max(runs):.1f} ms"
+                )
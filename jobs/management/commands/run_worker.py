@@ -0,0 +1,77 @@
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute les tâches d'arrière-plan en attente avec un pool de "
+        "threads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help="Nombre de tâches exécutées en parallèle."
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help="Attente (secondes) quand la file est vide."
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Vider la file puis s'arrêter."
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        threads = options['threads']
+        running = set()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            while not self.stopping:
+                running = {future for future in running if not future.done()}
+                free = threads - len(running)
+                jobs = queue.claim(free) if free else []
+                for job in jobs:
+                    running.add(pool.submit(self.run_job, job))
+                if not jobs:
+                    if options['once'] and not running:
+                        break
+                    time.sleep(options['poll_interval'])
+
+    def run_job(self, job):
+        close_old_connections()
+        start = time.perf_counter()
+        try:
+            ok = queue.run(job)
+        except Exception as exc:
+            # Erreur d'enregistrement du résultat : la tâche sera reprise
+            # à l'expiration de sa réservation
+            self.stderr.write(f"{job.name} #{job.id} : {exc!r}")
+            return
+        finally:
+            # Chaque thread a sa propre connexion : la fermer après la tâche
+            connections.close_all()
+        status = "terminée" if ok else "en échec"
+        self.stdout.write(
+            f"{job.name} #{job.id} {status} en "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms "
+            f"(tentative {job.attempts})"
+        )
+
+    def stop(self, signum, frame):
+        self.stdout.write("Arrêt après les tâches en cours...")
+        self.stopping = True
@@ -0,0 +1,175 @@
+"""
+File de tâches d'arrière-plan stockée en base de données.
+
+Les vues appellent enqueue() (ou enqueue_on_commit()) et répondent tout de
+suite ; la commande run_worker réserve puis exécute les tâches, avec
+nouvelles tentatives et attente exponentielle en cas d'erreur.
+
+Avec JOBS_RUN_INLINE, enqueue() réserve et exécute aussitôt la tâche qu'il
+vient de créer, par le même chemin que le worker (run()) : clé
+d'idempotence, erreurs enregistrées et nouvelle tentative programmée
+identiques.
+"""
+import threading
+import time
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+# Une tâche « en cours » depuis plus longtemps est considérée abandonnée
+LEASE_SECONDS = 600
+
+_tasks = {}
+
+_submit_lock = threading.Lock()
+_submit_stats = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+
+
+def task(name):
+    """Décorateur enregistrant une fonction comme tâche nommée."""
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+def get_task(name):
+    """Retourne la fonction enregistrée sous ce nom."""
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise LookupError(f"Tâche inconnue : {name}")
+
+
+def _record_submit(elapsed_ms):
+    with _submit_lock:
+        _submit_stats['count'] += 1
+        _submit_stats['total_ms'] += elapsed_ms
+        _submit_stats['max_ms'] = max(_submit_stats['max_ms'], elapsed_ms)
+
+
+def submit_stats():
+    """Latence de soumission mesurée dans ce processus."""
+    with _submit_lock:
+        stats = dict(_submit_stats)
+    stats['avg_ms'] = (
+        stats['total_ms'] / stats['count'] if stats['count'] else 0.0
+    )
+    return stats
+
+
+def enqueue(name, payload=None, idempotency_key=None, delay=0,
+            max_attempts=5):
+    """
+    Ajoute une tâche à la file et retourne le Job correspondant.
+    Si une tâche porte déjà la même clé d'idempotence, elle est renvoyée
+    sans en créer de nouvelle.
+    """
+    start = time.perf_counter()
+    get_task(name)
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                name=name,
+                payload=payload or {},
+                idempotency_key=idempotency_key,
+                max_attempts=max_attempts,
+                run_at=timezone.now() + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=idempotency_key)
+    _record_submit((time.perf_counter() - start) * 1000)
+
+    if getattr(settings, 'JOBS_RUN_INLINE', False):
+        # Sans worker, le délai éventuel n'est pas attendu
+        if _reserve(job.id, Job.PENDING, None, timezone.now()):
+            job.refresh_from_db()
+            run(job)
+            job.refresh_from_db()
+    return job
+
+
+def enqueue_on_commit(name, payload=None, **kwargs):
+    """Ajoute la tâche une fois la transaction courante validée."""
+    transaction.on_commit(partial(enqueue, name, payload, **kwargs))
+
+
+def claim(limit):
+    """
+    Réserve jusqu'à limit tâches prêtes et les retourne.
+    La réservation est une mise à jour conditionnelle : deux workers ne
+    peuvent pas obtenir la même tâche.
+    """
+    now = timezone.now()
+    ready = Q(status=Job.PENDING, run_at__lte=now) | Q(
+        status=Job.RUNNING,
+        started_at__lt=now - timedelta(seconds=LEASE_SECONDS)
+    )
+    candidates = Job.objects.filter(ready).order_by('run_at').values_list(
+        'id', 'status', 'started_at'
+    )[:limit]
+
+    claimed = [
+        job_id for job_id, status, started_at in candidates
+        if _reserve(job_id, status, started_at, now)
+    ]
+    return list(Job.objects.filter(id__in=claimed))
+
+
+def _reserve(job_id, status, started_at, now):
+    """Passe la tâche en cours si elle n'a pas changé depuis sa lecture."""
+    return Job.objects.filter(
+        id=job_id, status=status, started_at=started_at
+    ).update(
+        status=Job.RUNNING,
+        started_at=now,
+        attempts=F('attempts') + 1,
+    )
+
+
+def backoff(attempts):
+    """Délai avant la tentative suivante, doublé à chaque échec."""
+    return min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+
+
+def _execute(job):
+    get_task(job.name)(**job.payload)
+
+
+def run(job):
+    """Exécute une tâche réservée et enregistre son résultat."""
+    try:
+        _execute(job)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            Job.objects.filter(id=job.id).update(
+                status=Job.PENDING,
+                run_at=timezone.now() + timedelta(
+                    seconds=backoff(job.attempts)
+                ),
+                last_error=error,
+            )
+        else:
+            Job.objects.filter(id=job.id).update(
+                status=Job.FAILED,
+                finished_at=timezone.now(),
+                last_error=error,
+            )
+        return False
+
+    Job.objects.filter(id=job.id).update(
+        status=Job.DONE,
+        finished_at=timezone.now(),
+    )
+    return True
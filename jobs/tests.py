@@ -0,0 +1,120 @@
+"""
+Tests de la file de tâches : nouvelles tentatives, échec définitif,
+idempotence, reprise des réservations expirées et exécution sans worker.
+"""
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+
+calls = []
+
+
+@queue.task('jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@queue.task('jobs.tests.fail')
+def fail(message):
+    calls.append(message)
+    raise RuntimeError(message)
+
+
+class QueueTests(TestCase):
+    """File de tâches exécutée par run_worker (claim puis run)."""
+
+    def setUp(self):
+        calls.clear()
+
+    def claim_one(self):
+        jobs = queue.claim(10)
+        self.assertEqual(len(jobs), 1)
+        return jobs[0]
+
+    def make_ready(self, job):
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+    def test_success(self):
+        queue.enqueue('jobs.tests.record', {'value': 1})
+        self.assertTrue(queue.run(self.claim_one()))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(calls, [1])
+
+    def test_retry_with_backoff_then_dead_letter(self):
+        queue.enqueue('jobs.tests.fail', {'message': 'panne'}, max_attempts=2)
+        before = timezone.now()
+        self.assertFalse(queue.run(self.claim_one()))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('RuntimeError: panne', job.last_error)
+        self.assertGreaterEqual(
+            job.run_at, before + timedelta(seconds=queue.backoff(1))
+        )
+        # Pas encore l'heure de la nouvelle tentative
+        self.assertEqual(queue.claim(10), [])
+
+        self.make_ready(job)
+        self.assertFalse(queue.run(self.claim_one()))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+        self.make_ready(job)
+        self.assertEqual(queue.claim(10), [])
+        self.assertEqual(calls, ['panne', 'panne'])
+
+    def test_backoff_doubles_up_to_max(self):
+        self.assertEqual(
+            [queue.backoff(attempts) for attempts in (1, 2, 3)],
+            [queue.BACKOFF_BASE_SECONDS * factor for factor in (1, 2, 4)]
+        )
+        self.assertEqual(queue.backoff(50), queue.BACKOFF_MAX_SECONDS)
+
+    def test_idempotency_key(self):
+        first = queue.enqueue('jobs.tests.record', {'value': 1}, 'clé')
+        second = queue.enqueue('jobs.tests.record', {'value': 2}, 'clé')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_claim_recovers_expired_lease(self):
+        stale = queue.enqueue('jobs.tests.record', {'value': 1})
+        fresh = queue.enqueue('jobs.tests.record', {'value': 2})
+        self.assertEqual(len(queue.claim(10)), 2)
+        Job.objects.filter(pk=stale.pk).update(
+            started_at=timezone.now() - timedelta(
+                seconds=queue.LEASE_SECONDS + 1
+            )
+        )
+        job = self.claim_one()
+        self.assertEqual((job.pk, job.attempts), (stale.pk, 2))
+        self.assertEqual(
+            Job.objects.get(pk=fresh.pk).status, Job.RUNNING
+        )
+        # Une réservation n'est obtenue qu'une fois
+        self.assertEqual(queue.claim(10), [])
+
+
+@override_settings(JOBS_RUN_INLINE=True)
+class InlineQueueTests(TestCase):
+    """Sans worker, enqueue() passe par le même chemin que run_worker."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_inline_runs_once_per_key(self):
+        job = queue.enqueue('jobs.tests.record', {'value': 1}, 'clé')
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+        queue.enqueue('jobs.tests.record', {'value': 2}, 'clé')
+        self.assertEqual(calls, [1])
+
+    def test_inline_failure_is_recorded(self):
+        job = queue.enqueue('jobs.tests.fail', {'message': 'panne'})
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('RuntimeError: panne', job.last_error)
+        self.assertEqual(calls, ['panne'])
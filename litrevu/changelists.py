@@ -0,0 +1,105 @@
+"""
+Listes de l'administration adaptées aux tables de plusieurs millions de
+lignes.
+
+- EstimatedCountPaginator compte exactement jusqu'à ADMIN_COUNT_LIMIT
+  lignes, puis se contente d'une estimation : aucune page n'exécute de
+  COUNT(*) sur toute la table.
+- AutocompleteFilter filtre sur une clé étrangère avec le champ
+  d'autocomplétion de l'administration, au lieu d'afficher tous les
+  utilisateurs dans la barre latérale.
+- LargeTableAdmin réunit ces réglages, sans décompte total des résultats
+  (show_full_result_count = False).
+"""
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.utils import get_last_value_from_parameters
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+
+# Au-delà, le nombre de lignes est estimé
+ADMIN_COUNT_LIMIT = 100_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginateur dont le décompte s'arrête à ADMIN_COUNT_LIMIT lignes.
+
+    Au-delà, une liste sans filtre prend pour estimation la plus grande
+    clé primaire, lue dans l'index (les lignes supprimées y sont
+    comptées) ; une liste filtrée est bornée à ADMIN_COUNT_LIMIT.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        count = queryset[:ADMIN_COUNT_LIMIT + 1].count()
+        if count <= ADMIN_COUNT_LIMIT:
+            return count
+        if not queryset.query.where:
+            estimate = queryset.model._default_manager.aggregate(
+                last=Max('pk')
+            )['last']
+            return max(estimate or 0, ADMIN_COUNT_LIMIT)
+        return ADMIN_COUNT_LIMIT
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Filtre sur une clé étrangère choisie avec l'autocomplétion de
+    l'administration : seul l'objet sélectionné est lu en base. Le modèle
+    visé doit être enregistré dans l'administration avec search_fields.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = get_last_value_from_parameters(
+            params, self.lookup_kwarg
+        )
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        self.choice_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            required=False,
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+        )
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is not None,
+            # Liste sans ce filtre, à laquelle le script ajoute la valeur
+            'query_string': changelist.get_query_string(
+                remove=[self.lookup_kwarg, PAGE_VAR]
+            ),
+            'parameter': self.lookup_kwarg,
+            'widget': self.choice_field.widget.render(
+                self.lookup_kwarg, self.lookup_val
+            ),
+        }
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin dont la liste reste rapide sur une très grande table."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=['js/admin_filters.js'])
+        )
@@ -0,0 +1,142 @@
+"""
+Variantes redimensionnées des images envoyées par les utilisateurs.
+
+À l'envoi, chaque image (couverture de billet, photo de profil) est
+convertie en quelques largeurs fixes au format WebP, stockées à côté de
+l'original, sans jamais l'agrandir : une image étroite n'a que les
+variantes utiles, et srcset annonce leur largeur réelle. Les variantes
+sont supprimées avec l'image qu'elles accompagnent (remplacée, effacée ou
+objet supprimé).
+"""
+import io
+import logging
+import os
+from functools import partial
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+
+VARIANT_WIDTHS = (160, 320, 640)
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = 'webp'
+VARIANT_QUALITY = 80
+
+
+def variant_name(name, width):
+    """Nom de stockage de la variante de largeur width d'une image."""
+    root, _ = os.path.splitext(name)
+    return f"{root}_{width}w.{VARIANT_EXTENSION}"
+
+
+def variant_widths(original_width=None):
+    """
+    Couples (largeur du nom, largeur réelle) des variantes d'une image de
+    largeur original_width : les largeurs fixes plus étroites, puis une
+    dernière à la taille de l'original. Toutes si la largeur est inconnue.
+    """
+    widths = []
+    for width in VARIANT_WIDTHS:
+        if original_width and width >= original_width:
+            widths.append((width, original_width))
+            break
+        widths.append((width, width))
+    return widths
+
+
+def has_new_upload(fieldfile):
+    """Indique si le champ contient un fichier envoyé pas encore stocké."""
+    return bool(fieldfile) and not fieldfile._committed
+
+
+def process_upload(instance, field_name, flag_name, width_name):
+    """
+    Génère les variantes de l'image field_name d'une instance enregistrée,
+    enregistre sa largeur dans width_name et marque flag_name comme vrai si
+    tout s'est bien passé.
+    """
+    fieldfile = getattr(instance, field_name)
+    try:
+        width = build_variants(fieldfile)
+    except (OSError, Image.DecompressionBombError):
+        logger.exception("Variantes impossibles pour %s", fieldfile.name)
+        return False
+    setattr(instance, flag_name, True)
+    setattr(instance, width_name, width)
+    type(instance)._default_manager.filter(pk=instance.pk).update(
+        **{flag_name: True, width_name: width}
+    )
+    return True
+
+
+def build_variants(fieldfile):
+    """
+    Génère les variantes d'une image déjà enregistrée et retourne la
+    largeur de l'original. Les variantes existantes sont remplacées.
+    """
+    storage = fieldfile.storage
+    with storage.open(fieldfile.name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    # Variantes d'une image remplacée sous le même nom, devenues inutiles
+    delete_variants(storage, fieldfile.name)
+    for width, actual_width in variant_widths(image.width):
+        variant = image.copy()
+        # Seule la largeur est contrainte ; jamais d'agrandissement
+        variant.thumbnail(
+            (actual_width, image.height), Image.Resampling.LANCZOS
+        )
+        buffer = io.BytesIO()
+        variant.save(
+            buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4
+        )
+        storage.save(
+            variant_name(fieldfile.name, width),
+            ContentFile(buffer.getvalue())
+        )
+    return image.width
+
+
+def delete_variants(storage, name):
+    """Supprime les variantes de l'image stockée sous name."""
+    for width in VARIANT_WIDTHS:
+        variant = variant_name(name, width)
+        if storage.exists(variant):
+            storage.delete(variant)
+
+
+def delete_variants_on_commit(storage, name):
+    """
+    Supprime les variantes de name une fois la transaction validée : une
+    annulation laisse l'image et ses variantes en place.
+    """
+    if name:
+        transaction.on_commit(partial(delete_variants, storage, name))
+
+
+def srcset(fieldfile, original_width=None):
+    """
+    Valeur de l'attribut srcset listant les variantes d'une image, avec
+    leur largeur réelle si la largeur de l'original est connue.
+    """
+    storage = fieldfile.storage
+    return ", ".join(
+        f"{storage.url(variant_name(fieldfile.name, width))} {actual}w"
+        for width, actual in variant_widths(original_width)
+    )
+
+
+def smallest_variant_url(fieldfile):
+    """URL de la plus petite variante, utilisée comme src par défaut."""
+    return fieldfile.storage.url(
+        variant_name(fieldfile.name, VARIANT_WIDTHS[0])
+    )
@@ -0,0 +1,182 @@
+"""
+Service des fichiers envoyés par les utilisateurs (MEDIA_ROOT).
+
+La vue vérifie le fichier demandé puis, selon MEDIA_SENDFILE_HEADER :
+- confie le transfert au serveur frontal par un en-tête X-Accel-Redirect
+  (nginx) ou X-Sendfile (Apache, lighttpd) : le worker Python ne lit pas
+  le fichier ;
+- ou envoie le fichier elle-même avec une FileResponse, transmise au
+  serveur WSGI par wsgi.file_wrapper (sendfile sous gunicorn), en gérant
+  ETag, If-None-Match et les requêtes Range.
+
+Le fichier n'est jamais chargé entier en mémoire. Django donne un nom
+unique à chaque fichier envoyé : une image remplacée change d'URL, d'où
+un cache navigateur de longue durée.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+
+# Un an : les noms de fichiers ne sont jamais réutilisés
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+# Taille des lectures quand le serveur WSGI n'a pas de sendfile
+MEDIA_BLOCK_SIZE = 64 * 1024
+
+SENDFILE_HEADERS = ('X-Accel-Redirect', 'X-Sendfile')
+
+
+def parse_range(header, size):
+    """
+    Lit un en-tête Range d'un seul intervalle (« bytes=début-fin »,
+    « bytes=début- » ou « bytes=-longueur »). Retourne (début, fin inclus),
+    None pour envoyer le fichier entier (en-tête absent, invalide ou à
+    plusieurs intervalles), ou () si l'intervalle est hors du fichier.
+    """
+    unit, _, ranges = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        return None
+    first, dash, last = ranges.strip().partition('-')
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffixe : les derniers octets du fichier
+            length = int(last)
+            start, end = max(size - length, 0), size - 1
+            if length == 0:
+                return ()
+    except ValueError:
+        return None
+    if start >= size:
+        return ()
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class _FileRange:
+    """
+    Partie d'un fichier ouvert, lue depuis la position courante jusqu'à
+    length octets. fileno() permet encore au serveur WSGI d'utiliser
+    sendfile, limité par Content-Length.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _media_path(path):
+    """Chemin absolu du fichier demandé, ou Http404."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Fichier introuvable.") from None
+    if not os.path.isfile(full_path):
+        raise Http404("Fichier introuvable.")
+    return full_path
+
+
+def _content_type(full_path):
+    return mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+
+def _sendfile_response(header, path, full_path):
+    """Réponse vide qui confie l'envoi du fichier au serveur frontal."""
+    # nginx et Apache gardent l'en-tête Content-Type de l'application
+    response = HttpResponse(content_type=_content_type(full_path))
+    if header == 'X-Accel-Redirect':
+        # URI d'une location « internal » de nginx
+        prefix = settings.MEDIA_ACCEL_PREFIX.rstrip('/')
+        response[header] = f'{prefix}/{quote(path)}'
+    else:
+        response[header] = full_path
+    return response
+
+
+@require_safe
+def media_view(request, path):
+    """Sert un fichier de MEDIA_ROOT."""
+    full_path = _media_path(path)
+    cache_control = f'public, max-age={MEDIA_CACHE_MAX_AGE}'
+
+    header = getattr(settings, 'MEDIA_SENDFILE_HEADER', None)
+    if header:
+        if header not in SENDFILE_HEADERS:
+            raise ValueError(
+                "MEDIA_SENDFILE_HEADER doit valoir "
+                f"{' ou '.join(SENDFILE_HEADERS)}."
+            )
+        # Le serveur frontal gère lui-même Range et les validateurs
+        response = _sendfile_response(header, path, full_path)
+        response['Cache-Control'] = cache_control
+        return response
+
+    stat = os.stat(full_path)
+    size = stat.st_size
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': cache_control,
+        'Accept-Ranges': 'bytes',
+    }
+
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return HttpResponse(status=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    # If-Range : l'intervalle ne vaut que pour la version connue du client
+    if range_header and request.headers.get('If-Range', etag) == etag:
+        byte_range = parse_range(range_header, size)
+    if byte_range == ():
+        headers['Content-Range'] = f'bytes */{size}'
+        return HttpResponse(status=416, headers=headers)
+
+    content_type = _content_type(full_path)
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(
+            file, content_type=content_type, headers=headers
+        )
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(
+            _FileRange(file, end - start + 1), status=206,
+            content_type=content_type, headers=headers
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.block_size = MEDIA_BLOCK_SIZE
+    if request.method == 'HEAD':
+        # Les en-têtes suffisent : le fichier n'est pas lu
+        response.streaming_content = []
+        file.close()
+    return response
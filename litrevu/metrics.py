@@ -0,0 +1,243 @@
+"""
+Mesures des requêtes HTTP : durée, requêtes SQL, rendu des gabarits et
+taille des réponses, agrégées par vue en histogrammes exposés au format
+texte de Prometheus sur /metrics.
+
+Les histogrammes vivent en mémoire dans chaque processus : avec plusieurs
+workers, chacun expose ses propres valeurs.
+"""
+import hmac
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates, Template
+
+
+# Bornes supérieures des seaux, en secondes
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+UNRESOLVED_VIEW = '<non résolue>'
+
+_current = ContextVar('litrevu_request_stats', default=None)
+
+
+class RequestStats:
+    """Compteurs de la requête en cours."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Enveloppe connection.execute_wrapper : compte chaque requête SQL
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+
+    @property
+    def total_seconds(self):
+        return time.perf_counter() - self.start
+
+
+def start_request():
+    """Commence la mesure d'une requête et retourne (stats, jeton)."""
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+class Histogram:
+    """Histogramme cumulatif à étiquettes, sûr entre threads."""
+
+    def __init__(self, name, documentation, buckets, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    'counts': [0] * len(self.buckets),
+                    'count': 0,
+                    'sum': 0.0,
+                }
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+            series['count'] += 1
+            series['sum'] += value
+
+    def clear(self):
+        with self._lock:
+            self._series = {}
+
+    def _labels(self, labels, **extra):
+        pairs = list(zip(self.label_names, labels)) + list(extra.items())
+        return ','.join(
+            '{}="{}"'.format(name, _escape(str(value)))
+            for name, value in pairs
+        )
+
+    def exposition(self):
+        """Lignes au format texte de Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = sorted(
+                (labels, dict(values, counts=list(values['counts'])))
+                for labels, values in self._series.items()
+            )
+        for labels, values in series:
+            for bound, count in zip(self.buckets, values['counts']):
+                le = self._labels(labels, le=_format(bound))
+                lines.append(f'{self.name}_bucket{{{le}}} {count}')
+            inf = self._labels(labels, le='+Inf')
+            lines.append(f'{self.name}_bucket{{{inf}}} {values["count"]}')
+            plain = self._labels(labels)
+            total = _format(values['sum'])
+            lines.append(f'{self.name}_sum{{{plain}}} {total}')
+            lines.append(f'{self.name}_count{{{plain}}} {values["count"]}')
+        return lines
+
+
+def _escape(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def _format(number):
+    return repr(float(number)) if isinstance(number, float) else str(number)
+
+
+REQUEST_DURATION = Histogram(
+    'litrevu_request_duration_seconds',
+    "Durée totale de traitement des requêtes.",
+    LATENCY_BUCKETS, ('view', 'method'),
+)
+REQUEST_DB_DURATION = Histogram(
+    'litrevu_request_db_duration_seconds',
+    "Temps passé en base de données par requête.",
+    LATENCY_BUCKETS, ('view',),
+)
+REQUEST_TEMPLATE_DURATION = Histogram(
+    'litrevu_request_template_duration_seconds',
+    "Temps de rendu des gabarits par requête.",
+    LATENCY_BUCKETS, ('view',),
+)
+REQUEST_QUERIES = Histogram(
+    'litrevu_request_queries',
+    "Nombre de requêtes SQL par requête.",
+    QUERY_BUCKETS, ('view',),
+)
+RESPONSE_SIZE = Histogram(
+    'litrevu_response_size_bytes',
+    "Taille du corps des réponses.",
+    SIZE_BUCKETS, ('view',),
+)
+HISTOGRAMS = [
+    REQUEST_DURATION,
+    REQUEST_DB_DURATION,
+    REQUEST_TEMPLATE_DURATION,
+    REQUEST_QUERIES,
+    RESPONSE_SIZE,
+]
+
+
+def record(view, method, stats, size):
+    """Ajoute une requête terminée aux histogrammes."""
+    REQUEST_DURATION.observe(stats.total_seconds, view, method)
+    REQUEST_DB_DURATION.observe(stats.db_seconds, view)
+    REQUEST_TEMPLATE_DURATION.observe(stats.template_seconds, view)
+    REQUEST_QUERIES.observe(stats.queries, view)
+    if size is not None:
+        RESPONSE_SIZE.observe(size, view)
+
+
+def exposition():
+    """Toutes les métriques au format texte de Prometheus."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.exposition())
+    return '\n'.join(lines) + '\n'
+
+
+# ============== GABARITS ==============
+
+class TimedTemplate(Template):
+    """Gabarit dont le temps de rendu est ajouté à la requête en cours."""
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Moteur de gabarits Django qui mesure le rendu des gabarits principaux
+    (les {% include %} sont comptés dans le gabarit qui les inclut).
+    """
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return TimedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+# ============== VUE ==============
+
+def _has_token(request):
+    """Vrai si la requête porte le jeton METRICS_TOKEN (Bearer)."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return False
+    header = request.headers.get('Authorization', '')
+    scheme, _, value = header.partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(
+        value.strip().encode(), token.encode()
+    )
+
+
+def metrics_view(request):
+    """
+    Expose les métriques au format Prometheus, aux membres du staff et au
+    collecteur qui présente le jeton METRICS_TOKEN.
+    """
+    if not _has_token(request) and not (
+        request.user.is_authenticated and request.user.is_staff
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        exposition(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,100 @@
+"""
+Middleware du projet LITRevu.
+"""
+from contextlib import ExitStack
+
+from django.db import connections
+
+from . import metrics
+
+
+def _measure_queries(stack, stats):
+    """Compte dans stats les requêtes SQL de toutes les connexions."""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(stats))
+
+
+class RequestTimingMiddleware:
+    """
+    Mesure chaque requête (durée, requêtes SQL, temps en base, rendu des
+    gabarits, taille de la réponse) et l'ajoute aux histogrammes de
+    litrevu.metrics. Les membres du staff reçoivent le détail dans l'en-tête
+    Server-Timing.
+
+    Une réponse en flux (export, API, fichiers media) est mesurée jusqu'à
+    sa fermeture, corps envoyé compris ; l'en-tête Server-Timing, parti
+    avant le corps, n'en donne que la partie produite par la vue.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats, token = metrics.start_request()
+        try:
+            with ExitStack() as stack:
+                _measure_queries(stack, stats)
+                response = self.get_response(request)
+                # Lu avant l'enregistrement : le chargement éventuel de
+                # l'utilisateur est compté dans les mesures de la requête
+                user = getattr(request, 'user', None)
+                show_timing = user is not None and user.is_staff
+        finally:
+            metrics.end_request(token)
+
+        match = request.resolver_match
+        view = match.view_name if match else metrics.UNRESOLVED_VIEW
+        if show_timing:
+            response['Server-Timing'] = self.server_timing(stats)
+        if response.streaming:
+            self.measure_stream(response, view, request.method, stats)
+        else:
+            metrics.record(view, request.method, stats, len(response.content))
+        return response
+
+    def measure_stream(self, response, view, method, stats):
+        """
+        Enregistre une réponse en flux à sa fermeture : requêtes SQL et
+        temps passés à produire le corps, et taille envoyée. Un fichier
+        transmis par le serveur (sendfile) n'est pas relu : sa taille est
+        celle de l'en-tête Content-Length.
+        """
+        sent = None
+        if getattr(response, 'file_to_stream', None) is not None:
+            if response.has_header('Content-Length'):
+                sent = int(response['Content-Length'])
+        elif not response.is_async:
+            sent = 0
+            content = response.streaming_content
+
+            def measured():
+                nonlocal sent
+                with ExitStack() as stack:
+                    _measure_queries(stack, stats)
+                    for chunk in content:
+                        sent += len(chunk)
+                        yield chunk
+
+            response.streaming_content = measured()
+
+        close = response.close
+        recorded = False
+
+        def closing():
+            nonlocal recorded
+            try:
+                close()
+            finally:
+                if not recorded:
+                    recorded = True
+                    metrics.record(view, method, stats, sent)
+
+        response.close = closing
+
+    def server_timing(self, stats):
+        return ', '.join([
+            f'db;dur={stats.db_seconds * 1000:.1f};'
+            f'desc="SQL ({stats.queries})"',
+            f'tpl;dur={stats.template_seconds * 1000:.1f};desc="Templates"',
+            f'total;dur={stats.total_seconds * 1000:.1f}',
+        ])
@@ -15,13 +15,6 @@ from pathlib import Path
 import os
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
-#
-# Gestion des settings locaux/production
-ENV = os.environ.get('DJANGO_ENV', 'development')
-if ENV == 'production':
-    from .settings_prod import *  # noqa
-elif ENV == 'local':
-    from .settings_local import *  # noqa
 
 
 # Application definition
@@ -35,9 +28,11 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'authentication',
     'reviews',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'litrevu.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,7 +46,7 @@ ROOT_URLCONF = 'litrevu.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'litrevu.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,6 +73,58 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Utilisé pour les pages du flux (reviews.cache), les sessions cached_db et
+# l'utilisateur connecté. Ce cache en mémoire est propre à chaque processus
+# et ne convient qu'au développement : la production exige Redis
+# (DJANGO_REDIS_URL, voir settings_prod.py).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'litrevu',
+    }
+}
+
+
+# Sessions et utilisateur connecté
+# DJANGO_SESSION_MODE choisit le stockage des sessions :
+# - cached_db (défaut) : lues dans le cache, écrites aussi en base ;
+# - signed_cookies : contenues dans le cookie signé, aucune table (une
+#   session volée reste valable jusqu'à son expiration) ;
+# - db : table django_session lue à chaque requête.
+# cached_db et CachedModelBackend s'appuient sur le cache (voir CACHES).
+# CachedModelBackend garde l'utilisateur connecté en cache
+# AUTH_USER_CACHE_TIMEOUT secondes (voir authentication/backends.py).
+
+SESSION_MODE = os.environ.get('DJANGO_SESSION_MODE', 'cached_db')
+if SESSION_MODE not in ('cached_db', 'signed_cookies', 'db'):
+    raise RuntimeError(
+        "DJANGO_SESSION_MODE doit valoir cached_db, signed_cookies ou db."
+    )
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_MODE}'
+AUTHENTICATION_BACKENDS = ['authentication.backends.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = 60
+
+
+# Tâches d'arrière-plan (application jobs)
+# Exécutées par `python manage.py run_worker`. Mettre JOBS_RUN_INLINE à True
+# pour les exécuter directement dans la requête, sans worker.
+
+JOBS_RUN_INLINE = False
+
+
+# Métriques des requêtes (litrevu.metrics)
+# /metrics est servi au format Prometheus aux membres du staff et au
+# collecteur qui envoie l'en-tête « Authorization: Bearer <jeton> ». Sans
+# DJANGO_METRICS_TOKEN, seul le staff y a accès. L'adresse du client n'est
+# pas un critère : derrière nginx, toutes les requêtes viennent de
+# 127.0.0.1.
+
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN', '')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -118,10 +165,17 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# Destination de collectstatic, servie par litrevu.wsgi en production
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Envoi des fichiers media par le serveur frontal (voir litrevu/media.py) :
+# None (Django les envoie), 'X-Accel-Redirect' (nginx) ou 'X-Sendfile'
+MEDIA_SENDFILE_HEADER = None
+# Location « internal » de nginx qui pointe sur MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = '/protected-media/'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -135,3 +189,13 @@ AUTH_USER_MODEL = 'authentication.User'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'feed'
 LOGOUT_REDIRECT_URL = 'login'
+
+
+# Gestion des settings locaux/production
+# Importés en dernier pour pouvoir remplacer les valeurs ci-dessus
+# (DATABASES en production notamment).
+ENV = os.environ.get('DJANGO_ENV', 'development')
+if ENV == 'production':
+    from .settings_prod import *  # noqa
+elif ENV == 'local':
+    from .settings_local import *  # noqa
@@ -1,5 +1,8 @@
 
 import os
+from pathlib import Path
+
+from .sqlite import production_database
 
 # Paramètres spécifiques à la production
 DEBUG = False
@@ -23,3 +26,40 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 X_FRAME_OPTIONS = 'DENY'
+
+# Cache partagé entre les processus, obligatoire en production : le cache
+# en mémoire (LocMemCache) est propre à chaque processus, et une
+# invalidation (mot de passe changé, compte désactivé, flux modifié)
+# n'atteindrait pas les autres. Il garde les sessions cached_db,
+# l'utilisateur connecté (CachedModelBackend) et les pages du flux.
+REDIS_URL = os.environ.get('DJANGO_REDIS_URL')
+if not REDIS_URL:
+    raise RuntimeError(
+        "La variable d'environnement DJANGO_REDIS_URL doit être définie en "
+        "production (cache partagé entre les processus)."
+    )
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+}
+
+# Base SQLite : WAL, PRAGMA de performance, transactions IMMEDIATE et
+# connexions persistantes (voir litrevu/sqlite.py)
+DATABASES = {
+    'default': production_database(
+        Path(__file__).resolve().parent.parent / 'db.sqlite3'
+    ),
+}
+
+# Fichiers statiques à empreinte et précompressés (voir
+# litrevu/staticfiles.py) : lancer collectstatic à chaque déploiement
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'litrevu.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
@@ -0,0 +1,46 @@
+"""
+Profil SQLite de production.
+
+Les PRAGMA sont exécutés à l'ouverture de chaque connexion (option
+init_command du moteur sqlite3 de Django) :
+- journal WAL : les lectures ne bloquent plus l'écriture et inversement ;
+- synchronous=NORMAL : suffisant en WAL, sans fsync à chaque validation ;
+- mmap_size et cache_size : lectures servies depuis la mémoire ;
+- busy_timeout : attendre un verrou plutôt qu'échouer tout de suite.
+Les transactions démarrent en IMMEDIATE : un écrivain prend le verrou dès
+BEGIN au lieu d'échouer en cours de transaction (« database is locked »).
+"""
+
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Valeur négative : taille en Kio (64 Mio)
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+# Connexions conservées entre les requêtes (secondes)
+PRODUCTION_CONN_MAX_AGE = 600
+
+
+def init_command(pragmas):
+    """Instructions PRAGMA séparées par des points-virgules."""
+    return ';'.join(
+        f'PRAGMA {name}={value}' for name, value in pragmas.items()
+    )
+
+
+def production_database(name):
+    """Entrée DATABASES d'une base SQLite avec le profil de production."""
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': PRODUCTION_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': init_command(PRODUCTION_PRAGMAS),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
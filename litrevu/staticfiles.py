@@ -0,0 +1,207 @@
+"""
+Fichiers statiques en production.
+
+collectstatic écrit, avec CompressedManifestStaticFilesStorage, des noms
+contenant l'empreinte du contenu (css/base.3f2a….css) et, à côté de chaque
+fichier compressible, des copies précompressées .gz et .br (brotli si le
+paquet optionnel est installé).
+
+StaticFilesApplication enveloppe l'application WSGI et sert ces fichiers
+avant Django : encodage choisi selon Accept-Encoding, ETag, réponse 304,
+et Cache-Control immutable pour les noms à empreinte, qui ne changent
+jamais de contenu.
+"""
+import gzip
+import json
+import mimetypes
+import os
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # paquet optionnel
+    brotli = None
+
+
+# Fichiers déjà compressés : une copie compressée ne gagnerait rien
+INCOMPRESSIBLE_EXTENSIONS = {
+    '.br', '.gz', '.zip', '.png', '.jpg', '.jpeg', '.gif', '.webp',
+    '.avif', '.woff', '.woff2', '.mp4', '.webm',
+}
+# Une copie n'est gardée que si elle économise au moins 5 %
+MIN_COMPRESSION_RATIO = 0.95
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+
+
+def _compressors():
+    """(encodage, suffixe, fonction) par ordre de préférence."""
+    compressors = []
+    if brotli is not None:
+        compressors.append(
+            ('br', '.br', lambda data: brotli.compress(data, quality=11))
+        )
+    # mtime=0 : même fichier, même copie d'un collectstatic à l'autre
+    compressors.append(
+        ('gzip', '.gz',
+         lambda data: gzip.compress(data, compresslevel=9, mtime=0))
+    )
+    return compressors
+
+
+def compress_file(path):
+    """
+    Écrit à côté de path ses copies compressées utiles.
+    Retourne la liste des fichiers écrits.
+    """
+    if os.path.splitext(path)[1].lower() in INCOMPRESSIBLE_EXTENSIONS:
+        return []
+    with open(path, 'rb') as source:
+        data = source.read()
+    written = []
+    for _, suffix, compress in _compressors():
+        compressed = compress(data)
+        if len(compressed) < len(data) * MIN_COMPRESSION_RATIO:
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Stockage à empreintes de Django qui précompresse les fichiers produits
+    par collectstatic.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            compress_file(self.path(hashed_name))
+
+
+# ============== SERVICE WSGI ==============
+
+def _accepted_encodings(header):
+    """Encodages acceptés (q > 0) d'un en-tête Accept-Encoding."""
+    accepted = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    """Un fichier statique et ses variantes encodées, indexés au démarrage."""
+
+    def __init__(self, path, immutable):
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        if self.content_type.startswith('text/') or self.content_type in (
+            'application/javascript', 'application/json', 'image/svg+xml'
+        ):
+            self.content_type += '; charset=utf-8'
+        self.cache_control = (
+            IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL
+        )
+        # encodage -> (chemin, taille, ETag), par ordre de préférence
+        self.variants = {}
+        for encoding, suffix, _ in [*_compressors(), ('identity', '', None)]:
+            candidate = path + suffix
+            if os.path.isfile(candidate):
+                stat = os.stat(candidate)
+                etag = '"{:x}-{:x}{}"'.format(
+                    int(stat.st_mtime), stat.st_size, suffix
+                )
+                self.variants[encoding] = (candidate, stat.st_size, etag)
+
+    def choose(self, accept_encoding):
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in self.variants:
+            if encoding == 'identity' or encoding in accepted:
+                return encoding
+        return 'identity'
+
+    def serve(self, environ, start_response):
+        encoding = self.choose(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        path, size, etag = self.variants[encoding]
+        headers = [('Cache-Control', self.cache_control), ('ETag', etag)]
+        if len(self.variants) > 1:
+            headers.append(('Vary', 'Accept-Encoding'))
+
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            start_response('304 Not Modified', headers)
+            return []
+
+        headers += [
+            ('Content-Type', self.content_type),
+            ('Content-Length', str(size)),
+        ]
+        if encoding != 'identity':
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(path, 'rb'), 64 * 1024)
+
+
+class StaticFilesApplication:
+    """
+    Application WSGI qui sert les fichiers de STATIC_ROOT sous STATIC_URL
+    et transmet les autres requêtes à application.
+    """
+
+    def __init__(self, application, root=None, url=None):
+        self.application = application
+        root = root or settings.STATIC_ROOT
+        self.prefix = '/' + (url or settings.STATIC_URL).lstrip('/')
+        self.files = {}
+        if root and os.path.isdir(root):
+            self.files = self._index(root)
+
+    def _index(self, root):
+        immutable = set()
+        manifest = os.path.join(root, 'staticfiles.json')
+        if os.path.isfile(manifest):
+            with open(manifest, encoding='utf-8') as source:
+                immutable.update(json.load(source).get('paths', {}).values())
+
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                # Copies compressées : variantes de leur fichier d'origine
+                if name.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, root).replace(os.sep, '/')
+                files[relative] = StaticFile(path, relative in immutable)
+        return files
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if (
+            self.files
+            and path.startswith(self.prefix)
+            and environ['REQUEST_METHOD'] in ('GET', 'HEAD')
+        ):
+            static_file = self.files.get(path[len(self.prefix):])
+            if static_file is not None:
+                return static_file.serve(environ, start_response)
+        return self.application(environ, start_response)
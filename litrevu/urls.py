@@ -2,22 +2,28 @@
 URL configuration for litrevu project.
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .media import media_view
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('authentication.urls')),
     path('', include('reviews.urls')),
+    # Fichiers envoyés par les utilisateurs, en développement comme en
+    # production
+    re_path(
+        r'^{}(?P<path>.+)$'.format(settings.MEDIA_URL.lstrip('/')),
+        media_view, name='media'
+    ),
 ]
 
-# Servir les fichiers media et statiques en développement
+# Servir les fichiers statiques en développement
 if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
     urlpatterns += static(
         settings.STATIC_URL,
         document_root=settings.STATICFILES_DIRS[0]
@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'litrevu.settings')
 
 application = get_wsgi_application()
+
+# En production, les fichiers de STATIC_ROOT (collectstatic) sont servis
+# avant Django, précompressés et avec un cache longue durée
+if not settings.DEBUG:
+    from .staticfiles import StaticFilesApplication
+
+    application = StaticFilesApplication(application)
@@ -1,31 +1,106 @@
 """
 Configuration de l'administration pour les billets, critiques et abonnements.
+
+Les listes restent rapides sur des tables de plusieurs millions de lignes
+(voir litrevu/changelists.py) : décompte estimé, filtres utilisateur par
+autocomplétion, clés étrangères chargées par jointure, tri par clé
+primaire et recherche dans l'index plein texte.
 """
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from authentication.models import username_prefix_filter
+from litrevu.changelists import AutocompleteFilter, LargeTableAdmin
+
+from .feed import TICKET, REVIEW
 from .models import Ticket, Review, UserFollows
+from .search import latest_matches, match_expression
+
+
+User = get_user_model()
+
+# Résultats retenus par une recherche (les plus récents)
+ADMIN_SEARCH_LIMIT = 1000
+
+
+class RatingFilter(admin.SimpleListFilter):
+    """Notes fixes : pas de SELECT DISTINCT sur toute la table."""
+    title = "note"
+    parameter_name = 'rating'
+
+    def lookups(self, request, model_admin):
+        return [(str(rating), f"{rating} ★") for rating in range(6)]
+
+    def queryset(self, request, queryset):
+        if self.value() is not None:
+            return queryset.filter(rating=self.value())
+        return queryset
+
+
+class PostAdmin(LargeTableAdmin):
+    """Billets et critiques : recherche dans l'index FTS5 reviews_search."""
+    post_type = None
+    # Tri sur des colonnes non indexées désactivé : il parcourrait la table
+    ordering = ('-pk',)
+    sortable_by = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        # Mots entiers : un préfixe fusionnerait les listes de tous les
+        # mots qui le prolongent, au lieu de lire celle d'un seul mot
+        expression = match_expression(search_term, prefix=False)
+        if not expression:
+            return queryset, False
+        ids = latest_matches(expression, self.post_type, ADMIN_SEARCH_LIMIT)
+        return queryset.filter(pk__in=ids), False
 
 
 @admin.register(Ticket)
-class TicketAdmin(admin.ModelAdmin):
+class TicketAdmin(PostAdmin):
     """Administration pour le modèle Ticket."""
+    post_type = TICKET
     list_display = ('title', 'user', 'time_created')
-    list_filter = ('time_created', 'user')
-    search_fields = ('title', 'description', 'user__username')
-    date_hierarchy = 'time_created'
+    list_filter = (('user', AutocompleteFilter),)
+    list_select_related = ('user',)
+    search_fields = ('title', 'description')
+    search_help_text = "Mots du titre ou de la description."
+    autocomplete_fields = ('user',)
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(PostAdmin):
     """Administration pour le modèle Review."""
+    post_type = REVIEW
     list_display = ('headline', 'ticket', 'user', 'rating', 'time_created')
-    list_filter = ('rating', 'time_created', 'user')
-    search_fields = ('headline', 'body', 'user__username', 'ticket__title')
-    date_hierarchy = 'time_created'
+    list_filter = (RatingFilter, ('user', AutocompleteFilter))
+    list_select_related = ('ticket', 'user')
+    search_fields = ('headline', 'body')
+    search_help_text = "Mots du titre ou du commentaire."
+    autocomplete_fields = ('ticket', 'user')
 
 
 @admin.register(UserFollows)
-class UserFollowsAdmin(admin.ModelAdmin):
+class UserFollowsAdmin(LargeTableAdmin):
     """Administration pour le modèle UserFollows."""
     list_display = ('user', 'followed_user')
-    list_filter = ('user', 'followed_user')
+    list_filter = (
+        ('user', AutocompleteFilter), ('followed_user', AutocompleteFilter)
+    )
+    list_select_related = ('user', 'followed_user')
     search_fields = ('user__username', 'followed_user__username')
+    search_help_text = "Début du nom de l'abonné ou de l'utilisateur suivi."
+    autocomplete_fields = ('user', 'followed_user')
+    ordering = ('-pk',)
+    sortable_by = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        # Noms commençant par le terme, lus dans l'index des noms sans casse
+        user_ids = User.objects.filter(
+            **username_prefix_filter(search_term)
+        ).values('id')[:ADMIN_SEARCH_LIMIT]
+        return queryset.filter(
+            Q(user__in=user_ids) | Q(followed_user__in=user_ids)
+        ), False
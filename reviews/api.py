@@ -0,0 +1,181 @@
+"""
+API JSON du flux et des posts de l'utilisateur.
+
+Les pages suivent le même ordre et les mêmes curseurs que les vues HTML.
+Les posts sont lus avec .values() (jamais instanciés en modèles), par
+paquets, et chaque paquet est sérialisé et envoyé dès qu'il est prêt :
+une grande page ne se construit jamais entière en mémoire.
+"""
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .feed import TICKET, REVIEW, FEED_PAGE_SIZE, page_rows
+from .models import Ticket, Review
+
+API_MAX_PAGE_SIZE = 500
+# Posts lus et sérialisés ensemble
+API_CHUNK_SIZE = 100
+
+_image_storage = Ticket._meta.get_field('image').storage
+
+
+def _average_rating(values):
+    if not values['review_count']:
+        return None
+    return round(values['rating_sum'] / values['review_count'], 2)
+
+
+def _image_url(values):
+    return _image_storage.url(values['image']) if values['image'] else None
+
+
+# Champs exposés par type : colonnes lues avec .values() et, pour les
+# champs calculés, fonction qui en tire la valeur
+TICKET_FIELDS = {
+    'time_created': (('time_created',), None),
+    'user': (('user__username',), None),
+    'title': (('title',), None),
+    'description': (('description',), None),
+    'image': (('image',), _image_url),
+    'review_count': (('review_count',), None),
+    'average_rating': (('review_count', 'rating_sum'), _average_rating),
+}
+REVIEW_FIELDS = {
+    'time_created': (('time_created',), None),
+    'user': (('user__username',), None),
+    'headline': (('headline',), None),
+    'body': (('body',), None),
+    'rating': (('rating',), None),
+    'ticket': (('ticket_id',), None),
+    'ticket_title': (('ticket__title',), None),
+}
+FIELDS = {TICKET: TICKET_FIELDS, REVIEW: REVIEW_FIELDS}
+QUERYSETS = {TICKET: Ticket.objects, REVIEW: Review.objects}
+
+
+class InvalidParameter(ValueError):
+    """Paramètre de requête invalide (réponse 400)."""
+
+
+def api_login_required(view):
+    """Comme login_required, mais répond 401 en JSON sans redirection."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'error': "Authentification requise."}, status=401
+            )
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def parse_fields(value):
+    """
+    Lit le paramètre fields= (noms séparés par des virgules). Retourne,
+    pour chaque type, les champs demandés qui le concernent ; tous les
+    champs si le paramètre est absent.
+    """
+    if not value:
+        return {kind: list(fields) for kind, fields in FIELDS.items()}
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [
+        name for name in names
+        if name not in TICKET_FIELDS and name not in REVIEW_FIELDS
+    ]
+    if unknown:
+        raise InvalidParameter(f"Champs inconnus : {', '.join(unknown)}.")
+    return {
+        kind: [name for name in names if name in fields]
+        for kind, fields in FIELDS.items()
+    }
+
+
+def parse_limit(value):
+    """Lit le paramètre limit= (taille de page)."""
+    if not value:
+        return FEED_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidParameter("limit doit être un entier.") from None
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        raise InvalidParameter(
+            f"limit doit être compris entre 1 et {API_MAX_PAGE_SIZE}."
+        )
+    return limit
+
+
+def _load(kind, ids, names):
+    """Dictionnaires des champs names des posts ids d'un type."""
+    if not ids:
+        return {}
+    specs = FIELDS[kind]
+    columns = {'id'}
+    for name in names:
+        columns.update(specs[name][0])
+    loaded = {}
+    for values in QUERYSETS[kind].filter(id__in=ids).order_by().values(
+        *columns
+    ):
+        item = {'type': kind, 'id': values['id']}
+        for name in names:
+            lookups, compute = specs[name]
+            item[name] = compute(values) if compute else values[lookups[0]]
+        loaded[values['id']] = item
+    return loaded
+
+
+def _serialize(rows, fields, chunk_size):
+    """Génère le corps JSON de la page, un paquet de posts à la fois."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    separator = ''
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        loaded = {
+            kind: _load(
+                kind,
+                [post_id for _, row_kind, post_id in chunk
+                 if row_kind == kind],
+                fields[kind]
+            )
+            for kind in FIELDS
+        }
+        items = [
+            encoder.encode(loaded[kind][post_id])
+            for _, kind, post_id in chunk
+            if post_id in loaded[kind]
+        ]
+        if items:
+            yield separator + ','.join(items)
+            separator = ','
+
+
+def page_response(request, rows, cursor, backward):
+    """
+    Réponse JSON en flux d'une page de lignes (time_created, type, id) lues
+    après le curseur : {"next": ..., "previous": ..., "results": [...]}.
+    """
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        limit = parse_limit(request.GET.get('limit'))
+    except InvalidParameter as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    rows, next_cursor, previous_cursor = page_rows(
+        rows[:limit + 1], limit, cursor, backward
+    )
+
+    def body():
+        # Les curseurs d'abord : le client peut préparer la page suivante
+        # avant la fin du transfert
+        yield (
+            f'{{"next": {json.dumps(next_cursor)}, '
+            f'"previous": {json.dumps(previous_cursor)}, "results": ['
+        )
+        yield from _serialize(rows, fields, API_CHUNK_SIZE)
+        yield ']}'
+
+    return StreamingHttpResponse(body(), content_type='application/json')
@@ -0,0 +1,34 @@
+"""
+Outils communs aux commandes de mesure de performance.
+"""
+import math
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def temporary_database():
+    """
+    Crée une base de test vide le temps du bloc, comme le lanceur de tests,
+    pour ne jamais écrire de données synthétiques dans la vraie base.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(values, pct):
+    """Percentile par rang le plus proche d'une liste de mesures."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
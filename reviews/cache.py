@@ -0,0 +1,152 @@
+"""
+Cache des pages du flux et des posts de l'utilisateur.
+
+Chaque utilisateur possède une « génération » de flux stockée dans le cache.
+Les pages sont mises en cache sous une clé qui contient cette génération :
+toute écriture qui modifie ce qu'un utilisateur voit change sa génération,
+et les anciennes pages ne sont plus jamais lues (elles expirent seules).
+
+Les mêmes informations servent de validateurs HTTP (ETag, Last-Modified) :
+un navigateur qui recharge une page inchangée reçoit une réponse 304.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+
+FEED_CACHE_TIMEOUT = 300
+GENERATION_TIMEOUT = None
+
+HITS_KEY = 'feed:stats:hits'
+MISSES_KEY = 'feed:stats:misses'
+
+
+def _generation_key(user_id):
+    return f'feed:gen:{user_id}'
+
+
+def _new_generation():
+    # Une valeur horodatée ne peut pas reprendre une génération déjà
+    # utilisée, même si le compteur a été évincé du cache.
+    return time.time_ns()
+
+
+def get_generation(user_id):
+    """Retourne la génération courante du flux d'un utilisateur."""
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = _new_generation()
+        if not cache.add(key, generation, GENERATION_TIMEOUT):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def bump_generations(user_ids):
+    """Invalide les pages en cache des utilisateurs donnés."""
+    generation = _new_generation()
+    cache.set_many(
+        {_generation_key(user_id): generation for user_id in set(user_ids)},
+        GENERATION_TIMEOUT
+    )
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cached_page(request, view_name, build_page):
+    """
+    Retourne les données de page de view_name pour l'utilisateur connecté,
+    depuis le cache si sa génération n'a pas changé, sinon via build_page.
+    """
+    user_id = request.user.id
+    position = hashlib.md5('{}|{}|{}'.format(
+        request.GET.get('before', ''),
+        request.GET.get('after', ''),
+        request.GET.get('page', ''),
+    ).encode()).hexdigest()
+    generation = get_generation(user_id)
+    key = f'feed:page:{view_name}:{user_id}:{generation}:{position}'
+    page = cache.get(key)
+    if page is not None:
+        _incr(HITS_KEY)
+        return page
+
+    _incr(MISSES_KEY)
+    page = build_page()
+    cache.set(key, page, FEED_CACHE_TIMEOUT)
+    return page
+
+
+def cache_stats():
+    """Nombre de succès et d'échecs du cache des pages."""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+def _page_validators(request, view_name, newest_post):
+    """
+    Calcule (etag, last_modified) d'une page pour l'utilisateur connecté,
+    une seule fois par requête.
+    """
+    validators = getattr(request, '_page_validators', None)
+    if validators is not None:
+        return validators
+
+    user = request.user
+    # Un message en attente doit être affiché : pas de réponse 304
+    if not user.is_authenticated or len(messages.get_messages(request)):
+        validators = (None, None)
+    else:
+        newest = newest_post(user)
+        generation = get_generation(user.id)
+        etag = hashlib.md5('{}|{}|{}|{}'.format(
+            view_name, user.id, generation,
+            newest.isoformat() if newest else '',
+        ).encode()).hexdigest()
+        # La génération est l'horodatage de la dernière invalidation
+        changed = datetime.fromtimestamp(generation / 1e9, tz=timezone.utc)
+        last_modified = max(newest, changed) if newest else changed
+        validators = (f'"{etag}"', last_modified)
+    request._page_validators = validators
+    return validators
+
+
+def conditional_page(view_name, newest_post):
+    """
+    Décorateur de vue répondant 304 Not Modified quand la page n'a pas
+    changé depuis la dernière visite, sans lire ni rendre les posts.
+
+    newest_post(user) retourne la date du post visible le plus récent, lue
+    en une ligne d'index. Les ajouts, suppressions, modifications de posts
+    et changements d'abonnements changent la génération de l'utilisateur,
+    également incluse : aucun décompte des posts n'est nécessaire.
+    """
+    def etag(request, *args, **kwargs):
+        return _page_validators(request, view_name, newest_post)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return _page_validators(request, view_name, newest_post)[1]
+
+    def decorator(view):
+        # no-cache : le navigateur revalide la page à chaque visite
+        return cache_control(private=True, no_cache=True)(
+            condition(etag_func=etag, last_modified_func=last_modified)(view)
+        )
+    return decorator
@@ -0,0 +1,147 @@
+"""
+Compteurs dénormalisés : abonnés, abonnements, billets et critiques de
+chaque utilisateur, nombre de critiques et somme des notes de chaque billet,
+affinité de chaque lecteur pour les auteurs dont il critique les billets.
+
+Les signaux les ajustent par des mises à jour F() atomiques ; recount()
+les recalcule en masse après des insertions sans signaux (bulk_create) ou
+pour corriger une dérive.
+"""
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from authentication.backends import forget_user, user_cache_key
+
+from .models import Ticket, Review, UserFollows, AuthorAffinity
+
+
+User = get_user_model()
+
+# Identifiants par requête d'un recalcul ciblé
+RECOUNT_BATCH_SIZE = 500
+
+
+def _add(field, amount):
+    # Jamais sous zéro, même si le compteur avait dérivé
+    return Greatest(F(field) + amount, Value(0))
+
+
+def change_user(user_id, **amounts):
+    """Ajoute amounts aux compteurs de l'utilisateur user_id."""
+    User.objects.filter(pk=user_id).update(**{
+        field: _add(field, amount) for field, amount in amounts.items()
+    })
+    # Les compteurs sont affichés depuis request.user, gardé en cache
+    transaction.on_commit(partial(forget_user, user_id))
+
+
+def change_ticket(ticket_id, reviews=0, ratings=0):
+    """
+    Ajuste le nombre de critiques et la somme des notes d'un billet et
+    renouvelle sa date de modification (clé du cache des cartes).
+    """
+    Ticket.objects.filter(pk=ticket_id).update(
+        review_count=_add('review_count', reviews),
+        rating_sum=_add('rating_sum', ratings),
+        updated=timezone.now(),
+    )
+
+
+def change_affinity(viewer_id, author_id, amount):
+    """
+    Ajoute amount aux interactions de viewer_id avec author_id (critique
+    écrite sur l'un de ses billets). Critiquer son propre billet ne compte
+    pas.
+    """
+    if viewer_id == author_id:
+        return
+    updated = AuthorAffinity.objects.filter(
+        viewer_id=viewer_id, author_id=author_id
+    ).update(interactions=_add('interactions', amount))
+    if not updated and amount > 0:
+        AuthorAffinity.objects.bulk_create([
+            AuthorAffinity(
+                viewer_id=viewer_id, author_id=author_id,
+                interactions=amount
+            )
+        ], ignore_conflicts=True)
+
+
+def _subquery(queryset, group_by, aggregate):
+    return Coalesce(Subquery(
+        queryset.filter(**{group_by: OuterRef('pk')}).order_by().values(
+            group_by
+        ).annotate(value=aggregate).values('value')[:1]
+    ), Value(0))
+
+
+COUNTERS = [
+    (User, 'followers_count',
+     _subquery(UserFollows.objects, 'followed_user', Count('*'))),
+    (User, 'following_count',
+     _subquery(UserFollows.objects, 'user', Count('*'))),
+    (User, 'tickets_count', _subquery(Ticket.objects, 'user', Count('*'))),
+    (User, 'reviews_count', _subquery(Review.objects, 'user', Count('*'))),
+    (Ticket, 'review_count',
+     _subquery(Review.objects, 'ticket', Count('*'))),
+    (Ticket, 'rating_sum',
+     _subquery(Review.objects, 'ticket', Sum('rating'))),
+]
+
+
+def _batches(values, size=RECOUNT_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def recount(fix=True, user_ids=None, ticket_ids=None):
+    """
+    Compare chaque compteur à la valeur recalculée et, si fix, corrige les
+    lignes en dérive par lots. Comme change_user et change_ticket, une
+    correction renouvelle la date de modification des billets (clé du
+    cache des cartes) et retire les utilisateurs du cache de connexion.
+    Si user_ids ou ticket_ids est fourni, seuls ces utilisateurs et ces
+    billets sont recalculés (par lots), par exemple après un import.
+    Retourne le nombre de lignes en dérive par compteur.
+    """
+    targeted = user_ids is not None or ticket_ids is not None
+    ids = {User: user_ids or (), Ticket: ticket_ids or ()}
+    drift = {}
+    for model, field, expression in COUNTERS:
+        label = f'{model._meta.model_name}.{field}'
+        if targeted:
+            querysets = [
+                model.objects.filter(pk__in=batch)
+                for batch in _batches(ids[model])
+            ]
+        else:
+            querysets = [model.objects.all()]
+        drift[label] = 0
+        for queryset in querysets:
+            stale = list(queryset.annotate(
+                actual=expression
+            ).exclude(**{field: F('actual')}).values_list('pk', flat=True))
+            if fix and stale:
+                _fix(model, field, expression, stale)
+            drift[label] += len(stale)
+    return drift
+
+
+def _fix(model, field, expression, ids):
+    """Recalcule field pour les lignes ids et invalide leurs caches."""
+    changes = {field: expression}
+    if model is Ticket:
+        changes['updated'] = timezone.now()
+    for batch in _batches(ids):
+        model.objects.filter(pk__in=batch).update(**changes)
+    if model is User:
+        transaction.on_commit(partial(
+            cache.delete_many, [user_cache_key(user_id) for user_id in ids]
+        ))
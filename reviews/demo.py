@@ -1,19 +1,24 @@
 """
-Script pour générer des données de test pour l'application LITRevu.
+Données de démonstration : quelques comptes, billets et critiques écrits à
+la main, créés par la commande populate_db.
 """
-
-import os
-import django
 from django.contrib.auth import get_user_model
-from reviews.models import Ticket, Review, UserFollows
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'litrevu.settings')
-django.setup()
+from .models import Ticket, Review, UserFollows
+
 
 User = get_user_model()
 
+ACCOUNTS = [
+    ('Admin', 'admin', 'admin123'),
+    ('Alice', 'alice', 'alice123'),
+    ('Bob', 'bob', 'bob123'),
+    ('Charlie', 'charlie', 'charlie123'),
+    ('Diane', 'diane', 'diane123'),
+]
+
 
-def create_users():
+def create_users(log=print):
     """Créer des utilisateurs de test."""
     users_data = [
         {'username': 'admin', 'password': 'admin123', 'is_superuser': True,
@@ -41,16 +46,16 @@ def create_users():
         if created:
             user.set_password(password)
             user.save()
-            print(f"Utilisateur créé: {user.username}")
+            log(f"Utilisateur créé: {user.username}")
         else:
-            print(f"Utilisateur existant: {user.username}")
+            log(f"Utilisateur existant: {user.username}")
 
         users[data['username']] = user
 
     return users
 
 
-def create_follows(users):
+def create_follows(users, log=print):
     """Créer des relations de suivi entre utilisateurs."""
     follows = [
         ('alice', 'bob'),
@@ -68,10 +73,10 @@ def create_follows(users):
             followed_user=users[followed]
         )
         if created:
-            print(f"{follower} suit maintenant {followed}")
+            log(f"{follower} suit maintenant {followed}")
 
 
-def create_tickets(users):
+def create_tickets(users, log=print):
     """Créer des billets de test."""
     tickets_data = [
         {
@@ -114,13 +119,13 @@ def create_tickets(users):
             defaults={'description': data['description']}
         )
         if created:
-            print(f"Billet créé: {ticket.title}")
+            log(f"Billet créé: {ticket.title}")
         tickets[data['title']] = ticket
 
     return tickets
 
 
-def create_reviews(users, tickets):
+def create_reviews(users, tickets, log=print):
     """Créer des critiques de test."""
     reviews_data = [
         {
@@ -173,39 +178,12 @@ def create_reviews(users, tickets):
                 }
             )
             if created:
-                print(f"Critique créée: {review.headline}")
-
-
-def main():
-    """Fonction principale."""
-    print("=" * 50)
-    print("Création des données de test pour LITRevu")
-    print("=" * 50)
-
-    print("\n--- Création des utilisateurs ---")
-    users = create_users()
-
-    print("\n--- Création des abonnements ---")
-    create_follows(users)
-
-    print("\n--- Création des billets ---")
-    tickets = create_tickets(users)
-
-    print("\n--- Création des critiques ---")
-    create_reviews(users, tickets)
-
-    print("\n" + "=" * 50)
-    print("Données de test créées avec succès !")
-    print("=" * 50)
-    print("\nComptes utilisateurs disponibles:")
-    print("-" * 30)
-    print("Admin:    admin / admin123")
-    print("Alice:    alice / alice123")
-    print("Bob:      bob / bob123")
-    print("Charlie:  charlie / charlie123")
-    print("Diane:    diane / diane123")
-    print("-" * 30)
+                log(f"Critique créée: {review.headline}")
 
 
-if __name__ == '__main__':
-    main()
+def create_demo_data(log=print):
+    """Crée les données de démonstration absentes de la base."""
+    users = create_users(log)
+    create_follows(users, log)
+    tickets = create_tickets(users, log)
+    create_reviews(users, tickets, log)
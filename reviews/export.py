@@ -0,0 +1,153 @@
+"""
+Export des billets et critiques d'un utilisateur.
+
+Les lignes sont lues par paquets avec .iterator(chunk_size=...) et écrites
+au fil de l'eau dans une réponse en flux : la mémoire utilisée ne dépend
+pas du nombre de posts exportés. L'archive ZIP est elle aussi produite en
+flux (zipfile sait écrire dans un flux non positionnable) et les images y
+sont recopiées par morceaux.
+"""
+import csv
+import io
+import time
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .feed import TICKET, REVIEW
+from .models import Ticket, Review
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'zip')
+EXPORT_CHUNK_SIZE = 2000
+# Octets d'archive accumulés avant envoi
+ZIP_FLUSH_SIZE = 64 * 1024
+
+# Colonnes communes aux billets et critiques
+EXPORT_COLUMNS = (
+    'type', 'id', 'time_created', 'title', 'body', 'rating', 'ticket',
+    'ticket_title', 'image',
+)
+
+
+def export_rows(user):
+    """Génère un dictionnaire par billet puis par critique de user."""
+    tickets = Ticket.objects.filter(user=user).order_by('id').values_list(
+        'id', 'time_created', 'title', 'description', 'image'
+    )
+    for post_id, time_created, title, description, image in (
+        tickets.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    ):
+        yield {
+            'type': TICKET, 'id': post_id, 'time_created': time_created,
+            'title': title, 'body': description, 'rating': None,
+            'ticket': None, 'ticket_title': None, 'image': image or None,
+        }
+
+    reviews = Review.objects.filter(user=user).order_by('id').values_list(
+        'id', 'time_created', 'headline', 'body', 'rating', 'ticket_id',
+        'ticket__title'
+    )
+    for post_id, time_created, headline, body, rating, ticket, title in (
+        reviews.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    ):
+        yield {
+            'type': REVIEW, 'id': post_id, 'time_created': time_created,
+            'title': headline, 'body': body, 'rating': rating,
+            'ticket': ticket, 'ticket_title': title, 'image': None,
+        }
+
+
+class _Echo:
+    """Pseudo-fichier dont write() renvoie la ligne au lieu de l'écrire."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(user):
+    """Génère l'export CSV, ligne par ligne."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in export_rows(user):
+        yield writer.writerow([
+            '' if row[column] is None else row[column]
+            for column in EXPORT_COLUMNS
+        ])
+
+
+def jsonl_lines(user):
+    """Génère l'export JSON Lines, un post par ligne."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in export_rows(user):
+        yield encoder.encode(row) + '\n'
+
+
+class _ZipStream(io.RawIOBase):
+    """
+    Flux en écriture seule et non positionnable : zipfile y écrit, et les
+    octets accumulés sont repris par take() pour être envoyés.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self.pending = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.pending += len(data)
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.pending = 0
+        return data
+
+
+def _image_names(user):
+    """Images des billets de user, puis sa photo de profil."""
+    names = Ticket.objects.filter(user=user).exclude(image='').order_by(
+        'id'
+    ).values_list('image', flat=True)
+    yield from names.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if user.profile_photo:
+        yield user.profile_photo.name
+
+
+def zip_chunks(user, data_format='jsonl'):
+    """
+    Génère une archive ZIP contenant posts.<data_format> et, sous images/,
+    les fichiers référencés présents dans MEDIA_ROOT.
+    """
+    storage = Ticket._meta.get_field('image').storage
+    lines = jsonl_lines if data_format == 'jsonl' else csv_lines
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(f'posts.{data_format}', 'w') as data:
+            for line in lines(user):
+                data.write(line.encode())
+                if stream.pending >= ZIP_FLUSH_SIZE:
+                    yield stream.take()
+
+        for name in _image_names(user):
+            try:
+                source = storage.open(name, 'rb')
+            except OSError:
+                # Fichier supprimé du disque : l'export continue sans lui
+                continue
+            # Images déjà compressées : stockées telles quelles
+            info = zipfile.ZipInfo(
+                f'images/{name}', date_time=time.localtime()[:6]
+            )
+            info.compress_type = zipfile.ZIP_STORED
+            with source, archive.open(info, 'w') as target:
+                for chunk in source.chunks():
+                    target.write(chunk)
+                    if stream.pending >= ZIP_FLUSH_SIZE:
+                        yield stream.take()
+    # Fin des fichiers et répertoire central, écrit à la fermeture
+    yield stream.take()
@@ -0,0 +1,232 @@
+"""
+Synchronisation du flux matérialisé (FeedEntry).
+
+Chaque publication est recopiée dans le flux de tous les utilisateurs qui
+peuvent la voir : son auteur, les abonnés de l'auteur et, pour une
+critique, le propriétaire du billet.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from jobs.queue import enqueue_on_commit
+
+from .models import Ticket, Review, UserFollows, FeedEntry
+
+
+User = get_user_model()
+
+FANOUT_BATCH_SIZE = 1000
+# Nombre d'abonnés au-delà duquel la diffusion passe en arrière-plan
+FANOUT_INLINE_LIMIT = 200
+
+
+def _followers_of(user_id):
+    """Identifiants des abonnés d'un utilisateur."""
+    return UserFollows.objects.filter(
+        followed_user_id=user_id
+    ).values_list('user_id', flat=True)
+
+
+def _bulk_insert(entries, batch_size=FANOUT_BATCH_SIZE):
+    """Insère des entrées par lots en ignorant celles déjà présentes."""
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def post_owners(post_type, post_ids):
+    """Utilisateurs dont le flux contient l'un des posts donnés."""
+    return set(FeedEntry.objects.filter(
+        post_type=post_type, post_id__in=post_ids
+    ).values_list('owner_id', flat=True))
+
+
+def _insert_post(post_type, post, owners):
+    _bulk_insert(
+        FeedEntry(
+            owner_id=owner_id,
+            post_type=post_type,
+            post_id=post.id,
+            author_id=post.user_id,
+            time_created=post.time_created,
+        )
+        for owner_id in owners
+    )
+
+
+def fan_out_followers(post_type, post):
+    """
+    Ajoute un post au flux des abonnés de son auteur et, pour une critique,
+    du propriétaire du billet. Retourne les utilisateurs concernés.
+    """
+    owners = set(_followers_of(post.user_id))
+    if post_type == FeedEntry.REVIEW:
+        ticket_owner_id = Ticket.objects.filter(
+            id=post.ticket_id
+        ).values_list('user_id', flat=True).first()
+        if ticket_owner_id is not None:
+            owners.add(ticket_owner_id)
+    owners.discard(post.user_id)
+    _insert_post(post_type, post, owners)
+    return owners
+
+
+def fan_out(post_type, post):
+    """
+    Ajoute un nouveau post au flux de son auteur, puis à celui de son
+    audience. Au-delà de FANOUT_INLINE_LIMIT abonnés, cette seconde étape
+    est confiée à une tâche d'arrière-plan pour ne pas ralentir la requête.
+    """
+    _insert_post(post_type, post, {post.user_id})
+    if _followers_of(post.user_id).count() > FANOUT_INLINE_LIMIT:
+        enqueue_on_commit(
+            'reviews.fan_out_post',
+            {'post_type': post_type, 'post_id': post.id},
+            idempotency_key=f'fan_out:{post_type}:{post.id}',
+        )
+    else:
+        fan_out_followers(post_type, post)
+
+
+def fan_out_many(post_type, posts):
+    """
+    Ajoute des posts insérés sans signaux (import en masse) au flux de leur
+    auteur, de ses abonnés et, pour une critique, du propriétaire du billet,
+    en lisant abonnés et billets par lots. Retourne les utilisateurs dont
+    le flux a reçu un post.
+    """
+    posts = list(posts)
+    followers = defaultdict(list)
+    authors = list({post.user_id for post in posts})
+    for start in range(0, len(authors), FANOUT_BATCH_SIZE):
+        for followed_id, follower_id in UserFollows.objects.filter(
+            followed_user_id__in=authors[start:start + FANOUT_BATCH_SIZE]
+        ).values_list('followed_user_id', 'user_id'):
+            followers[followed_id].append(follower_id)
+
+    ticket_owners = {}
+    if post_type == FeedEntry.REVIEW:
+        ticket_ids = list({post.ticket_id for post in posts})
+        for start in range(0, len(ticket_ids), FANOUT_BATCH_SIZE):
+            ticket_owners.update(Ticket.objects.filter(
+                id__in=ticket_ids[start:start + FANOUT_BATCH_SIZE]
+            ).values_list('id', 'user_id'))
+
+    touched = set()
+
+    def entries():
+        for post in posts:
+            owners = {post.user_id, *followers[post.user_id]}
+            if post_type == FeedEntry.REVIEW:
+                ticket_owner_id = ticket_owners.get(post.ticket_id)
+                if ticket_owner_id is not None:
+                    owners.add(ticket_owner_id)
+            touched.update(owners)
+            for owner_id in owners:
+                yield FeedEntry(
+                    owner_id=owner_id, post_type=post_type, post_id=post.id,
+                    author_id=post.user_id, time_created=post.time_created,
+                )
+
+    _bulk_insert(entries())
+    return touched
+
+
+def remove_post(post_type, post_id):
+    """Retire un billet ou une critique de tous les flux."""
+    FeedEntry.objects.filter(post_type=post_type, post_id=post_id).delete()
+
+
+def _entries_for(owner_id, tickets, reviews):
+    """Génère les entrées de flux de owner_id pour les posts donnés."""
+    for post_id, author_id, time_created in tickets.values_list(
+        'id', 'user_id', 'time_created'
+    ).iterator(chunk_size=FANOUT_BATCH_SIZE):
+        yield FeedEntry(
+            owner_id=owner_id, post_type=FeedEntry.TICKET, post_id=post_id,
+            author_id=author_id, time_created=time_created,
+        )
+    for post_id, author_id, time_created in reviews.values_list(
+        'id', 'user_id', 'time_created'
+    ).iterator(chunk_size=FANOUT_BATCH_SIZE):
+        yield FeedEntry(
+            owner_id=owner_id, post_type=FeedEntry.REVIEW, post_id=post_id,
+            author_id=author_id, time_created=time_created,
+        )
+
+
+def backfill_follow(follower_id, followed_id):
+    """
+    Ajoute les posts d'un utilisateur au flux d'un nouvel abonné.
+    Retourne les utilisateurs dont le flux a changé (l'abonné).
+    """
+    _bulk_insert(_entries_for(
+        follower_id,
+        Ticket.objects.filter(user_id=followed_id),
+        Review.objects.filter(user_id=followed_id),
+    ))
+    return {follower_id}
+
+
+def prune_follow(follower_id, followed_id):
+    """
+    Retire les posts d'un utilisateur du flux d'un ancien abonné, sauf les
+    critiques en réponse aux billets de l'abonné qui restent visibles.
+    """
+    FeedEntry.objects.filter(
+        owner_id=follower_id, author_id=followed_id
+    ).exclude(
+        post_type=FeedEntry.REVIEW,
+        post_id__in=Review.objects.filter(
+            user_id=followed_id, ticket__user_id=follower_id
+        ).values('id')
+    ).delete()
+
+
+def rebuild_feeds(user_ids=None, batch_size=FANOUT_BATCH_SIZE):
+    """
+    Reconstruit entièrement le flux des utilisateurs donnés (tous par
+    défaut), par lots de batch_size utilisateurs.
+    Retourne le nombre d'utilisateurs traités.
+    """
+    users = User.objects.order_by('id')
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+
+    processed = 0
+    last_id = 0
+    while True:
+        chunk = list(users.filter(
+            id__gt=last_id
+        ).values_list('id', flat=True)[:batch_size])
+        if not chunk:
+            break
+        with transaction.atomic():
+            FeedEntry.objects.filter(owner_id__in=chunk).delete()
+            for owner_id in chunk:
+                visible = [owner_id, *UserFollows.objects.filter(
+                    user_id=owner_id
+                ).values_list('followed_user_id', flat=True)]
+                _bulk_insert(_entries_for(
+                    owner_id,
+                    Ticket.objects.filter(user_id__in=visible),
+                    Review.objects.filter(user_id__in=visible),
+                ), batch_size)
+                # Critiques d'inconnus en réponse aux billets de owner_id
+                _bulk_insert(_entries_for(
+                    owner_id,
+                    Ticket.objects.none(),
+                    Review.objects.filter(
+                        ticket__user_id=owner_id
+                    ).exclude(user_id__in=visible),
+                ), batch_size)
+        processed += len(chunk)
+        last_id = chunk[-1]
+    return processed
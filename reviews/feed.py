@@ -0,0 +1,253 @@
+"""
+Pagination par curseur du flux fusionné de billets et critiques.
+
+Le flux est trié par (time_created, type, id) décroissants. La base de
+données ne renvoie que la page demandée, soit en fusionnant les billets et
+les critiques avec une requête UNION, soit en lisant le flux matérialisé
+(FeedEntry) : le coût d'une page ne dépend pas de la taille de l'historique.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import CharField, Q, Value
+
+TICKET = 'TICKET'
+REVIEW = 'REVIEW'
+POST_TYPES = (TICKET, REVIEW)
+
+FEED_PAGE_SIZE = 20
+# Première page du flux, plus courte pour un affichage rapide
+FEED_FIRST_PAGE_SIZE = 10
+
+
+def encode_cursor(time_created, post_type, post_id):
+    """Encode la position d'un post en curseur opaque pour l'URL."""
+    raw = f"{time_created.isoformat()}|{post_type}|{post_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """
+    Décode un curseur produit par encode_cursor.
+    Retourne None si le curseur est absent ou invalide.
+    """
+    if not value:
+        return None
+    try:
+        padding = '=' * (-len(value) % 4)
+        raw = base64.urlsafe_b64decode(value + padding).decode()
+        time_created, post_type, post_id = raw.split('|')
+        cursor = (
+            datetime.fromisoformat(time_created),
+            post_type,
+            int(post_id),
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if cursor[1] not in POST_TYPES:
+        return None
+    return cursor
+
+
+def _keyset_filter(post_type, cursor, backward):
+    """
+    Construit la condition keyset d'une sous-requête de type post_type.
+    Le type étant constant dans chaque sous-requête, la comparaison du
+    triplet (time_created, type, id) se simplifie.
+    """
+    time_created, cursor_type, cursor_id = cursor
+    if backward:
+        condition = Q(time_created__gt=time_created)
+        if post_type > cursor_type:
+            condition |= Q(time_created=time_created)
+        elif post_type == cursor_type:
+            condition |= Q(time_created=time_created, id__gt=cursor_id)
+    else:
+        condition = Q(time_created__lt=time_created)
+        if post_type < cursor_type:
+            condition |= Q(time_created=time_created)
+        elif post_type == cursor_type:
+            condition |= Q(time_created=time_created, id__lt=cursor_id)
+    return condition
+
+
+def _entries_keyset_filter(cursor, backward):
+    """Condition keyset sur un flux matérialisé (type variable)."""
+    time_created, cursor_type, cursor_id = cursor
+    lookup = 'gt' if backward else 'lt'
+    return (
+        Q(**{f'time_created__{lookup}': time_created})
+        | Q(time_created=time_created, **{f'post_type__{lookup}': cursor_type})
+        | Q(
+            time_created=time_created,
+            post_type=cursor_type,
+            **{f'post_id__{lookup}': cursor_id}
+        )
+    )
+
+
+def _ordering(backward, id_field='id'):
+    """Ordre total du flux, inversé pour remonter vers les posts récents."""
+    if backward:
+        return ('time_created', 'post_type', id_field)
+    return ('-time_created', '-post_type', f'-{id_field}')
+
+
+def page_rows(rows, page_size, cursor, backward):
+    """
+    Découpe une page dans les page_size + 1 lignes (time_created, type, id)
+    lues après le curseur et calcule les curseurs des pages voisines.
+    Retourne (lignes dans l'ordre du flux, curseur suivant, précédent).
+    """
+    rows = list(rows)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backward:
+        rows.reverse()
+
+    # En remontant le flux, la page suivante existe forcément (on en vient)
+    if backward:
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, cursor is not None
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if has_next:
+            next_cursor = encode_cursor(*rows[-1])
+        if has_previous:
+            previous_cursor = encode_cursor(*rows[0])
+    return rows, next_cursor, previous_cursor
+
+
+def load_posts(keys, tickets, reviews):
+    """
+    Charge les posts désignés par des clés (type, id), dans l'ordre des
+    clés, depuis les querysets tickets et reviews, et les annote de
+    content_type. Les posts disparus entre-temps sont omis.
+    """
+    # Charger uniquement les objets de la page, en deux requêtes par clé
+    # primaire (sans le tri par défaut, inutile ici)
+    ticket_ids = [post_id for kind, post_id in keys if kind == TICKET]
+    review_ids = [post_id for kind, post_id in keys if kind == REVIEW]
+    loaded = {
+        TICKET: tickets.order_by().in_bulk(ticket_ids) if ticket_ids else {},
+        REVIEW: reviews.order_by().in_bulk(review_ids) if review_ids else {},
+    }
+
+    posts = []
+    for kind, post_id in keys:
+        post = loaded[kind].get(post_id)
+        if post is not None:
+            post.content_type = kind
+            posts.append(post)
+    return posts
+
+
+def _build_page(rows, page_size, cursor, backward, tickets, reviews):
+    """
+    Charge les posts d'une page de lignes (time_created, type, id) et
+    calcule les curseurs des pages voisines.
+    """
+    rows, next_cursor, previous_cursor = page_rows(
+        rows, page_size, cursor, backward
+    )
+    posts = load_posts(
+        [(kind, post_id) for _, kind, post_id in rows], tickets, reviews
+    )
+
+    return {
+        'posts': posts,
+        'next_cursor': next_cursor,
+        'previous_cursor': previous_cursor,
+    }
+
+
+def union_rows(tickets, reviews, cursor=None, backward=False):
+    """
+    Lignes (time_created, type, id) du flux fusionné des querysets tickets
+    et reviews après le curseur, dans l'ordre de lecture (requête UNION à
+    découper).
+    """
+    streams = []
+    for queryset, post_type in ((tickets, TICKET), (reviews, REVIEW)):
+        if cursor:
+            queryset = queryset.filter(
+                _keyset_filter(post_type, cursor, backward)
+            )
+        streams.append(
+            queryset.annotate(
+                post_type=Value(post_type, output_field=CharField())
+            ).values_list('time_created', 'post_type', 'id').order_by()
+        )
+
+    return streams[0].union(streams[1], all=True).order_by(
+        *_ordering(backward)
+    )
+
+
+def entry_rows(entries, cursor=None, backward=False):
+    """
+    Lignes (time_created, type, id) d'un flux matérialisé (queryset de
+    FeedEntry) après le curseur, dans l'ordre de lecture.
+    """
+    if cursor:
+        entries = entries.filter(_entries_keyset_filter(cursor, backward))
+    return entries.order_by(*_ordering(backward, 'post_id')).values_list(
+        'time_created', 'post_type', 'post_id'
+    )
+
+
+def paginate_posts(tickets, reviews, cursor=None, backward=False,
+                   page_size=FEED_PAGE_SIZE):
+    """
+    Retourne une page du flux fusionné des querysets tickets et reviews.
+
+    Sans curseur, renvoie la première page. Avec un curseur, renvoie les
+    posts plus anciens (ou plus récents si backward est vrai). Le résultat
+    contient les posts de la page, annotés de content_type, ainsi que les
+    curseurs des pages précédente et suivante.
+    """
+    rows = union_rows(tickets, reviews, cursor, backward)
+    return _build_page(
+        rows[:page_size + 1], page_size, cursor, backward, tickets, reviews
+    )
+
+
+def paginate_entries(entries, tickets, reviews, cursor=None, backward=False,
+                     page_size=FEED_PAGE_SIZE):
+    """
+    Retourne une page d'un flux matérialisé (queryset de FeedEntry).
+    Les posts sont ensuite chargés depuis les querysets tickets et reviews.
+    """
+    rows = entry_rows(entries, cursor, backward)
+    return _build_page(
+        rows[:page_size + 1], page_size, cursor, backward, tickets, reviews
+    )
+
+
+def cursor_from_request(request):
+    """Lit les paramètres after/before : retourne (curseur, backward)."""
+    cursor = decode_cursor(request.GET.get('before'))
+    if cursor is not None:
+        return cursor, True
+    return decode_cursor(request.GET.get('after')), False
+
+
+def page_from_request(request, tickets, reviews, entries=None,
+                      page_size=FEED_PAGE_SIZE):
+    """
+    Lit les paramètres after/before de la requête et pagine le flux.
+    Si entries est fourni, la page est lue dans le flux matérialisé.
+    """
+    cursor, backward = cursor_from_request(request)
+    if entries is not None:
+        return paginate_entries(
+            entries, tickets, reviews, cursor=cursor, backward=backward,
+            page_size=page_size
+        )
+    return paginate_posts(
+        tickets, reviews, cursor=cursor, backward=backward,
+        page_size=page_size
+    )
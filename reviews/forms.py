@@ -3,6 +3,8 @@ Formulaires pour les billets, critiques et abonnements.
 """
 from django import forms
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from django.urls import reverse_lazy
 
 from .models import Ticket, Review, UserFollows
 
@@ -75,7 +77,11 @@ class FollowUserForm(forms.Form):
         widget=forms.TextInput(attrs={
             'class': 'form-control',
             'placeholder': "Nom d'utilisateur à suivre",
-            'aria-label': "Nom d'utilisateur à suivre"
+            'aria-label': "Nom d'utilisateur à suivre",
+            # Suggestions remplies par static/js/follows.js
+            'list': 'username-suggestions',
+            'autocomplete': 'off',
+            'data-search-url': reverse_lazy('user_search'),
         }),
         label="Nom d'utilisateur"
     )
@@ -83,13 +89,23 @@ class FollowUserForm(forms.Form):
     def __init__(self, *args, current_user=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.current_user = current_user
+        # Utilisateur trouvé par clean_username, réutilisé par la vue
+        self.user_to_follow = None
 
     def clean_username(self):
         username = self.cleaned_data.get('username')
 
-        # Vérifier que l'utilisateur existe
+        # Vérifier que l'utilisateur existe et savoir, dans la même
+        # requête, s'il est déjà suivi
+        users = User.objects.all()
+        if self.current_user:
+            users = users.annotate(already_followed=Exists(
+                UserFollows.objects.filter(
+                    user=self.current_user, followed_user=OuterRef('pk')
+                )
+            ))
         try:
-            user_to_follow = User.objects.get(username=username)
+            user_to_follow = users.get(username=username)
         except User.DoesNotExist:
             raise forms.ValidationError(
                 f"L'utilisateur '{username}' n'existe pas."
@@ -102,12 +118,10 @@ class FollowUserForm(forms.Form):
             )
 
         # Vérifier qu'on ne suit pas déjà cet utilisateur
-        if self.current_user and UserFollows.objects.filter(
-            user=self.current_user,
-            followed_user=user_to_follow
-        ).exists():
+        if self.current_user and user_to_follow.already_followed:
             raise forms.ValidationError(
                 f"Vous suivez déjà '{username}'."
             )
 
+        self.user_to_follow = user_to_follow
         return username
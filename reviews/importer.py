@@ -0,0 +1,443 @@
+"""
+Import en masse de billets, critiques et abonnements (commande
+import_posts).
+
+Le fichier (JSON Lines ou CSV) est lu en flux, par paquets de lignes.
+Chaque paquet est inséré avec bulk_create dans sa propre transaction, puis
+la position atteinte dans le fichier est enregistrée dans un point de
+reprise : après une erreur, l'import repart du dernier paquet validé. Les
+noms d'utilisateurs et identifiants d'origine des billets sont résolus par
+requêtes groupées, avec un cache des noms déjà vus.
+
+bulk_create n'envoie pas de signaux : dans la même transaction, chaque
+paquet recalcule les compteurs et affinités des seuls utilisateurs et
+billets qu'il touche et ajoute ses posts aux flux concernés. Le coût d'un
+import dépend de la taille du fichier, pas de celle du site.
+
+Une ligne décrit un post ou un abonnement :
+- type : ticket, review ou follow ;
+- user : nom de l'auteur (ou de l'abonné) ;
+- billet : id (identifiant d'origine, obligatoire : un paquet rejoué ne
+  duplique pas le billet), title, body, time_created, image ;
+- critique : ticket (identifiant d'origine du billet), rating, title,
+  body, time_created ;
+- abonnement : followed_user.
+Les colonnes sont celles de l'export (/posts/export/), plus user.
+"""
+import csv
+import json
+import os
+from functools import partial
+from itertools import chain
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from authentication.models import fold_username
+
+from .cache import bump_generations
+from .counters import recount
+from .fanout import backfill_follow, fan_out_many, post_owners
+from .models import Ticket, Review, UserFollows, ImportedTicket, FeedEntry
+from .ranking import rebuild_affinities
+from .synthetic import explicit_timestamps
+
+
+User = get_user_model()
+
+IMPORT_CHUNK_SIZE = 5000
+# Taille des requêtes IN (sous la limite de variables de SQLite)
+LOOKUP_BATCH_SIZE = 500
+# Au-delà, le cache des noms d'utilisateurs est vidé
+USER_CACHE_SIZE = 1_000_000
+
+TICKET_TITLE_LENGTH = Ticket._meta.get_field('title').max_length
+TICKET_BODY_LENGTH = Ticket._meta.get_field('description').max_length
+REVIEW_TITLE_LENGTH = Review._meta.get_field('headline').max_length
+REVIEW_BODY_LENGTH = Review._meta.get_field('body').max_length
+
+
+class InvalidRow(ValueError):
+    """Ligne ignorée : champ manquant ou invalide."""
+
+
+def _batches(values, size=LOOKUP_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+# ============== LECTURE ==============
+
+def read_records(path, file_format, offset=0):
+    """
+    Génère (position après la ligne, enregistrement) pour chaque ligne du
+    fichier, à partir de l'octet offset. Le fichier est lu en binaire pour
+    que les positions puissent servir de point de reprise.
+    """
+    with open(path, 'rb') as source:
+        header = None
+        if file_format == 'csv':
+            first_line = source.readline().decode('utf-8-sig')
+            header = next(csv.reader([first_line]))
+        if offset:
+            source.seek(offset)
+        position = source.tell()
+
+        def lines():
+            nonlocal position
+            for raw in source:
+                position += len(raw)
+                yield raw.decode('utf-8-sig')
+
+        if file_format == 'csv':
+            for values in csv.reader(lines()):
+                if values:
+                    yield position, dict(zip(header, values))
+        else:
+            for line in lines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Rejetée par Importer comme une ligne sans type
+                    record = {'line': line[:200]}
+                yield position, record
+
+
+def read_checkpoint(path):
+    """Point de reprise enregistré, ou None."""
+    try:
+        with open(path, encoding='utf-8') as checkpoint:
+            return json.load(checkpoint)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, state):
+    """Enregistre le point de reprise de façon atomique."""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as checkpoint:
+        json.dump(state, checkpoint)
+    os.replace(temporary, path)
+
+
+# ============== RÉSOLUTION ==============
+
+class UserResolver:
+    """
+    Résout les noms d'utilisateurs en identifiants, par requêtes groupées,
+    en gardant en cache les noms déjà résolus.
+    """
+
+    def __init__(self, create_missing=False):
+        self.create_missing = create_missing
+        self.cache = {}
+        self.created = 0
+        self._password = make_password(None)
+
+    def resolve(self, usernames):
+        """Retourne {nom: id} des noms connus (ou créés) parmi usernames."""
+        missing = {name for name in usernames if name not in self.cache}
+        if missing and len(self.cache) + len(missing) > USER_CACHE_SIZE:
+            self.cache.clear()
+            missing = set(usernames)
+        for batch in _batches(missing):
+            self.cache.update(User.objects.filter(
+                username__in=batch
+            ).values_list('username', 'id'))
+
+        unknown = [name for name in missing if name not in self.cache]
+        if unknown and self.create_missing:
+            # Comptes sans mot de passe utilisable
+            User.objects.bulk_create([
+                User(
+                    username=name,
+                    username_folded=fold_username(name),
+                    password=self._password,
+                )
+                for name in unknown
+            ], batch_size=LOOKUP_BATCH_SIZE, ignore_conflicts=True)
+            self.created += len(unknown)
+            for batch in _batches(unknown):
+                self.cache.update(User.objects.filter(
+                    username__in=batch
+                ).values_list('username', 'id'))
+
+        return {
+            name: self.cache[name] for name in usernames if name in self.cache
+        }
+
+
+def _existing_pairs(model, first, second, pairs):
+    """Couples (first, second) de pairs déjà présents dans la table."""
+    pairs = set(pairs)
+    found = set()
+    for batch in _batches(pairs, LOOKUP_BATCH_SIZE // 2):
+        found.update(model.objects.filter(**{
+            f'{first}__in': {value for value, _ in batch},
+            f'{second}__in': {value for _, value in batch},
+        }).values_list(first, second))
+    return found & pairs
+
+
+def _imported_tickets(keys):
+    """{clé d'origine: id du billet} des billets déjà importés."""
+    found = {}
+    for batch in _batches(keys):
+        found.update(ImportedTicket.objects.filter(
+            source__in=batch
+        ).values_list('source', 'ticket_id'))
+    return found
+
+
+# ============== IMPORT ==============
+
+def _text(record, *names, required=False, length=None):
+    for name in names:
+        value = record.get(name)
+        if value not in (None, ''):
+            value = str(value).strip()
+            return value[:length] if length else value
+    if required:
+        raise InvalidRow(f"{names[0]} manquant")
+    return ''
+
+
+def _time(record):
+    value = record.get('time_created')
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise InvalidRow(f"date invalide : {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _rating(record):
+    try:
+        rating = int(record.get('rating'))
+    except (TypeError, ValueError):
+        raise InvalidRow("note manquante ou invalide") from None
+    if not 0 <= rating <= 5:
+        raise InvalidRow(f"note hors de 0 à 5 : {rating}")
+    return rating
+
+
+class Importer:
+    """Importe des paquets d'enregistrements et tient les compteurs."""
+
+    def __init__(self, source, create_users=False, max_errors=20,
+                 build_feeds=True):
+        self.source = source
+        self.users = UserResolver(create_missing=create_users)
+        self.max_errors = max_errors
+        self.build_feeds = build_feeds
+        self.errors = []
+        self.counts = {
+            'tickets': 0, 'reviews': 0, 'follows': 0, 'skipped': 0,
+            'duplicates': 0, 'rejected': 0,
+        }
+
+    def _reject(self, record, reason):
+        self.counts['rejected'] += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(f"{reason} : {json.dumps(record)[:200]}")
+
+    def _key(self, record, field):
+        """Clé d'origine du billet désigné par field, ou None."""
+        source_id = record.get(field)
+        if source_id is None or str(source_id).strip() == '':
+            return None
+        return f'{self.source}:{str(source_id).strip()}'
+
+    def import_chunk(self, records):
+        """Importe une liste d'enregistrements dans une transaction."""
+        by_type = {'ticket': [], 'review': [], 'follow': []}
+        for record in records:
+            if not isinstance(record, dict):
+                record = {'value': record}
+            kind = str(record.get('type', '')).strip().lower()
+            if kind not in by_type:
+                self._reject(record, "type inconnu")
+                continue
+            by_type[kind].append(record)
+
+        usernames = {
+            str(record.get(field, '')).strip()
+            for kind, field in (
+                ('ticket', 'user'), ('review', 'user'), ('follow', 'user'),
+                ('follow', 'followed_user'),
+            )
+            for record in by_type[kind]
+        }
+        usernames.discard('')
+
+        with transaction.atomic(), explicit_timestamps(Ticket, Review):
+            user_ids = self.users.resolve(usernames)
+            self._refresh(
+                self._import_tickets(by_type['ticket'], user_ids),
+                self._import_reviews(by_type['review'], user_ids),
+                self._import_follows(by_type['follow'], user_ids),
+            )
+
+    def _refresh(self, tickets, reviews, follows):
+        """
+        Tient à jour ce que les signaux maintiendraient pour les lignes
+        insérées : compteurs et affinités des utilisateurs et billets
+        touchés, flux des auteurs, de leurs abonnés et des nouveaux abonnés,
+        puis cache des pages des flux modifiés.
+        """
+        user_ids = {post.user_id for post in chain(tickets, reviews)}
+        for follow in follows:
+            user_ids.update((follow.user_id, follow.followed_user_id))
+        ticket_ids = {review.ticket_id for review in reviews}
+        recount(user_ids=user_ids, ticket_ids=ticket_ids)
+        rebuild_affinities(viewer_ids={review.user_id for review in reviews})
+
+        # Pages des auteurs, et des flux affichant les billets critiqués
+        # (note moyenne, nombre de critiques)
+        owners = {post.user_id for post in chain(tickets, reviews)}
+        for batch in _batches(ticket_ids):
+            owners |= post_owners(FeedEntry.TICKET, batch)
+        if self.build_feeds:
+            owners |= fan_out_many(FeedEntry.TICKET, tickets)
+            owners |= fan_out_many(FeedEntry.REVIEW, reviews)
+            for follow in follows:
+                owners |= backfill_follow(
+                    follow.user_id, follow.followed_user_id
+                )
+        transaction.on_commit(partial(bump_generations, owners))
+
+    def _user_id(self, record, user_ids, field='user'):
+        user_id = user_ids.get(str(record.get(field, '')).strip())
+        if user_id is None:
+            raise InvalidRow(f"utilisateur inconnu ({field})")
+        return user_id
+
+    def _import_tickets(self, records, user_ids):
+        keys = {self._key(record, 'id') for record in records}
+        keys.discard(None)
+        # Billets importés par un paquet déjà validé (reprise)
+        known = _imported_tickets(keys)
+        tickets, sources, seen = [], [], set()
+        for record in records:
+            key = self._key(record, 'id')
+            if key in known or key in seen:
+                self.counts['skipped'] += 1
+                continue
+            try:
+                if key is None:
+                    # Sans identifiant, un paquet rejoué dupliquerait le
+                    # billet
+                    raise InvalidRow("identifiant d'origine (id) manquant")
+                tickets.append(Ticket(
+                    user_id=self._user_id(record, user_ids),
+                    title=_text(
+                        record, 'title', required=True,
+                        length=TICKET_TITLE_LENGTH
+                    ),
+                    description=_text(
+                        record, 'body', 'description',
+                        length=TICKET_BODY_LENGTH
+                    ),
+                    image=_text(record, 'image') or None,
+                    time_created=_time(record),
+                ))
+            except InvalidRow as error:
+                self._reject(record, error)
+                continue
+            sources.append(key)
+            seen.add(key)
+
+        # SQLite renvoie les identifiants créés (RETURNING)
+        Ticket.objects.bulk_create(tickets)
+        ImportedTicket.objects.bulk_create([
+            ImportedTicket(source=key, ticket_id=ticket.id)
+            for key, ticket in zip(sources, tickets)
+        ])
+        self.counts['tickets'] += len(tickets)
+        return tickets
+
+    def _import_reviews(self, records, user_ids):
+        keys = {self._key(record, 'ticket') for record in records}
+        keys.discard(None)
+        ticket_ids = _imported_tickets(keys)
+        reviews = []
+        for record in records:
+            try:
+                ticket_id = ticket_ids.get(self._key(record, 'ticket'))
+                if ticket_id is None:
+                    raise InvalidRow("billet inconnu")
+                reviews.append(Review(
+                    ticket_id=ticket_id,
+                    user_id=self._user_id(record, user_ids),
+                    rating=_rating(record),
+                    headline=_text(
+                        record, 'title', 'headline', required=True,
+                        length=REVIEW_TITLE_LENGTH
+                    ),
+                    body=_text(record, 'body', length=REVIEW_BODY_LENGTH),
+                    time_created=_time(record),
+                ))
+            except InvalidRow as error:
+                self._reject(record, error)
+
+        reviews = self._new_rows(Review, reviews, 'ticket_id', 'user_id')
+        Review.objects.bulk_create(reviews)
+        self.counts['reviews'] += len(reviews)
+        return reviews
+
+    def _import_follows(self, records, user_ids):
+        follows = []
+        for record in records:
+            try:
+                user_id = self._user_id(record, user_ids)
+                followed_id = self._user_id(
+                    record, user_ids, 'followed_user'
+                )
+            except InvalidRow as error:
+                self._reject(record, error)
+                continue
+            if user_id != followed_id:
+                follows.append(UserFollows(
+                    user_id=user_id, followed_user_id=followed_id
+                ))
+        follows = self._new_rows(
+            UserFollows, follows, 'user_id', 'followed_user_id'
+        )
+        UserFollows.objects.bulk_create(follows)
+        self.counts['follows'] += len(follows)
+        return follows
+
+    def _new_rows(self, model, rows, first, second):
+        """
+        Écarte les lignes dont le couple unique (first, second) existe déjà
+        en base ou plus haut dans le paquet (paquet rejoué, doublons du
+        fichier) : seules les lignes réellement insérées sont comptées, et
+        leurs identifiants sont renvoyés par bulk_create. Un doublon écrit
+        entre-temps par le site interrompt le paquet, repris ensuite.
+        """
+        existing = _existing_pairs(model, first, second, [
+            (getattr(row, first), getattr(row, second)) for row in rows
+        ])
+        new = []
+        for row in rows:
+            pair = (getattr(row, first), getattr(row, second))
+            if pair in existing:
+                self.counts['duplicates'] += 1
+                continue
+            existing.add(pair)
+            new.append(row)
+        return new
+
+
+def detect_format(path):
+    """Format déduit de l'extension du fichier."""
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
@@ -0,0 +1,258 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from reviews import synthetic
+from reviews.benchmarks import percentile, temporary_database
+from reviews.models import Ticket, Review, UserFollows
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les vues reviews et authentication sur un jeu de données "
+        "synthétique (base de test temporaire) et affiche, pour chacune, "
+        "les latences p50/p95/p99, le nombre de requêtes SQL et le pic "
+        "mémoire au format JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help="Abonnements par utilisateur."
+        )
+        parser.add_argument('--tickets', type=int, default=10)
+        parser.add_argument('--reviews', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--iterations', type=int, default=30,
+            help="Nombre de requêtes mesurées par vue."
+        )
+        parser.add_argument(
+            '--keep-cache', action='store_true',
+            help="Ne pas vider le cache entre deux requêtes."
+        )
+        parser.add_argument(
+            '--output',
+            help="Fichier où écrire le JSON (sortie standard par défaut)."
+        )
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            start = time.perf_counter()
+            created = synthetic.generate(
+                users=options['users'],
+                follows_per_user=options['follows'],
+                tickets_per_user=options['tickets'],
+                reviews_per_user=options['reviews'],
+                seed=options['seed'],
+            )
+            generation_s = time.perf_counter() - start
+
+            self.user = synthetic.User.objects.get(
+                id=UserFollows.objects.values_list(
+                    'user_id', flat=True
+                ).first()
+            )
+            self.other = UserFollows.objects.filter(
+                user=self.user
+            ).values_list('followed_user', flat=True).first()
+            self.client = Client()
+            self.client.force_login(self.user)
+
+            results = {}
+            for name, prepare in self.scenarios():
+                results[name] = self.measure(
+                    prepare, options['iterations'], options['keep_cache']
+                )
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'date': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'scale': {
+                    'users': options['users'],
+                    'follows_per_user': options['follows'],
+                    'tickets_per_user': options['tickets'],
+                    'reviews_per_user': options['reviews'],
+                    'seed': options['seed'],
+                },
+                'rows': created,
+                'generation_s': round(generation_s, 3),
+                'iterations': options['iterations'],
+            },
+            'views': results,
+        }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    # ---------- Scénarios ----------
+    # Chaque scénario prépare, hors mesure, ce dont la requête a besoin et
+    # retourne (client, méthode, url, données).
+
+    def scenarios(self):
+        user, client = self.user, self.client
+        anonymous = Client()
+
+        def own_ticket(i):
+            return Ticket.objects.create(user=user, title=f"Bench {i}")
+
+        def foreign_ticket(i):
+            return Ticket.objects.create(
+                user_id=self.other, title=f"Bench autre {i}"
+            )
+
+        def own_review(i):
+            return Review.objects.create(
+                user=user, ticket=foreign_ticket(i), rating=3,
+                headline=f"Bench {i}"
+            )
+
+        def second_page(i):
+            first = client.get(reverse('feed'))
+            cursor = first.context['next_cursor'] or ''
+            return client, 'get', f"{reverse('feed')}?after={cursor}", None
+
+        def follow(i):
+            target = synthetic.User.objects.create(username=f'bench_follow{i}')
+            return client, 'post', reverse('follows'), {
+                'username': target.username
+            }
+
+        def unfollow(i):
+            target = synthetic.User.objects.create(
+                username=f'bench_unfollow{i}'
+            )
+            UserFollows.objects.create(user=user, followed_user=target)
+            url = reverse('unfollow_user', args=[target.id])
+            return client, 'post', url, {}
+
+        def login(i):
+            # Nouveau client à chaque itération : un client déjà connecté
+            # serait redirigé sans vérification du mot de passe
+            return Client(), 'post', reverse('login'), {
+                'username': user.username,
+                'password': synthetic.SYNTHETIC_PASSWORD,
+            }
+
+        def signup(i):
+            signup_client = Client()
+            password = 'Bench-motdepasse-2024'
+            return signup_client, 'post', reverse('signup'), {
+                'username': f'bench_signup{i}',
+                'email': '',
+                'password1': password,
+                'password2': password,
+            }
+
+        ticket_data = {'title': "Livre mesuré", 'description': "Mesure."}
+        review_data = {
+            'headline': "Critique mesurée", 'rating': '4', 'body': ''
+        }
+
+        return [
+            ('feed', lambda i: (client, 'get', reverse('feed'), None)),
+            ('feed_page_2', second_page),
+            ('user_posts', lambda i: (
+                client, 'get', reverse('user_posts'), None
+            )),
+            ('follows', lambda i: (client, 'get', reverse('follows'), None)),
+            ('follow_user', follow),
+            ('unfollow_user', unfollow),
+            ('create_ticket', lambda i: (
+                client, 'post', reverse('create_ticket'), ticket_data
+            )),
+            ('edit_ticket', lambda i: (
+                client, 'post',
+                reverse('edit_ticket', args=[own_ticket(i).id]), ticket_data
+            )),
+            ('delete_ticket', lambda i: (
+                client, 'post',
+                reverse('delete_ticket', args=[own_ticket(i).id]), {}
+            )),
+            ('create_review', lambda i: (
+                client, 'post',
+                reverse('create_review', args=[foreign_ticket(i).id]),
+                review_data
+            )),
+            ('create_ticket_and_review', lambda i: (
+                client, 'post', reverse('create_ticket_and_review'),
+                {**ticket_data, **review_data}
+            )),
+            ('edit_review', lambda i: (
+                client, 'post',
+                reverse('edit_review', args=[own_review(i).id]), review_data
+            )),
+            ('delete_review', lambda i: (
+                client, 'post',
+                reverse('delete_review', args=[own_review(i).id]), {}
+            )),
+            ('login_page', lambda i: (
+                anonymous, 'get', reverse('login'), None
+            )),
+            ('login', login),
+            ('signup', signup),
+        ]
+
+    def measure(self, prepare, iterations, keep_cache):
+        timings, queries, statuses = [], [], set()
+        for i in range(iterations):
+            if not keep_cache:
+                cache.clear()
+            client, method, url, data = prepare(i)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(ctx.captured_queries))
+            statuses.add(response.status_code)
+
+        # Pic mémoire mesuré à part : tracemalloc ralentit l'exécution
+        if not keep_cache:
+            cache.clear()
+        client, method, url, data = prepare(iterations)
+        tracemalloc.start()
+        try:
+            getattr(client, method)(url, data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': statistics.median_low(queries),
+            'max_queries': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'status_codes': sorted(statuses),
+        }
@@ -0,0 +1,93 @@
+import json
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from reviews import synthetic
+from reviews.benchmarks import percentile, temporary_database
+from reviews.feed import FEED_FIRST_PAGE_SIZE
+from reviews.models import UserFollows
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare, sur un jeu synthétique (base de test temporaire), la "
+        "taille et le temps CPU d'une page du flux HTML et de l'API JSON "
+        "(/api/feed/), avec tous les champs ou des champs réduits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--follows', type=int, default=20)
+        parser.add_argument('--tickets', type=int, default=10)
+        parser.add_argument('--reviews', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument(
+            '--keep-cache', action='store_true',
+            help="Ne pas vider le cache entre deux requêtes."
+        )
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            synthetic.generate(
+                users=options['users'],
+                follows_per_user=options['follows'],
+                tickets_per_user=options['tickets'],
+                reviews_per_user=options['reviews'],
+                seed=options['seed'],
+            )
+            user = synthetic.User.objects.get(
+                id=UserFollows.objects.values_list(
+                    'user_id', flat=True
+                ).first()
+            )
+            client = Client()
+            client.force_login(user)
+
+            feed, api = reverse('feed'), reverse('api_feed')
+            sparse = 'time_created,user,title,headline,rating'
+            # Même nombre de posts que la première page HTML
+            first = FEED_FIRST_PAGE_SIZE
+            scenarios = [
+                ('html', feed),
+                ('api', f'{api}?limit={first}'),
+                ('api_sparse', f'{api}?limit={first}&fields={sparse}'),
+                ('api_100', f'{api}?limit=100'),
+                ('api_500', f'{api}?limit=500'),
+            ]
+            results = {
+                name: self.measure(
+                    client, url, options['iterations'],
+                    options['keep_cache']
+                )
+                for name, url in scenarios
+            }
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def measure(self, client, url, iterations, keep_cache):
+        cpu, wall, sizes = [], [], []
+        for _ in range(iterations):
+            if not keep_cache:
+                cache.clear()
+            start_cpu, start = time.process_time(), time.perf_counter()
+            response = client.get(url)
+            # Le corps d'une réponse en flux n'est produit qu'à la lecture
+            body = (
+                b''.join(response.streaming_content)
+                if response.streaming else response.content
+            )
+            cpu.append((time.process_time() - start_cpu) * 1000)
+            wall.append((time.perf_counter() - start) * 1000)
+            sizes.append(len(body))
+        return {
+            'bytes': statistics.median_low(sizes),
+            'cpu_p50_ms': round(percentile(cpu, 50), 3),
+            'cpu_p95_ms': round(percentile(cpu, 95), 3),
+            'wall_p50_ms': round(percentile(wall, 50), 3),
+        }
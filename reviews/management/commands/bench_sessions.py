@@ -0,0 +1,90 @@
+import json
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from reviews import synthetic
+from reviews.benchmarks import percentile, temporary_database
+from reviews.models import UserFollows
+
+
+SESSION_MODES = ('db', 'cached_db', 'signed_cookies')
+BACKENDS = {
+    'model': 'django.contrib.auth.backends.ModelBackend',
+    'cached': 'authentication.backends.CachedModelBackend',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure, sur un jeu synthétique (base de test temporaire), les "
+        "requêtes SQL et la latence d'une page du flux déjà en cache pour "
+        "chaque stockage des sessions, avec et sans utilisateur en cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--follows', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            synthetic.generate(
+                users=options['users'],
+                follows_per_user=options['follows'],
+                tickets_per_user=5,
+                reviews_per_user=5,
+                seed=options['seed'],
+            )
+            user = synthetic.User.objects.get(
+                id=UserFollows.objects.values_list(
+                    'user_id', flat=True
+                ).first()
+            )
+            results = {}
+            for mode in SESSION_MODES:
+                for name, backend in BACKENDS.items():
+                    with override_settings(
+                        SESSION_ENGINE=(
+                            f'django.contrib.sessions.backends.{mode}'
+                        ),
+                        AUTHENTICATION_BACKENDS=[backend],
+                    ):
+                        results[f'{mode}+{name}'] = self.measure(
+                            user, options['iterations']
+                        )
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def measure(self, user, iterations):
+        cache.clear()
+        client = Client()
+        client.force_login(user)
+        url = reverse('feed')
+        # Page, session et utilisateur mis en cache par la première requête
+        client.get(url)
+
+        wall = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(iterations):
+                start = time.perf_counter()
+                client.get(url)
+                wall.append((time.perf_counter() - start) * 1000)
+        sql = [query['sql'] for query in queries]
+        return {
+            'queries_per_request': len(sql) / iterations,
+            'session_queries': sum(
+                'django_session' in query for query in sql
+            ) / iterations,
+            'user_queries': sum(
+                'FROM "authentication_user"' in query for query in sql
+            ) / iterations,
+            'wall_p50_ms': round(percentile(wall, 50), 3),
+            'wall_p95_ms': round(percentile(wall, 95), 3),
+        }
@@ -0,0 +1,193 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from litrevu.sqlite import PRODUCTION_PRAGMAS
+from reviews.benchmarks import percentile
+
+
+# Réglages par défaut de Django : journal classique, transactions
+# différées, une connexion par requête, 5 s d'attente sur un verrou.
+PROFILES = {
+    'défaut': {
+        'pragmas': {},
+        'begin': 'BEGIN',
+        'persistent': False,
+    },
+    'production': {
+        'pragmas': PRODUCTION_PRAGMAS,
+        'begin': 'BEGIN IMMEDIATE',
+        'persistent': True,
+    },
+}
+DEFAULT_TIMEOUT = 5.0
+USERS = 1000
+
+
+def connect(path, profile):
+    conn = sqlite3.connect(
+        path, timeout=DEFAULT_TIMEOUT, isolation_level=None
+    )
+    for name, value in profile['pragmas'].items():
+        conn.execute(f'PRAGMA {name}={value}')
+    return conn
+
+
+def setup(path, profile, rows):
+    """Crée une table proche de reviews_ticket et la remplit."""
+    conn = connect(path, profile)
+    conn.execute(
+        'CREATE TABLE post (id INTEGER PRIMARY KEY, user_id INTEGER, '
+        'title TEXT, time_created REAL)'
+    )
+    conn.execute(
+        'CREATE INDEX post_user_time ON post (user_id, time_created)'
+    )
+    rng = random.Random(0)
+    conn.execute('BEGIN')
+    conn.executemany(
+        'INSERT INTO post (user_id, title, time_created) VALUES (?, ?, ?)',
+        ((rng.randrange(USERS), f'Livre {i}', rng.random() * 1e6)
+         for i in range(rows))
+    )
+    conn.execute('COMMIT')
+    conn.close()
+
+
+def read(conn, rng):
+    followed = rng.sample(range(USERS), 20)
+    conn.execute(
+        'SELECT id, title, time_created FROM post WHERE user_id IN ({}) '
+        'ORDER BY time_created DESC LIMIT 20'.format(
+            ', '.join('?' * len(followed))
+        ),
+        followed,
+    ).fetchall()
+
+
+def write(conn, rng, begin):
+    # Lecture puis écriture dans la même transaction, comme un
+    # get_or_create ou la diffusion d'un post
+    user_id = rng.randrange(USERS)
+    conn.execute(begin)
+    try:
+        conn.execute(
+            'SELECT COUNT(*) FROM post WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        conn.execute(
+            'INSERT INTO post (user_id, title, time_created) '
+            'VALUES (?, ?, ?)',
+            (user_id, 'Nouveau', time.time()),
+        )
+        conn.execute('COMMIT')
+    except sqlite3.OperationalError:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def worker(path, profile_name, writer, start_at, seconds, seed):
+    """Boucle d'un processus ; retourne ses latences et erreurs."""
+    profile = PROFILES[profile_name]
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    conn = connect(path, profile) if profile['persistent'] else None
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + seconds
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            current = conn or connect(path, profile)
+            try:
+                if writer:
+                    write(current, rng, profile['begin'])
+                else:
+                    read(current, rng)
+            finally:
+                if conn is None:
+                    current.close()
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    if conn is not None:
+        conn.close()
+    return writer, latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit de lecteurs et d'écrivains concurrents (plusieurs "
+        "processus) sur une base SQLite temporaire, avec les réglages par "
+        "défaut puis avec le profil de production (litrevu/sqlite.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=6,
+                            help="Processus lecteurs.")
+        parser.add_argument('--writers', type=int, default=2,
+                            help="Processus écrivains.")
+        parser.add_argument('--seconds', type=float, default=5.0,
+                            help="Durée de chaque mesure.")
+        parser.add_argument('--rows', type=int, default=100000,
+                            help="Lignes initiales de la table.")
+
+    def handle(self, *args, **options):
+        results = {}
+        for name, profile in PROFILES.items():
+            directory = tempfile.mkdtemp(prefix='litrevu-bench-')
+            try:
+                path = os.path.join(directory, 'bench.sqlite3')
+                setup(path, profile, options['rows'])
+                results[name] = self.run_profile(path, name, options)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            self.report(name, results[name], options['seconds'])
+
+        baseline, tuned = results['défaut'], results['production']
+        for kind, label in (('reads', 'lectures'), ('writes', 'écritures')):
+            if baseline[kind]:
+                gain = len(tuned[kind]) / len(baseline[kind])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Débit des {label} : x{gain:.2f}"
+                ))
+
+    def run_profile(self, path, name, options):
+        total = options['readers'] + options['writers']
+        start_at = time.time() + 1
+        args = [
+            (path, name, index < options['writers'], start_at,
+             options['seconds'], index)
+            for index in range(total)
+        ]
+        with multiprocessing.Pool(total) as pool:
+            outcomes = pool.starmap(worker, args)
+
+        result = {'reads': [], 'writes': [], 'errors': 0}
+        for writer, latencies, errors in outcomes:
+            result['writes' if writer else 'reads'].extend(latencies)
+            result['errors'] += errors
+        return result
+
+    def report(self, name, result, seconds):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nProfil {name}"))
+        for kind, label in (('reads', 'lectures'), ('writes', 'écritures')):
+            latencies = result[kind]
+            if not latencies:
+                self.stdout.write(f"  {label} : aucune")
+                continue
+            self.stdout.write(
+                f"  {label:<10} {len(latencies) / seconds:>9.0f} /s   "
+                f"p50 {percentile(latencies, 50):7.2f} ms   "
+                f"p99 {percentile(latencies, 99):7.2f} ms"
+            )
+        self.stdout.write(f"  erreurs « database is locked » : "
+                          f"{result['errors']}")
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from litrevu.images import process_upload
+from reviews.models import Ticket
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère les variantes redimensionnées (WebP) des images de billets "
+        "et des photos de profil qui n'en ont pas encore."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Régénérer aussi les variantes déjà présentes."
+        )
+
+    def handle(self, *args, **options):
+        targets = [
+            (Ticket, 'image', 'image_variants_ready', 'image_width'),
+            (
+                get_user_model(), 'profile_photo',
+                'profile_photo_variants_ready', 'profile_photo_width'
+            ),
+        ]
+        for model, field_name, flag_name, width_name in targets:
+            queryset = model.objects.exclude(
+                **{f'{field_name}__isnull': True}
+            ).exclude(**{field_name: ''}).only(
+                'pk', field_name, flag_name, width_name
+            )
+            if not options['all']:
+                queryset = queryset.filter(**{flag_name: False})
+
+            done = failed = 0
+            for instance in queryset.iterator(chunk_size=200):
+                if process_upload(
+                    instance, field_name, flag_name, width_name
+                ):
+                    done += 1
+                else:
+                    failed += 1
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural} : {done} traité(s), "
+                f"{failed} en erreur."
+            )
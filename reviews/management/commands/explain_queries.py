@@ -0,0 +1,159 @@
+import re
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from reviews import synthetic
+from reviews.benchmarks import temporary_database
+from reviews.models import Ticket, Review, UserFollows
+
+
+# Index et contraintes ajoutés pour les requêtes des vues
+TUNED_INDEXES = [
+    (Ticket, 'ticket_user_time_idx'),
+    (Review, 'review_user_time_idx'),
+    (UserFollows, 'follows_followed_user_idx'),
+]
+TUNED_CONSTRAINTS = [
+    (Review, 'unique_review_ticket_user'),
+]
+# Requête lisant une table de l'application (le nom de colonne
+# reviews_count de la table des utilisateurs ne compte pas)
+READS_REVIEWS_TABLE = re.compile(r'\b(?:FROM|JOIN)\s+"?reviews_', re.I)
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche EXPLAIN QUERY PLAN et le temps des requêtes de chaque vue "
+        "sur un jeu de données synthétique, avec puis sans les index "
+        "composites. Utilise une base de test temporaire."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=30)
+        parser.add_argument('--tickets', type=int, default=20)
+        parser.add_argument('--reviews', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help="Nombre d'exécutions par requête pour la mesure du temps."
+        )
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            self.stdout.write("Génération du jeu de données...")
+            created = synthetic.generate(
+                users=options['users'],
+                follows_per_user=options['follows'],
+                tickets_per_user=options['tickets'],
+                reviews_per_user=options['reviews'],
+                seed=options['seed'],
+            )
+            self.stdout.write(", ".join(
+                f"{count} {name}" for name, count in created.items()
+            ))
+
+            user = synthetic.User.objects.get(
+                id=UserFollows.objects.values_list(
+                    'user_id', flat=True
+                ).first()
+            )
+            ticket = Ticket.objects.exclude(user=user).first()
+            views = [
+                ('feed', reverse('feed')),
+                ('user_posts', reverse('user_posts')),
+                ('follows', reverse('follows')),
+                ('create_review', reverse('create_review', args=[ticket.id])),
+            ]
+
+            after = self.measure(user, views, options['repeat'])
+            self.drop_tuned_indexes()
+            before = self.measure(user, views, options['repeat'])
+            self.report(views, before, after)
+
+    def drop_tuned_indexes(self):
+        # Les contraintes d'abord : SQLite reconstruit la table à partir des
+        # métadonnées du modèle, privées le temps de l'opération de la
+        # contrainte retirée. Les index recréés sont supprimés ensuite.
+        with connection.schema_editor() as editor:
+            for model, name in TUNED_CONSTRAINTS:
+                constraints = model._meta.constraints
+                constraint = next(c for c in constraints if c.name == name)
+                model._meta.constraints = [
+                    c for c in constraints if c is not constraint
+                ]
+                try:
+                    editor.remove_constraint(model, constraint)
+                finally:
+                    model._meta.constraints = constraints
+            for model, name in TUNED_INDEXES:
+                index = next(
+                    i for i in model._meta.indexes if i.name == name
+                )
+                editor.remove_index(model, index)
+
+    def measure(self, user, views, repeat):
+        """Capture les requêtes de chaque vue, leur plan et leur durée."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        client = Client()
+        client.force_login(user)
+        results = {}
+        for name, url in views:
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                client.get(url)
+
+            queries = []
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                # Ignorer la session et l'utilisateur connecté
+                if not sql.startswith('SELECT') or not (
+                    READS_REVIEWS_TABLE.search(sql)
+                ):
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plan = [row[-1] for row in cursor.fetchall()]
+                    timings = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        cursor.execute(sql)
+                        cursor.fetchall()
+                        timings.append((time.perf_counter() - start) * 1000)
+                queries.append({
+                    'sql': sql,
+                    'plan': plan,
+                    'ms': statistics.median(timings),
+                })
+            results[name] = queries
+        return results
+
+    def report(self, views, before, after):
+        for name, _ in views:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {name} =="))
+            pairs = zip(before[name], after[name])
+            for number, (old, new) in enumerate(pairs, start=1):
+                sql = new['sql']
+                if len(sql) > 160:
+                    sql = sql[:157] + '...'
+                self.stdout.write(f"\n[{number}] {sql}")
+                self.stdout.write("  Plan sans les index composites :")
+                for line in old['plan']:
+                    self.stdout.write(f"    {line}")
+                self.stdout.write("  Plan avec les index composites :")
+                for line in new['plan']:
+                    self.stdout.write(f"    {line}")
+                self.stdout.write(
+                    f"  Médiane : {old['ms']:.3f} ms -> {new['ms']:.3f} ms"
+                )
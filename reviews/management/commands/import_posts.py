@@ -0,0 +1,118 @@
+import itertools
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.importer import (
+    IMPORT_CHUNK_SIZE, Importer, detect_format, read_checkpoint,
+    read_records, write_checkpoint,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe en masse des billets, critiques et abonnements depuis un "
+        "fichier JSON Lines ou CSV, par paquets transactionnels, avec "
+        "reprise après erreur."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .jsonl ou .csv à importer.")
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help="Format du fichier (déduit de l'extension par défaut)."
+        )
+        parser.add_argument(
+            '--source', default='import',
+            help="Nom du site d'origine, préfixe des identifiants de billets."
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=IMPORT_CHUNK_SIZE,
+            help="Nombre de lignes par transaction."
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help="Fichier du point de reprise (<fichier>.checkpoint par "
+                 "défaut)."
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Ignorer le point de reprise et repartir du début."
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help="Créer les utilisateurs inconnus (sans mot de passe)."
+        )
+        parser.add_argument(
+            '--no-feeds', action='store_true',
+            help="Ne pas remplir les flux (lancer rebuild_feed ensuite)."
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f"Fichier introuvable : {path}")
+        file_format = options['format'] or detect_format(path)
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+
+        state = None if options['restart'] else read_checkpoint(
+            checkpoint_path
+        )
+        if state and state.get('source') != options['source']:
+            raise CommandError(
+                f"Le point de reprise {checkpoint_path} concerne la source "
+                f"« {state.get('source')} » : utilisez --restart."
+            )
+        offset = state['offset'] if state else 0
+        rows = state['rows'] if state else 0
+        if offset:
+            self.stdout.write(
+                f"Reprise après {rows} lignes (octet {offset})."
+            )
+
+        importer = Importer(
+            options['source'], create_users=options['create_users'],
+            build_feeds=not options['no_feeds'],
+        )
+        records = read_records(path, file_format, offset)
+        start = time.perf_counter()
+        imported = 0
+        while True:
+            chunk = list(itertools.islice(records, options['chunk_size']))
+            if not chunk:
+                break
+            importer.import_chunk([record for _, record in chunk])
+
+            # Paquet validé : la reprise commencera après lui
+            offset = chunk[-1][0]
+            rows += len(chunk)
+            imported += len(chunk)
+            write_checkpoint(checkpoint_path, {
+                'source': options['source'], 'offset': offset, 'rows': rows,
+            })
+            self.progress(imported, time.perf_counter() - start)
+
+        seconds = time.perf_counter() - start
+        for error in importer.errors:
+            self.stderr.write(self.style.WARNING(error))
+        counts = importer.counts
+        self.stdout.write(self.style.SUCCESS(
+            f"{imported} lignes lues en {seconds:.2f} s : "
+            f"{counts['tickets']} billets, {counts['reviews']} critiques, "
+            f"{counts['follows']} abonnements, {counts['skipped']} billets "
+            f"déjà importés, {counts['duplicates']} doublons ignorés, "
+            f"{counts['rejected']} lignes rejetées, "
+            f"{importer.users.created} utilisateurs créés."
+        ))
+
+        # Import terminé : plus rien à reprendre
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    def progress(self, rows, seconds):
+        rate = rows / seconds if seconds else 0
+        self.stdout.write(
+            f"{rows:>10} lignes en {seconds:7.2f} s "
+            f"({rate:,.0f} lignes/s)".replace(',', ' ')
+        )
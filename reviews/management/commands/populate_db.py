@@ -1,13 +1,85 @@
-
 from django.core.management.base import BaseCommand
-from populate_db import main as populate_main
+
+from reviews import demo, synthetic
 
 
 class Command(BaseCommand):
     help = (
-        "Remplit la base de données avec des données de test "
-        "(utilisateurs, billets, critiques, abonnements)."
+        "Remplit la base de données avec les comptes de démonstration et, "
+        "avec --users, un jeu de données synthétique de la taille voulue "
+        "(utilisateurs, abonnements, billets, critiques)."
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=0,
+            help="Nombre d'utilisateurs synthétiques à générer."
+        )
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=10,
+            help="Nombre moyen d'abonnements (loi de puissance)."
+        )
+        parser.add_argument('--tickets', type=int, default=5,
+                            help="Billets par utilisateur.")
+        parser.add_argument('--reviews', type=int, default=5,
+                            help="Critiques par utilisateur.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=synthetic.BATCH_SIZE,
+            help="Nombre de lignes insérées par requête."
+        )
+        parser.add_argument(
+            '--no-feeds',
+            action='store_true',
+            help="Ne pas reconstruire les flux (lancer rebuild_feed ensuite)."
+        )
+        parser.add_argument(
+            '--no-demo',
+            action='store_true',
+            help="Ne pas créer les comptes de démonstration."
+        )
+
     def handle(self, *args, **options):
-        populate_main()
+        if not options['no_demo']:
+            self.stdout.write(
+                self.style.MIGRATE_HEADING("Données de démonstration")
+            )
+            demo.create_demo_data(log=self.stdout.write)
+
+        if options['users']:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"Jeu synthétique de {options['users']} utilisateurs "
+                f"(graine {options['seed']})"
+            ))
+            synthetic.generate(
+                users=options['users'],
+                follows_per_user=options['follows'],
+                tickets_per_user=options['tickets'],
+                reviews_per_user=options['reviews'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                build_feeds=not options['no_feeds'],
+                progress=self.progress,
+            )
+            self.stdout.write(
+                f"Mot de passe des comptes synthétiques : "
+                f"{synthetic.SYNTHETIC_PASSWORD}"
+            )
+
+        if not options['no_demo']:
+            self.stdout.write("\nComptes de démonstration :")
+            for label, username, password in demo.ACCOUNTS:
+                self.stdout.write(f"{label + ':':<10}{username} / {password}")
+
+    def progress(self, step, rows, seconds):
+        rate = rows / seconds if seconds else 0
+        self.stdout.write(
+            f"{step:<8} {rows:>10} lignes en {seconds:7.2f} s "
+            f"({rate:,.0f} lignes/s)".replace(',', ' ')
+        )
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.ranking import rebuild_affinities
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule en masse l'affinité de chaque lecteur pour les auteurs "
+        "dont il a critiqué les billets (flux « À la une »)."
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = rebuild_affinities()
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} affinités recalculées en "
+            f"{time.perf_counter() - start:.2f} s."
+        ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.fanout import FANOUT_BATCH_SIZE, rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit le flux matérialisé (FeedEntry) de tous les "
+        "utilisateurs, par lots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=FANOUT_BATCH_SIZE,
+            help="Nombre d'utilisateurs et d'entrées traités par lot."
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help="Limiter la reconstruction à cet identifiant (répétable)."
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = rebuild_feeds(
+            user_ids=options['user_ids'],
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} flux reconstruits en "
+            f"{time.perf_counter() - start:.2f} s."
+        ))
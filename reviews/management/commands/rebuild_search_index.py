@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit l'index plein texte (FTS5) des billets et critiques "
+        "à partir des tables, en masse."
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} posts indexés en "
+            f"{time.perf_counter() - start:.2f} s."
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.counters import recount
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule en masse les compteurs dénormalisés des utilisateurs "
+        "et des billets et affiche les lignes qui avaient dérivé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Afficher la dérive sans corriger les compteurs."
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        drift = recount(fix=not options['check'])
+        for label, count in drift.items():
+            style = self.style.WARNING if count else self.style.SUCCESS
+            self.stdout.write(style(f"{label} : {count} ligne(s) en dérive"))
+        action = "vérifiés" if options['check'] else "recalculés"
+        self.stdout.write(
+            f"Compteurs {action} en {time.perf_counter() - start:.2f} s."
+        )
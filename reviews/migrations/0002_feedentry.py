@@ -0,0 +1,95 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:02
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def populate_feeds(apps, schema_editor):
+    """
+    Remplit le flux matérialisé depuis les posts et abonnements existants :
+    chaque post va dans le flux de son auteur et de ses abonnés, et chaque
+    critique aussi dans celui du propriétaire du billet.
+    """
+    db_alias = schema_editor.connection.alias
+    FeedEntry = apps.get_model('reviews', 'FeedEntry')
+    Ticket = apps.get_model('reviews', 'Ticket')
+    Review = apps.get_model('reviews', 'Review')
+    UserFollows = apps.get_model('reviews', 'UserFollows')
+
+    followers = defaultdict(list)
+    for follower_id, followed_id in UserFollows.objects.using(
+        db_alias
+    ).values_list('user_id', 'followed_user_id').iterator():
+        followers[followed_id].append(follower_id)
+
+    def entries():
+        for post_id, author_id, time_created in Ticket.objects.using(
+            db_alias
+        ).values_list('id', 'user_id', 'time_created').iterator(
+            chunk_size=BATCH_SIZE
+        ):
+            for owner_id in {author_id, *followers.get(author_id, ())}:
+                yield FeedEntry(
+                    owner_id=owner_id, post_type='TICKET', post_id=post_id,
+                    author_id=author_id, time_created=time_created,
+                )
+        for post_id, author_id, ticket_owner_id, time_created in (
+            Review.objects.using(db_alias).values_list(
+                'id', 'user_id', 'ticket__user_id', 'time_created'
+            ).iterator(chunk_size=BATCH_SIZE)
+        ):
+            owners = {author_id, ticket_owner_id}
+            owners.update(followers.get(author_id, ()))
+            for owner_id in owners:
+                yield FeedEntry(
+                    owner_id=owner_id, post_type='REVIEW', post_id=post_id,
+                    author_id=author_id, time_created=time_created,
+                )
+
+    batch = []
+    for entry in entries():
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            FeedEntry.objects.using(db_alias).bulk_create(
+                batch, ignore_conflicts=True
+            )
+            batch = []
+    if batch:
+        FeedEntry.objects.using(db_alias).bulk_create(
+            batch, ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_type', models.CharField(choices=[('TICKET', 'Billet'), ('REVIEW', 'Critique')], max_length=6)),
+                ('post_id', models.PositiveBigIntegerField()),
+                ('time_created', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Entrée de flux',
+                'verbose_name_plural': 'Entrées de flux',
+                'ordering': ['-time_created'],
+                'indexes': [models.Index(fields=['owner', '-time_created', '-post_type', '-post_id'], name='feed_owner_time_idx'), models.Index(fields=['post_type', 'post_id'], name='feed_post_idx'), models.Index(fields=['owner', 'author'], name='feed_owner_author_idx')],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'post_type', 'post_id'), name='unique_feed_entry')],
+            },
+        ),
+        migrations.RunPython(populate_feeds, migrations.RunPython.noop),
+    ]
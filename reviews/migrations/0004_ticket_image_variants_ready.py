@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='image_variants_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
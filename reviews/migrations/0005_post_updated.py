@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_ticket_image_variants_ready'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """Initialise les compteurs à partir des données existantes."""
+    User = apps.get_model('authentication', 'User')
+    Ticket = apps.get_model('reviews', 'Ticket')
+    Review = apps.get_model('reviews', 'Review')
+    UserFollows = apps.get_model('reviews', 'UserFollows')
+
+    def subquery(queryset, group_by, aggregate):
+        return Coalesce(Subquery(
+            queryset.filter(**{group_by: OuterRef('pk')}).order_by().values(
+                group_by
+            ).annotate(value=aggregate).values('value')[:1]
+        ), Value(0))
+
+    User.objects.update(
+        followers_count=subquery(
+            UserFollows.objects, 'followed_user', Count('*')
+        ),
+        following_count=subquery(UserFollows.objects, 'user', Count('*')),
+        tickets_count=subquery(Ticket.objects, 'user', Count('*')),
+        reviews_count=subquery(Review.objects, 'user', Count('*')),
+    )
+    Ticket.objects.update(
+        review_count=subquery(Review.objects, 'ticket', Count('*')),
+        rating_sum=subquery(Review.objects, 'ticket', Sum('rating')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_counters'),
+        ('reviews', '0005_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Index plein texte FTS5 des billets et critiques
+
+from django.db import migrations
+
+
+# Identifiant de ligne : 2 * id pour un billet, 2 * id + 1 pour une critique
+CREATE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE reviews_search USING fts5(
+        title, body, user_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER reviews_search_ticket_insert
+    AFTER INSERT ON reviews_ticket BEGIN
+        INSERT INTO reviews_search (rowid, title, body, user_id)
+        VALUES (NEW.id * 2, NEW.title, NEW.description, NEW.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER reviews_search_ticket_update
+    AFTER UPDATE OF title, description, user_id ON reviews_ticket BEGIN
+        UPDATE reviews_search
+        SET title = NEW.title, body = NEW.description, user_id = NEW.user_id
+        WHERE rowid = NEW.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER reviews_search_ticket_delete
+    AFTER DELETE ON reviews_ticket BEGIN
+        DELETE FROM reviews_search WHERE rowid = OLD.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER reviews_search_review_insert
+    AFTER INSERT ON reviews_review BEGIN
+        INSERT INTO reviews_search (rowid, title, body, user_id)
+        VALUES (NEW.id * 2 + 1, NEW.headline, NEW.body, NEW.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER reviews_search_review_update
+    AFTER UPDATE OF headline, body, user_id ON reviews_review BEGIN
+        UPDATE reviews_search
+        SET title = NEW.headline, body = NEW.body, user_id = NEW.user_id
+        WHERE rowid = NEW.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER reviews_search_review_delete
+    AFTER DELETE ON reviews_review BEGIN
+        DELETE FROM reviews_search WHERE rowid = OLD.id * 2 + 1;
+    END
+    """,
+    # Indexer les billets et critiques existants
+    """
+    INSERT INTO reviews_search (rowid, title, body, user_id)
+    SELECT id * 2, title, description, user_id FROM reviews_ticket
+    """,
+    """
+    INSERT INTO reviews_search (rowid, title, body, user_id)
+    SELECT id * 2 + 1, headline, body, user_id FROM reviews_review
+    """,
+]
+
+DROP_INDEX = [
+    f'DROP TRIGGER reviews_search_{table}_{event}'
+    for table in ('ticket', 'review')
+    for event in ('insert', 'update', 'delete')
+] + ['DROP TABLE reviews_search']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_counters'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_INDEX, DROP_INDEX),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedTicket',
+            fields=[
+                ('source', models.CharField(max_length=191, primary_key=True, serialize=False)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.ticket')),
+            ],
+            options={
+                'verbose_name': 'Billet importé',
+                'verbose_name_plural': 'Billets importés',
+            },
+        ),
+    ]
@@ -5,6 +5,9 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 from django.db import models
 
+from jobs.queue import enqueue_on_commit
+from litrevu.images import delete_variants_on_commit, has_new_upload
+
 
 class Ticket(models.Model):
     """
@@ -29,16 +32,83 @@ class Ticket(models.Model):
         blank=True,
         verbose_name="Image"
     )
+    image_variants_ready = models.BooleanField(default=False, editable=False)
+    # Largeur de l'image d'origine, relevée avec ses variantes
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
     time_created = models.DateTimeField(auto_now_add=True)
+    # Clé du cache des cartes : changé à chaque modification du billet et
+    # à chaque critique ajoutée, modifiée ou supprimée
+    updated = models.DateTimeField(auto_now=True)
+    # Compteurs dénormalisés, tenus à jour par reviews.counters
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ('review_count', 'rating_sum')
 
     class Meta:
         verbose_name = "Billet"
         verbose_name_plural = "Billets"
         ordering = ['-time_created']
+        indexes = [
+            # Billets d'un utilisateur, du plus récent au plus ancien
+            models.Index(
+                fields=['user', '-time_created'],
+                name='ticket_user_time_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Image enregistrée, dont les variantes suivent un remplacement
+        instance._saved_image = instance.__dict__.get('image')
+        return instance
+
+    @property
+    def has_review(self):
+        """Indique si le billet a déjà reçu une critique."""
+        return self.review_count > 0
+
+    @property
+    def average_rating(self):
+        """Note moyenne des critiques du billet, None sans critique."""
+        if not self.review_count:
+            return None
+        return self.rating_sum / self.review_count
+
+    def save(self, *args, **kwargs):
+        # Les compteurs ne sont modifiés que par reviews.counters : ne pas
+        # écraser une valeur changée depuis le chargement du billet
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        # Une nouvelle image n'a pas encore de variantes redimensionnées
+        new_image = has_new_upload(self.image)
+        if new_image or not self.image:
+            self.image_variants_ready = False
+            self.image_width = None
+        super().save(*args, **kwargs)
+        # Les variantes d'une image remplacée ou effacée sont supprimées
+        previous = getattr(self, '_saved_image', None)
+        if previous and previous != self.image.name:
+            delete_variants_on_commit(self.image.storage, previous)
+        self._saved_image = self.image.name
+        if new_image:
+            # Le redimensionnement est fait par un worker, hors de la requête
+            enqueue_on_commit(
+                'reviews.ticket_image_variants',
+                {'ticket_id': self.id, 'name': self.image.name},
+                idempotency_key=f'ticket_image:{self.id}:{self.image.name}',
+            )
+
 
 class Review(models.Model):
     """
@@ -65,15 +135,38 @@ class Review(models.Model):
         related_name='reviews'
     )
     time_created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Critique"
         verbose_name_plural = "Critiques"
         ordering = ['-time_created']
+        constraints = [
+            # Une seule critique par billet et par utilisateur ; l'index sert
+            # aussi les tests d'existence de create_review et du flux
+            models.UniqueConstraint(
+                fields=['ticket', 'user'],
+                name='unique_review_ticket_user'
+            ),
+        ]
+        indexes = [
+            # Critiques d'un utilisateur, de la plus récente à la plus ancienne
+            models.Index(
+                fields=['user', '-time_created'],
+                name='review_user_time_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.headline} - {self.ticket.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Note enregistrée, pour corriger la moyenne du billet si elle change
+        instance._saved_rating = instance.__dict__.get('rating')
+        return instance
+
 
 class UserFollows(models.Model):
     """
@@ -94,6 +187,124 @@ class UserFollows(models.Model):
         verbose_name = "Abonnement"
         verbose_name_plural = "Abonnements"
         unique_together = ('user', 'followed_user')
+        indexes = [
+            # Liste des abonnés d'un utilisateur
+            models.Index(
+                fields=['followed_user', 'user'],
+                name='follows_followed_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} suit {self.followed_user.username}"
+
+
+class FeedEntry(models.Model):
+    """
+    Entrée du flux matérialisé d'un utilisateur.
+    Chaque billet ou critique visible par owner y possède une ligne,
+    écrite au moment de la publication (fan-out à l'écriture).
+    """
+    TICKET = 'TICKET'
+    REVIEW = 'REVIEW'
+    POST_TYPE_CHOICES = [
+        (TICKET, 'Billet'),
+        (REVIEW, 'Critique'),
+    ]
+
+    owner = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post_type = models.CharField(max_length=6, choices=POST_TYPE_CHOICES)
+    post_id = models.PositiveBigIntegerField()
+    author = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    time_created = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Entrée de flux"
+        verbose_name_plural = "Entrées de flux"
+        ordering = ['-time_created']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['owner', 'post_type', 'post_id'],
+                name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['owner', '-time_created', '-post_type', '-post_id'],
+                name='feed_owner_time_idx'
+            ),
+            models.Index(
+                fields=['post_type', 'post_id'], name='feed_post_idx'
+            ),
+            models.Index(
+                fields=['owner', 'author'], name='feed_owner_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.get_post_type_display()} {self.post_id} "
+            f"pour {self.owner_id}"
+        )
+
+
+class ImportedTicket(models.Model):
+    """
+    Identifiant d'origine d'un billet importé (commande import_posts) :
+    les critiques importées retrouvent ainsi leur billet, y compris après
+    une reprise de l'import.
+    """
+    source = models.CharField(max_length=191, primary_key=True)
+    ticket = models.ForeignKey(
+        to=Ticket,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+
+    class Meta:
+        verbose_name = "Billet importé"
+        verbose_name_plural = "Billets importés"
+
+    def __str__(self):
+        return f"{self.source} → {self.ticket_id}"
+
+
+class AuthorAffinity(models.Model):
+    """
+    Affinité d'un lecteur pour un auteur : nombre de critiques écrites par
+    viewer sur les billets d'author. Tenue à jour par les signaux et
+    recalculée en masse par rebuild_affinities, elle pondère le flux
+    « À la une » (reviews/ranking.py).
+    """
+    viewer = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    author = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    interactions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Affinité"
+        verbose_name_plural = "Affinités"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['viewer', 'author'],
+                name='unique_author_affinity'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.viewer_id} → {self.author_id} ({self.interactions})"
@@ -0,0 +1,175 @@
+"""
+Flux « À la une » : posts récents des utilisateurs suivis classés par score.
+
+Les candidats sont les RANKED_CANDIDATES entrées les plus récentes du flux
+matérialisé, lues en une requête avec ce qu'il faut pour les noter : note
+de la critique, compteurs du billet et affinité du lecteur pour l'auteur
+(table AuthorAffinity, précalculée). Le score est calculé d'un bloc sur
+des tableaux NumPy :
+
+    score = 0.5 ** (âge / HALF_LIFE_HOURS) * (1 + RATING_WEIGHT * qualité
+            + REVIEWS_WEIGHT * log(1 + critiques)
+            + AFFINITY_WEIGHT * log(1 + interactions))
+
+où la qualité est la note de la critique, ou la note moyenne du billet,
+ramenée entre 0 et 1. Le classement est gardé en cache pour la génération
+courante du flux (voir cache.py).
+"""
+from itertools import chain
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import FEED_CACHE_TIMEOUT, get_generation
+from .feed import TICKET, REVIEW
+from .models import AuthorAffinity, FeedEntry, Review, Ticket
+
+# Entrées récentes du flux notées à chaque classement
+RANKED_CANDIDATES = 5000
+# Posts classés conservés (les pages suivantes ne sont pas lues)
+RANKED_LIMIT = 500
+
+# Un post perd la moitié de son score toutes les HALF_LIFE_HOURS heures
+HALF_LIFE_HOURS = 24.0
+RATING_WEIGHT = 1.0
+REVIEWS_WEIGHT = 0.5
+AFFINITY_WEIGHT = 1.0
+
+MAX_RATING = 5
+# Lecteurs par requête d'un recalcul ciblé des affinités
+AFFINITY_BATCH_SIZE = 500
+
+# Colonnes numériques des candidats, dans l'ordre de la requête
+_COLUMNS = (
+    'is_review', 'post_id', 'created', 'rating', 'review_count',
+    'rating_sum', 'interactions',
+)
+
+
+def _candidates_sql():
+    return (
+        # Horodatage Unix calculé par SQLite : aucune date à convertir
+        "SELECT e.post_type = %s, e.post_id,"
+        " (julianday(e.time_created) - 2440587.5) * 86400.0,"
+        " COALESCE(r.rating, 0),"
+        " COALESCE(t.review_count, rt.review_count, 0),"
+        " COALESCE(t.rating_sum, rt.rating_sum, 0),"
+        " COALESCE(a.interactions, 0)"
+        " FROM (SELECT post_type, post_id, author_id, time_created"
+        f" FROM {FeedEntry._meta.db_table} WHERE owner_id = %s"
+        " ORDER BY time_created DESC, post_type DESC, post_id DESC"
+        " LIMIT %s) AS e"
+        f" LEFT JOIN {Ticket._meta.db_table} AS t"
+        " ON e.post_type = %s AND t.id = e.post_id"
+        f" LEFT JOIN {Review._meta.db_table} AS r"
+        " ON e.post_type = %s AND r.id = e.post_id"
+        f" LEFT JOIN {Ticket._meta.db_table} AS rt ON rt.id = r.ticket_id"
+        f" LEFT JOIN {AuthorAffinity._meta.db_table} AS a"
+        " ON a.viewer_id = %s AND a.author_id = e.author_id"
+    )
+
+
+def candidates(user_id, limit=RANKED_CANDIDATES):
+    """
+    Tableau NumPy (n, len(_COLUMNS)) des limit entrées les plus récentes du
+    flux de user_id, de la plus récente à la plus ancienne.
+    """
+    with connection.cursor() as db:
+        db.execute(_candidates_sql(), [
+            REVIEW, user_id, limit, TICKET, REVIEW, user_id
+        ])
+        rows = db.fetchall()
+    return np.fromiter(
+        chain.from_iterable(rows), dtype=np.float64,
+        count=len(rows) * len(_COLUMNS)
+    ).reshape(len(rows), len(_COLUMNS))
+
+
+def score(rows, now):
+    """Scores des candidats (tableau retourné par candidates) à now."""
+    is_review, _, created, rating, review_count, rating_sum, interactions = (
+        rows.T
+    )
+    age_hours = np.maximum(now - created, 0.0) / 3600.0
+    recency = np.exp2(-age_hours / HALF_LIFE_HOURS)
+    average = rating_sum / np.maximum(review_count, 1.0)
+    quality = np.where(is_review > 0, rating, average) / MAX_RATING
+    return recency * (
+        1.0
+        + RATING_WEIGHT * quality
+        + REVIEWS_WEIGHT * np.log1p(review_count)
+        + AFFINITY_WEIGHT * np.log1p(interactions)
+    )
+
+
+def rank(rows, now, limit=RANKED_LIMIT):
+    """
+    Clés (type, id) des limit meilleurs candidats, par score décroissant ;
+    à score égal, le plus récent d'abord.
+    """
+    if not len(rows):
+        return []
+    # Tri stable : les candidats arrivent du plus récent au plus ancien
+    order = np.argsort(-score(rows, now), kind='stable')[:limit]
+    is_review = rows[order, 0] > 0
+    post_ids = rows[order, 1].astype(np.int64)
+    return [
+        (REVIEW if review else TICKET, int(post_id))
+        for review, post_id in zip(is_review.tolist(), post_ids.tolist())
+    ]
+
+
+def ranked_posts(user_id):
+    """
+    Classement du flux « À la une » de user_id, calculé une fois par
+    génération du flux et gardé FEED_CACHE_TIMEOUT secondes.
+    """
+    key = f'feed:top:{user_id}:{get_generation(user_id)}'
+    ranked = cache.get(key)
+    if ranked is None:
+        ranked = rank(candidates(user_id), timezone.now().timestamp())
+        cache.set(key, ranked, FEED_CACHE_TIMEOUT)
+    return ranked
+
+
+def rebuild_affinities(viewer_ids=None, batch_size=AFFINITY_BATCH_SIZE):
+    """
+    Recalcule la table des affinités depuis les critiques, en requêtes
+    INSERT ... SELECT (après des insertions sans signaux ou pour corriger
+    une dérive). Si viewer_ids est fourni, seules les affinités de ces
+    lecteurs sont recalculées, par lots de batch_size.
+    Retourne le nombre de paires lecteur/auteur recalculées.
+    """
+    table = AuthorAffinity._meta.db_table
+    insert = (
+        f'INSERT INTO {table} (viewer_id, author_id, interactions)'
+        f' SELECT r.user_id, t.user_id, COUNT(*)'
+        f' FROM {Review._meta.db_table} AS r'
+        f' JOIN {Ticket._meta.db_table} AS t ON t.id = r.ticket_id'
+        f' WHERE r.user_id <> t.user_id'
+    )
+    group_by = ' GROUP BY r.user_id, t.user_id'
+    with transaction.atomic(), connection.cursor() as db:
+        if viewer_ids is None:
+            db.execute(f'DELETE FROM {table}')
+            db.execute(insert + group_by)
+            db.execute(f'SELECT COUNT(*) FROM {table}')
+            return db.fetchone()[0]
+
+        count = 0
+        viewer_ids = list(viewer_ids)
+        for start in range(0, len(viewer_ids), batch_size):
+            batch = viewer_ids[start:start + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            db.execute(
+                f'DELETE FROM {table} WHERE viewer_id IN ({placeholders})',
+                batch
+            )
+            db.execute(
+                insert + f' AND r.user_id IN ({placeholders})' + group_by,
+                batch
+            )
+            count += db.rowcount
+        return count
@@ -0,0 +1,246 @@
+"""
+Recherche plein texte dans les billets et critiques.
+
+La table virtuelle FTS5 reviews_search (migration 0007) indexe le titre et
+le texte de chaque post ; des déclencheurs SQLite la tiennent à jour à
+chaque insertion, modification ou suppression, y compris par bulk_create.
+Les résultats sont classés par BM25 (le titre pèse plus que le texte) et
+paginés par curseur sur (score, rowid).
+"""
+import base64
+import binascii
+import re
+
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .feed import TICKET, REVIEW
+from .models import Ticket, Review
+
+SEARCH_TABLE = 'reviews_search'
+SEARCH_PAGE_SIZE = 20
+
+# Poids BM25 des colonnes title et body
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+# Nombre de mots des extraits
+SNIPPET_TOKENS = 24
+
+# Marqueurs des termes trouvés, remplacés par <mark> après échappement
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_WORD = re.compile(r'\w+')
+
+
+def index_rowid(post_type, post_id):
+    """Identifiant de ligne d'un post dans l'index."""
+    return post_id * 2 + (post_type == REVIEW)
+
+
+def post_from_rowid(rowid):
+    """Retourne (type, id) du post indexé sous rowid."""
+    return (REVIEW if rowid % 2 else TICKET), rowid // 2
+
+
+def match_expression(query, prefix=True):
+    """
+    Traduit la saisie de l'utilisateur en requête FTS5 : chaque mot entre
+    guillemets (jamais lu comme un opérateur) et, si prefix, le dernier en
+    préfixe pour trouver les mots en cours de frappe. Chaîne vide si aucun
+    mot.
+    """
+    terms = [f'"{word}"' for word in _WORD.findall(query)]
+    if not terms:
+        return ''
+    if prefix:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def encode_cursor(score, rowid):
+    """Encode la position d'un résultat en curseur opaque pour l'URL."""
+    raw = f'{score!r}|{rowid}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """Décode un curseur ; None s'il est absent ou invalide."""
+    if not value:
+        return None
+    try:
+        padding = '=' * (-len(value) % 4)
+        raw = base64.urlsafe_b64decode(value + padding).decode()
+        score, rowid = raw.split('|')
+        return float(score), int(rowid)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def matching_rows(expression, user=None, network=False, post_type=None,
+                  cursor=None, limit=SEARCH_PAGE_SIZE):
+    """
+    Retourne jusqu'à limit couples (score, rowid) correspondant à
+    l'expression FTS5, du plus pertinent au moins pertinent, après cursor.
+
+    Si network est vrai, seuls les posts de user et des utilisateurs qu'il
+    suit sont retenus ; post_type limite la recherche aux billets ou aux
+    critiques.
+    """
+    conditions = [f'{SEARCH_TABLE} MATCH %s']
+    params = [expression]
+    if network:
+        conditions.append(
+            'user_id IN (SELECT followed_user_id FROM reviews_userfollows'
+            ' WHERE user_id = %s UNION ALL SELECT %s)'
+        )
+        params += [user.id, user.id]
+    if post_type is not None:
+        conditions.append('rowid %% 2 = %s')
+        params.append(int(post_type == REVIEW))
+
+    # bm25() n'est utilisable que dans la requête plein texte : le filtre
+    # keyset s'applique donc à la sous-requête
+    sql = (
+        f'SELECT score, rowid FROM ('
+        f'SELECT rowid, bm25({SEARCH_TABLE}, %s, %s) AS score'
+        f' FROM {SEARCH_TABLE} WHERE {" AND ".join(conditions)})'
+    )
+    params = [TITLE_WEIGHT, BODY_WEIGHT] + params
+    if cursor:
+        score, rowid = cursor
+        sql += ' WHERE score > %s OR (score = %s AND rowid > %s)'
+        params += [score, score, rowid]
+    sql += ' ORDER BY score, rowid LIMIT %s'
+    params.append(limit)
+
+    with connection.cursor() as db:
+        db.execute(sql, params)
+        return db.fetchall()
+
+
+def latest_matches(expression, post_type, limit):
+    """
+    Identifiants des limit posts de type post_type les plus récents
+    correspondant à l'expression FTS5, sans calcul de pertinence : FTS5
+    parcourt les rowid de l'index en ordre décroissant et s'arrête à limit.
+    """
+    with connection.cursor() as db:
+        db.execute(
+            f'SELECT rowid FROM {SEARCH_TABLE}'
+            f' WHERE {SEARCH_TABLE} MATCH %s AND rowid %% 2 = %s'
+            f' ORDER BY rowid DESC LIMIT %s',
+            [expression, int(post_type == REVIEW), limit]
+        )
+        return [post_from_rowid(rowid)[1] for rowid, in db.fetchall()]
+
+
+def _highlighted(text):
+    """Échappe text puis entoure les termes trouvés de <mark>."""
+    return mark_safe(
+        escape(text)
+        .replace(_MARK_START, '<mark>')
+        .replace(_MARK_END, '</mark>')
+    )
+
+
+def _highlights(expression, rowids):
+    """Titres surlignés et extraits des seuls posts de la page."""
+    placeholders = ', '.join(['%s'] * len(rowids))
+    with connection.cursor() as db:
+        db.execute(
+            f'SELECT rowid,'
+            f' highlight({SEARCH_TABLE}, 0, %s, %s),'
+            f' snippet({SEARCH_TABLE}, 1, %s, %s, %s, %s)'
+            f' FROM {SEARCH_TABLE}'
+            f' WHERE {SEARCH_TABLE} MATCH %s AND rowid IN ({placeholders})',
+            [_MARK_START, _MARK_END, _MARK_START, _MARK_END, '…',
+             SNIPPET_TOKENS, expression, *rowids]
+        )
+        return {
+            rowid: (_highlighted(title), _highlighted(snippet))
+            for rowid, title, snippet in db.fetchall()
+        }
+
+
+def search_posts(query, user, network=False, cursor=None,
+                 page_size=SEARCH_PAGE_SIZE):
+    """
+    Recherche query dans les billets et critiques.
+
+    Retourne les posts de la page, annotés de content_type, is_own,
+    title_highlight et snippet, ainsi que le curseur de la page suivante.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return {'posts': [], 'next_cursor': None}
+
+    rows = matching_rows(
+        expression, user=user, network=network, cursor=cursor,
+        limit=page_size + 1
+    )
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    if not rows:
+        return {'posts': [], 'next_cursor': None}
+
+    rowids = [rowid for _, rowid in rows]
+    highlights = _highlights(expression, rowids)
+
+    # Charger uniquement les objets de la page, par clé primaire
+    posts_by_type = {TICKET: [], REVIEW: []}
+    for rowid in rowids:
+        post_type, post_id = post_from_rowid(rowid)
+        posts_by_type[post_type].append(post_id)
+    loaded = {
+        TICKET: Ticket.objects.select_related('user').order_by().in_bulk(
+            posts_by_type[TICKET]
+        ),
+        REVIEW: Review.objects.select_related(
+            'user', 'ticket'
+        ).order_by().in_bulk(posts_by_type[REVIEW]),
+    }
+
+    posts = []
+    for rowid in rowids:
+        post_type, post_id = post_from_rowid(rowid)
+        post = loaded[post_type].get(post_id)
+        if post is None:
+            continue
+        post.content_type = post_type
+        post.is_own = post.user_id == user.id
+        post.title_highlight, post.snippet = highlights.get(
+            rowid, (post.headline if post_type == REVIEW else post.title, '')
+        )
+        posts.append(post)
+
+    return {
+        'posts': posts,
+        'next_cursor': encode_cursor(*rows[-1]) if has_next else None,
+    }
+
+
+def rebuild_index():
+    """
+    Vide puis remplit l'index à partir des tables, en deux requêtes
+    INSERT ... SELECT, puis fusionne ses segments.
+    Retourne le nombre de posts indexés.
+    """
+    with transaction.atomic(), connection.cursor() as db:
+        db.execute(f'DELETE FROM {SEARCH_TABLE}')
+        db.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, body, user_id)'
+            f' SELECT id * 2, title, description, user_id'
+            f' FROM {Ticket._meta.db_table}'
+        )
+        db.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, body, user_id)'
+            f' SELECT id * 2 + 1, headline, body, user_id'
+            f' FROM {Review._meta.db_table}'
+        )
+        db.execute(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+        db.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+        return db.fetchone()[0]
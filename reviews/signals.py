@@ -0,0 +1,125 @@
+"""
+Signaux maintenant le flux matérialisé, les compteurs et le cache des
+pages à jour lors des écritures.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from litrevu.images import delete_variants_on_commit
+
+from . import counters, fanout
+from .cache import bump_generations
+from .models import Ticket, Review, UserFollows, FeedEntry
+
+
+def _ticket_author(review):
+    """Auteur du billet critiqué, sans requête si le billet est chargé."""
+    if Review.ticket.is_cached(review):
+        return review.ticket.user_id
+    return Ticket.objects.filter(pk=review.ticket_id).values_list(
+        'user_id', flat=True
+    ).first()
+
+
+def _invalidate(user_ids):
+    """Invalider le cache des pages une fois l'écriture validée."""
+    transaction.on_commit(partial(bump_generations, set(user_ids)))
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_saved(sender, instance, created, **kwargs):
+    """Diffuser un nouveau billet dans les flux concernés."""
+    if created:
+        fanout.fan_out(FeedEntry.TICKET, instance)
+        counters.change_user(instance.user_id, tickets_count=1)
+    owners = fanout.post_owners(FeedEntry.TICKET, [instance.id])
+    if not created:
+        # Le billet est aussi affiché dans les cartes de ses critiques
+        reviews = Review.objects.filter(ticket=instance).values('id')
+        owners |= fanout.post_owners(FeedEntry.REVIEW, reviews)
+    _invalidate(owners | {instance.user_id})
+
+
+@receiver(pre_delete, sender=Ticket)
+@receiver(pre_delete, sender=Review)
+def post_deleting(sender, instance, **kwargs):
+    """Mémoriser les flux concernés avant la suppression en cascade."""
+    if sender is Ticket:
+        owners = fanout.post_owners(FeedEntry.TICKET, [instance.id])
+    else:
+        owners = fanout.post_owners(FeedEntry.REVIEW, [instance.id])
+        # L'indicateur « déjà critiqué » et la note moyenne du billet
+        # changent aussi
+        owners |= fanout.post_owners(FeedEntry.TICKET, [instance.ticket_id])
+    instance._feed_owners = owners
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, **kwargs):
+    """Retirer un billet supprimé des flux et ses variantes d'image."""
+    fanout.remove_post(FeedEntry.TICKET, instance.id)
+    counters.change_user(instance.user_id, tickets_count=-1)
+    delete_variants_on_commit(instance.image.storage, instance.image.name)
+    _invalidate(getattr(instance, '_feed_owners', set()) | {instance.user_id})
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Diffuser une nouvelle critique dans les flux concernés."""
+    previous = getattr(instance, '_saved_rating', None)
+    if created:
+        fanout.fan_out(FeedEntry.REVIEW, instance)
+        counters.change_user(instance.user_id, reviews_count=1)
+        counters.change_ticket(
+            instance.ticket_id, reviews=1, ratings=instance.rating
+        )
+        counters.change_affinity(
+            instance.user_id, _ticket_author(instance), 1
+        )
+    rating_changed = previous is not None and previous != instance.rating
+    if rating_changed:
+        counters.change_ticket(
+            instance.ticket_id, ratings=instance.rating - previous
+        )
+    instance._saved_rating = instance.rating
+
+    owners = fanout.post_owners(FeedEntry.REVIEW, [instance.id])
+    if created or rating_changed:
+        # L'indicateur « déjà critiqué » et la note moyenne du billet
+        # changent aussi
+        owners |= fanout.post_owners(FeedEntry.TICKET, [instance.ticket_id])
+    _invalidate(owners | {instance.user_id})
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Retirer une critique supprimée des flux."""
+    fanout.remove_post(FeedEntry.REVIEW, instance.id)
+    counters.change_user(instance.user_id, reviews_count=-1)
+    counters.change_ticket(
+        instance.ticket_id, reviews=-1, ratings=-instance.rating
+    )
+    counters.change_affinity(instance.user_id, _ticket_author(instance), -1)
+    _invalidate(getattr(instance, '_feed_owners', set()) | {instance.user_id})
+
+
+@receiver(post_save, sender=UserFollows)
+def follow_created(sender, instance, created, **kwargs):
+    """Ajouter les posts de l'utilisateur suivi au flux de l'abonné."""
+    if created:
+        fanout.backfill_follow(instance.user_id, instance.followed_user_id)
+        counters.change_user(instance.user_id, following_count=1)
+        counters.change_user(instance.followed_user_id, followers_count=1)
+    _invalidate({instance.user_id})
+
+
+@receiver(post_delete, sender=UserFollows)
+def follow_deleted(sender, instance, **kwargs):
+    """Retirer les posts de l'utilisateur qui n'est plus suivi."""
+    fanout.prune_follow(instance.user_id, instance.followed_user_id)
+    counters.change_user(instance.user_id, following_count=-1)
+    counters.change_user(instance.followed_user_id, followers_count=-1)
+    _invalidate({instance.user_id})
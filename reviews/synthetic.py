@@ -0,0 +1,205 @@
+"""
+Génération de jeux de données synthétiques pour les mesures de performance.
+
+Les lignes sont insérées par lots avec bulk_create et un seul hachage de mot
+de passe est calculé pour tous les utilisateurs. Le nombre d'abonnements
+suit une loi de puissance : la plupart des comptes suivent peu de monde et
+quelques comptes très populaires concentrent les abonnés.
+"""
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import recount
+from .fanout import rebuild_feeds
+from .ranking import rebuild_affinities
+from .models import Ticket, Review, UserFollows
+
+
+User = get_user_model()
+
+BATCH_SIZE = 2000
+SYNTHETIC_PASSWORD = 'litrevu123'
+USERNAME_PREFIX = 'synth'
+
+# Exposant de Pareto du nombre d'abonnements par utilisateur (moyenne
+# alpha / (alpha - 1) fois le minimum)
+FOLLOW_DEGREE_ALPHA = 2.0
+# Exposant de Zipf de la popularité : le compte de rang r est suivi avec
+# une probabilité proportionnelle à 1 / r ** FOLLOW_POPULARITY_EXPONENT
+FOLLOW_POPULARITY_EXPONENT = 1.0
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Désactive temporairement auto_now_add sur time_created pour pouvoir
+    étaler les dates de création des posts générés.
+    """
+    fields = [model._meta.get_field('time_created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _bulk(model, objects, batch_size):
+    """
+    Insère un itérable d'objets par lots, dans une seule transaction.
+    Retourne le nombre d'objets soumis.
+    """
+    count = 0
+    objects = iter(objects)
+    with transaction.atomic():
+        while True:
+            batch = list(itertools.islice(objects, batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            count += len(batch)
+    return count
+
+
+def follow_degrees(rng, count, mean, maximum):
+    """
+    Tire count nombres d'abonnements selon une loi de Pareto de moyenne
+    mean, bornés par maximum.
+    """
+    minimum = mean * (FOLLOW_DEGREE_ALPHA - 1) / FOLLOW_DEGREE_ALPHA
+    return [
+        min(maximum, int(minimum * rng.paretovariate(FOLLOW_DEGREE_ALPHA)))
+        for _ in range(count)
+    ]
+
+
+def _popularity(rng, user_ids):
+    """
+    Ordre de popularité aléatoire et poids cumulés de Zipf associés, pour
+    des tirages en O(log n) avec random.choices.
+    """
+    ranked = list(user_ids)
+    rng.shuffle(ranked)
+    weights = (
+        1 / rank ** FOLLOW_POPULARITY_EXPONENT
+        for rank in range(1, len(ranked) + 1)
+    )
+    return ranked, list(itertools.accumulate(weights))
+
+
+def _follows(rng, user_ids, mean):
+    ranked, cum_weights = _popularity(rng, user_ids)
+    degrees = follow_degrees(rng, len(user_ids), mean, len(user_ids) - 1)
+    for user_id, degree in zip(user_ids, degrees):
+        followed = set()
+        # Quelques tirages de plus pour compenser doublons et auto-abonnement
+        for _ in range(3):
+            missing = degree - len(followed)
+            if missing <= 0:
+                break
+            followed.update(rng.choices(
+                ranked, cum_weights=cum_weights, k=missing + 1
+            ))
+            followed.discard(user_id)
+        for followed_id in itertools.islice(followed, degree):
+            yield UserFollows(user_id=user_id, followed_user_id=followed_id)
+
+
+def _next_id(model):
+    return (model.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0) + 1
+
+
+def generate(users=100, follows_per_user=10, tickets_per_user=5,
+             reviews_per_user=5, seed=0, days=365, batch_size=BATCH_SIZE,
+             build_feeds=True, progress=None):
+    """
+    Génère un jeu de données synthétique et reconstruit les flux.
+    follows_per_user est la moyenne de la loi de puissance des abonnements.
+    progress(étape, lignes, secondes), s'il est fourni, est appelé à la fin
+    de chaque étape.
+    Retourne le nombre de lignes créées par modèle.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(SYNTHETIC_PASSWORD)
+    created = {}
+
+    def step(name, run):
+        start = time.perf_counter()
+        created[name] = run()
+        if progress:
+            progress(name, created[name], time.perf_counter() - start)
+
+    def random_time():
+        return now - timedelta(seconds=rng.randrange(days * 86400))
+
+    first_user_id = _next_id(User)
+    step('users', lambda: _bulk(User, (
+        User(username=f'{USERNAME_PREFIX}{first_user_id + i}',
+             username_folded=f'{USERNAME_PREFIX}{first_user_id + i}',
+             password=password)
+        for i in range(users)
+    ), batch_size))
+    # Identifiants contigus : on filtre par plage plutôt que par liste
+    generated = User.objects.filter(
+        username__startswith=USERNAME_PREFIX, id__gte=first_user_id
+    )
+    user_ids = list(generated.order_by('id').values_list('id', flat=True))
+    if not user_ids:
+        return created
+
+    step('follows', lambda: _bulk(
+        UserFollows, _follows(rng, user_ids, follows_per_user), batch_size
+    ))
+
+    with explicit_timestamps(Ticket, Review):
+        first_ticket_id = _next_id(Ticket)
+        step('tickets', lambda: _bulk(Ticket, (
+            Ticket(
+                user_id=user_id,
+                title=f"Livre {user_id}-{i}",
+                description="Description générée.",
+                time_created=random_time(),
+            )
+            for user_id in user_ids
+            for i in range(tickets_per_user)
+        ), batch_size))
+
+        ticket_ids = list(Ticket.objects.filter(
+            id__gte=first_ticket_id
+        ).values_list('id', flat=True))
+        step('reviews', lambda: _bulk(Review, (
+            Review(
+                ticket_id=ticket_id,
+                user_id=user_id,
+                rating=rng.randint(0, 5),
+                headline=f"Critique {user_id}-{ticket_id}",
+                body="Critique générée.",
+                time_created=random_time(),
+            )
+            for user_id in user_ids
+            for ticket_id in rng.sample(
+                ticket_ids, min(reviews_per_user, len(ticket_ids))
+            )
+        ), batch_size))
+
+    # bulk_create n'envoie pas de signaux : recalculer les compteurs et
+    # les affinités, puis reconstruire les flux
+    step('counters', lambda: sum(recount().values()))
+    step('affinities', rebuild_affinities)
+    if build_feeds:
+        step('feeds', lambda: rebuild_feeds(
+            generated.values('id'), batch_size=batch_size
+        ))
+    return created
@@ -0,0 +1,33 @@
+"""
+Tâches d'arrière-plan de l'application reviews.
+"""
+from jobs.queue import task
+from litrevu.images import process_upload
+
+from . import fanout
+from .cache import bump_generations
+from .models import Ticket, Review, FeedEntry
+
+
+@task('reviews.ticket_image_variants')
+def ticket_image_variants(ticket_id, name):
+    """Génère les variantes de l'image d'un billet."""
+    ticket = Ticket.objects.filter(id=ticket_id).first()
+    # Le billet a pu être supprimé ou son image remplacée entre-temps
+    if ticket is None or ticket.image.name != name:
+        return
+    if process_upload(
+        ticket, 'image', 'image_variants_ready', 'image_width'
+    ):
+        bump_generations(fanout.post_owners(FeedEntry.TICKET, [ticket_id]))
+
+
+@task('reviews.fan_out_post')
+def fan_out_post(post_type, post_id):
+    """Diffuse un post dans le flux des abonnés de son auteur."""
+    model = Ticket if post_type == FeedEntry.TICKET else Review
+    post = model.objects.filter(id=post_id).first()
+    if post is None:
+        return
+    owners = fanout.fan_out_followers(post_type, post)
+    bump_generations(owners)
@@ -0,0 +1,32 @@
+"""
+Balise de gabarit affichant une image avec ses variantes redimensionnées.
+"""
+from django import template
+from django.utils.html import format_html
+
+from litrevu.images import smallest_variant_url, srcset
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(fieldfile, ready, alt, css_class='card-image',
+                     sizes='150px', width=None):
+    """
+    Affiche fieldfile avec srcset/sizes et chargement différé ; width, la
+    largeur de l'original, limite srcset aux variantes réellement utiles.
+    Tant que les variantes ne sont pas prêtes, l'original est utilisé.
+    """
+    if not ready:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy" '
+            'decoding="async">',
+            fieldfile.url, alt, css_class
+        )
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" '
+        'loading="lazy" decoding="async">',
+        smallest_variant_url(fieldfile), srcset(fieldfile, width), sizes, alt,
+        css_class
+    )
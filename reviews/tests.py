@@ -1,3 +1,1184 @@
+"""
+Tests des vues du flux et des posts de l'utilisateur.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
+from unittest import mock
 
+import numpy
+from PIL import Image
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from litrevu import metrics
+from litrevu.changelists import EstimatedCountPaginator
+from litrevu.images import build_variants, variant_name
+from litrevu.staticfiles import StaticFilesApplication
+
+from .counters import recount
+from .fanout import rebuild_feeds
+from .feed import FEED_FIRST_PAGE_SIZE, FEED_PAGE_SIZE, TICKET, REVIEW
+from .importer import Importer
+from .models import Ticket, Review, UserFollows, FeedEntry, AuthorAffinity
+from .ranking import rank, rebuild_affinities
+from .search import search_posts, decode_cursor as decode_search_cursor
+
+
+User = get_user_model()
+
+
+# Session et utilisateur lus en base à chaque requête : les comptes de
+# requêtes ci-dessous ne dépendent pas de DJANGO_SESSION_MODE
+uncached_auth = override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.db',
+    AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'],
+)
+
+
+@uncached_auth
+class FeedQueryCountTests(TestCase):
+    """Le nombre de requêtes par page ne dépend pas du nombre de posts."""
+
+    # session, utilisateur, validateur (ETag), UNION paginée, billets,
+    # critiques
+    FEED_QUERIES = 6
+    # Le validateur de « Mes posts » lit billets et critiques séparément
+    USER_POSTS_QUERIES = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='alice123')
+        cls.bob = User.objects.create_user('bob', password='bob123')
+        UserFollows.objects.create(user=cls.alice, followed_user=cls.bob)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.alice)
+
+    def create_posts(self, count):
+        # Le cache est invalidé à la validation de la transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                ticket = Ticket.objects.create(
+                    user=self.bob, title=f"Livre {i}"
+                )
+                Review.objects.create(
+                    ticket=ticket, user=self.alice, rating=i % 6,
+                    headline=f"Critique {i}"
+                )
+                Ticket.objects.create(user=self.alice, title=f"Demande {i}")
+
+    def test_feed_query_count_is_constant(self):
+        self.create_posts(1)
+        with self.assertNumQueries(self.FEED_QUERIES):
+            response = self.client.get(reverse('feed'))
+        self.assertEqual(len(response.context['posts']), 3)
+
+        self.create_posts(10)
+        with self.assertNumQueries(self.FEED_QUERIES):
+            response = self.client.get(reverse('feed'))
+        self.assertEqual(
+            len(response.context['posts']), FEED_FIRST_PAGE_SIZE
+        )
+
+    def test_feed_more_returns_next_cards_only(self):
+        self.create_posts(10)
+        first = self.client.get(reverse('feed'))
+        more_url = '{}?after={}'.format(
+            reverse('feed_more'), first.context['next_cursor']
+        )
+        self.assertContains(first, more_url)
+
+        with self.assertNumQueries(self.FEED_QUERIES):
+            response = self.client.get(more_url)
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertNotContains(response, '<nav')
+        self.assertContains(response, 'class="card"', count=FEED_PAGE_SIZE)
+        seen = {
+            (post.content_type, post.id)
+            for post in first.context['posts'] + response.context['posts']
+        }
+        self.assertEqual(len(seen), FEED_FIRST_PAGE_SIZE + FEED_PAGE_SIZE)
+
+    def test_feed_marks_reviewed_tickets(self):
+        self.create_posts(1)
+        response = self.client.get(reverse('feed'))
+        tickets = {
+            post.title: post for post in response.context['posts']
+            if post.content_type == 'TICKET'
+        }
+        self.assertTrue(tickets['Livre 0'].has_review)
+        self.assertFalse(tickets['Demande 0'].has_review)
+        # Billet déjà critiqué : pas de bouton « Créer une critique »
+        self.assertNotContains(response, reverse('create_review', args=[
+            tickets['Livre 0'].id
+        ]))
+
+    def test_user_posts_query_count_is_constant(self):
+        self.create_posts(1)
+        with self.assertNumQueries(self.USER_POSTS_QUERIES):
+            self.client.get(reverse('user_posts'))
+
+        self.create_posts(10)
+        with self.assertNumQueries(self.USER_POSTS_QUERIES):
+            response = self.client.get(reverse('user_posts'))
+        self.assertEqual(len(response.context['posts']), 20)
+
+
+@uncached_auth
+class FeedCacheTests(TestCase):
+    """Les pages inchangées sont servies depuis le cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        UserFollows.objects.create(user=self.alice, followed_user=self.bob)
+        Ticket.objects.create(user=self.bob, title="Livre")
+        self.client.force_login(self.alice)
+
+    def test_unchanged_feed_is_served_from_cache(self):
+        self.client.get(reverse('feed'))
+        # session, utilisateur et validateur seulement
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('feed'))
+        self.assertEqual(len(response.context['posts']), 1)
+
+    def test_followee_post_invalidates_feed(self):
+        self.client.get(reverse('feed'))
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(user=self.bob, title="Nouveau")
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(response.context['posts'][0], ticket)
+
+        # Une critique change l'indicateur « déjà critiqué » du billet
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(
+                ticket=ticket, user=self.bob, rating=3, headline="Critique"
+            )
+        response = self.client.get(reverse('feed'))
+        self.assertTrue(response.context['posts'][1].has_review)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(len(response.context['posts']), 1)
+
+    def test_cached_cards_follow_edits(self):
+        ticket = Ticket.objects.get(title="Livre")
+        create_review_url = reverse('create_review', args=[ticket.id])
+        response = self.client.get(reverse('feed'))
+        self.assertContains(response, create_review_url)
+
+        # La carte du billet perd son bouton une fois le billet critiqué
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(
+                ticket=ticket, user=self.bob, rating=4, headline="Critique"
+            )
+        response = self.client.get(reverse('feed'))
+        self.assertNotContains(response, create_review_url)
+
+        # La carte de la critique reprend le titre modifié du billet
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.title = "Livre corrigé"
+            ticket.save()
+        response = self.client.get(reverse('feed'))
+        self.assertContains(response, "Livre corrigé", count=2)
+        self.assertNotContains(response, "<h3 class=\"card-title\">Livre</h3>")
+
+
+@uncached_auth
+class ConditionalGetTests(TestCase):
+    """Une page inchangée est revalidée par une réponse 304."""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        UserFollows.objects.create(user=self.alice, followed_user=self.bob)
+        self.ticket = Ticket.objects.create(user=self.bob, title="Ancien")
+        Ticket.objects.create(user=self.bob, title="Récent")
+        self.client.force_login(self.alice)
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_feed_returns_304_without_reading_posts(self):
+        url = reverse('feed')
+        etag = self.client.get(url)['ETag']
+        # session, utilisateur et validateur seulement
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_deleting_an_older_post_changes_the_validator(self):
+        url = reverse('feed')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ticket.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.revalidate(url).status_code, 304)
+
+    def test_unfollow_changes_the_validator(self):
+        url = reverse('feed')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            UserFollows.objects.filter(user=self.alice).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_posts_change_with_own_posts(self):
+        url = reverse('user_posts')
+        self.assertEqual(self.revalidate(url).status_code, 304)
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(user=self.alice, title="Le mien")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class FeedEntrySyncTests(TestCase):
+    """Le flux matérialisé suit les écritures comme une reconstruction."""
+
+    def snapshot(self):
+        return sorted(FeedEntry.objects.values_list(
+            'owner_id', 'post_type', 'post_id', 'author_id'
+        ))
+
+    def assertMatchesRebuild(self):
+        current = self.snapshot()
+        rebuild_feeds()
+        self.assertEqual(current, self.snapshot())
+
+    def test_writes_keep_feed_in_sync(self):
+        alice = User.objects.create_user('alice')
+        bob = User.objects.create_user('bob')
+        charlie = User.objects.create_user('charlie')
+        alice_ticket = Ticket.objects.create(user=alice, title="Billet A")
+        bob_ticket = Ticket.objects.create(user=bob, title="Billet B")
+        Review.objects.create(
+            user=bob, ticket=alice_ticket, rating=4, headline="Critique B"
+        )
+        Review.objects.create(
+            user=charlie, ticket=bob_ticket, rating=2, headline="Critique C"
+        )
+        follow = UserFollows.objects.create(user=alice, followed_user=bob)
+        UserFollows.objects.create(user=charlie, followed_user=alice)
+        self.assertMatchesRebuild()
+
+        # Ne plus suivre bob garde sa critique du billet d'alice
+        follow.delete()
+        self.assertMatchesRebuild()
+        self.assertTrue(FeedEntry.objects.filter(
+            owner=alice, author=bob, post_type=FeedEntry.REVIEW
+        ).exists())
+
+        bob_ticket.delete()
+        self.assertMatchesRebuild()
+
+
+class FeedEntryMigrationTests(TransactionTestCase):
+    """La migration du flux matérialisé le remplit depuis l'existant."""
+
+    def migrate(self, reviews_migration=None):
+        """
+        Amène reviews à reviews_migration (la dernière par défaut), les
+        autres applications restant à jour ; retourne l'état des modèles.
+        """
+        executor = MigrationExecutor(connection)
+        targets = [
+            node for node in executor.loader.graph.leaf_nodes()
+            if reviews_migration is None or node[0] != 'reviews'
+        ]
+        if reviews_migration is not None:
+            targets.append(('reviews', reviews_migration))
+        executor.migrate(targets)
+        executor.loader.build_graph()
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate()
+
+    def test_populates_feeds_from_existing_posts(self):
+        apps = self.migrate('0001_initial')
+        OldUser = apps.get_model(settings.AUTH_USER_MODEL)
+        OldTicket = apps.get_model('reviews', 'Ticket')
+        OldReview = apps.get_model('reviews', 'Review')
+        alice, bob, charlie = (
+            OldUser.objects.create(username=name)
+            for name in ('alice', 'bob', 'charlie')
+        )
+        alice_ticket = OldTicket.objects.create(user=alice, title="A")
+        bob_ticket = OldTicket.objects.create(user=bob, title="B")
+        OldReview.objects.create(
+            user=charlie, ticket=alice_ticket, rating=3, headline="C"
+        )
+        OldReview.objects.create(
+            user=alice, ticket=bob_ticket, rating=4, headline="A"
+        )
+        apps.get_model('reviews', 'UserFollows').objects.create(
+            user=bob, followed_user=alice
+        )
+
+        self.migrate('0002_feedentry')
+        self.migrate()
+        migrated = sorted(FeedEntry.objects.values_list(
+            'owner_id', 'post_type', 'post_id', 'author_id', 'time_created'
+        ))
+        self.assertEqual(len(migrated), 7)
+        rebuild_feeds()
+        self.assertEqual(migrated, sorted(FeedEntry.objects.values_list(
+            'owner_id', 'post_type', 'post_id', 'author_id', 'time_created'
+        )))
+
+
+class RequestMetricsTests(TestCase):
+    """Mesures des requêtes : en-tête Server-Timing et /metrics."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='alice123')
+        cls.admin = User.objects.create_user(
+            'admin', password='admin123', is_staff=True
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_is_only_sent_to_staff(self):
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('feed'))
+        self.assertNotIn('Server-Timing', response)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('feed'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="SQL \(\d+\)", tpl;dur=[\d.]+;'
+            r'desc="Templates", total;dur=[\d.]+$'
+        )
+
+    def test_metrics_exposes_view_histograms(self):
+        self.client.force_login(self.alice)
+        self.client.get(reverse('feed'))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE litrevu_request_duration_seconds histogram',
+                      body)
+        self.assertIn(
+            'litrevu_request_duration_seconds_bucket'
+            '{view="feed",method="GET",le="+Inf"}', body
+        )
+        self.assertIn('litrevu_request_queries_count{view="feed"}', body)
+
+    def test_streaming_response_is_measured_until_closed(self):
+        Ticket.objects.create(user=self.alice, title="Livre")
+        self.client.force_login(self.alice)
+        for histogram in metrics.HISTOGRAMS:
+            histogram.clear()
+
+        response = self.client.get(
+            reverse('export_posts'), {'format': 'jsonl'}
+        )
+        self.assertNotIn('view="export_posts"', metrics.exposition())
+        with CaptureQueriesContext(connection) as body_queries:
+            body = b''.join(response.streaming_content)
+        self.assertTrue(body_queries.captured_queries)
+
+        exposition = metrics.exposition()
+        self.assertIn(
+            f'litrevu_response_size_bytes_sum{{view="export_posts"}} '
+            f'{len(body)}', exposition
+        )
+        queries = re.search(
+            r'litrevu_request_queries_sum\{view="export_posts"\} (\d+)',
+            exposition
+        )
+        # Requêtes de la vue et de la production du corps
+        self.assertGreater(
+            int(queries.group(1)), len(body_queries.captured_queries)
+        )
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_requires_token_not_local_address(self):
+        # Derrière nginx, toutes les requêtes viennent de 127.0.0.1
+        url = reverse('metrics')
+        response = self.client.get(url, REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer autre')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_without_token_is_staff_only(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer '
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class CounterTests(TestCase):
+    """Les compteurs suivent les écritures et recount corrige la dérive."""
+
+    def test_counters_follow_writes(self):
+        alice = User.objects.create_user('alice')
+        bob = User.objects.create_user('bob')
+        UserFollows.objects.create(user=alice, followed_user=bob)
+        ticket = Ticket.objects.create(user=bob, title="Livre")
+        review = Review.objects.create(
+            ticket=ticket, user=alice, rating=2, headline="Bof"
+        )
+        Review.objects.create(
+            ticket=ticket, user=bob, rating=5, headline="Super"
+        )
+
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 4
+        review.save()
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.review_count, 2)
+        self.assertEqual(ticket.average_rating, 4.5)
+
+        # Un billet chargé avant une critique ne remet pas son compteur à 0
+        stale = Ticket.objects.get(pk=ticket.pk)
+        review.delete()
+        stale.title = "Livre corrigé"
+        stale.save()
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.review_count, 1)
+        self.assertEqual(ticket.average_rating, 5)
+
+        alice.refresh_from_db()
+        bob.refresh_from_db()
+        self.assertEqual(
+            (alice.following_count, alice.reviews_count), (1, 0)
+        )
+        self.assertEqual(
+            (bob.followers_count, bob.tickets_count, bob.reviews_count),
+            (1, 1, 1)
+        )
+        self.assertFalse(any(recount(fix=False).values()))
+
+    def test_recount_fixes_drift(self):
+        bob = User.objects.create_user('bob')
+        Ticket.objects.create(user=bob, title="Livre")
+        User.objects.filter(pk=bob.pk).update(tickets_count=7)
+
+        self.assertEqual(recount()['user.tickets_count'], 1)
+        bob.refresh_from_db()
+        self.assertEqual(bob.tickets_count, 1)
+        self.assertFalse(any(recount(fix=False).values()))
+
+
+class RankedFeedTests(TestCase):
+    """Flux « À la une » : score vectorisé et affinités tenues à jour."""
+
+    def test_rank_weighs_recency_rating_and_affinity(self):
+        now = 1_000_000.0
+        # is_review, id, date, note, critiques, somme des notes, affinité
+        rows = numpy.array([
+            [0, 1, now, 0, 0, 0, 0],
+            [1, 2, now - 60, 1, 1, 1, 0],
+            [1, 3, now - 60, 5, 1, 5, 0],
+            [0, 4, now - 120, 0, 0, 0, 3],
+            [1, 5, now - 30 * 86400, 5, 9, 45, 9],
+        ])
+        self.assertEqual(rank(rows, now), [
+            (TICKET, 4), (REVIEW, 3), (REVIEW, 2), (TICKET, 1), (REVIEW, 5),
+        ])
+        self.assertEqual(rank(rows, now, limit=1), [(TICKET, 4)])
+        self.assertEqual(rank(rows[:0], now), [])
+
+    def test_top_feed_and_affinities(self):
+        cache.clear()
+        alice = User.objects.create_user('alice')
+        bob = User.objects.create_user('bob')
+        carol = User.objects.create_user('carol')
+        UserFollows.objects.create(user=alice, followed_user=bob)
+        UserFollows.objects.create(user=alice, followed_user=carol)
+        old = Ticket.objects.create(user=bob, title="Ancien")
+        review = Review.objects.create(
+            ticket=old, user=alice, rating=5, headline="Excellent"
+        )
+        new = Ticket.objects.create(user=bob, title="Nouveau")
+        other = Ticket.objects.create(user=carol, title="Autre")
+        affinity = AuthorAffinity.objects.get(viewer=alice, author=bob)
+        self.assertEqual(affinity.interactions, 1)
+
+        self.client.force_login(alice)
+        response = self.client.get(reverse('feed_top'))
+        self.assertEqual(
+            [post.pk for post in response.context['posts']],
+            [old.pk, review.pk, new.pk, other.pk]
+        )
+        self.assertContains(response, 'aria-current="page"')
+        self.assertIsNone(response.context['next_page'])
+
+        review.delete()
+        affinity.refresh_from_db()
+        self.assertEqual(affinity.interactions, 0)
+        self.assertEqual(rebuild_affinities(), 0)
+
+
+class UserSearchTests(TestCase):
+    """Suggestions de noms pour le formulaire d'abonnement."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        for username in ('Bob', 'bobby', 'bobette', 'charlie'):
+            User.objects.create_user(username)
+        UserFollows.objects.create(
+            user=self.alice, followed_user=User.objects.get(username='bobby')
+        )
+        self.client.force_login(self.alice)
+
+    def search(self, **params):
+        response = self.client.get(reverse('user_search'), params)
+        return [user['username'] for user in response.json()['results']]
+
+    def test_prefix_search_ignores_case_self_and_followed(self):
+        self.assertEqual(self.search(q='BO'), ['Bob', 'bobette'])
+        self.assertEqual(self.search(q='bo', limit=1), ['Bob'])
+        self.assertEqual(self.search(q='al'), [])
+        self.assertEqual(self.search(q=''), [])
+
+    def test_follow_form_follows_resolved_user(self):
+        self.client.post(reverse('follows'), {'username': 'bobette'})
+        self.assertTrue(UserFollows.objects.filter(
+            user=self.alice, followed_user__username='bobette'
+        ).exists())
+
+
+class SearchTests(TestCase):
+    """Recherche plein texte tenue à jour par les déclencheurs FTS5."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.carol = User.objects.create_user('carol')
+        UserFollows.objects.create(user=self.alice, followed_user=self.bob)
+        self.ticket = Ticket.objects.create(
+            user=self.bob, title="Les Misérables",
+            description="Roman de Victor Hugo"
+        )
+        self.review = Review.objects.create(
+            ticket=self.ticket, user=self.carol, rating=5,
+            headline="Un classique", body="Hugo au sommet <b>absolu</b>"
+        )
+        self.client.force_login(self.alice)
+
+    def search(self, **params):
+        response = self.client.get(reverse('search'), params)
+        return response, [
+            (post.content_type, post.id) for post in response.context['posts']
+        ]
+
+    def test_search_ranks_highlights_and_filters(self):
+        # Sans accents, le titre pèse plus que le texte
+        response, found = self.search(q='hugo')
+        self.assertEqual(
+            found, [('TICKET', self.ticket.id), ('REVIEW', self.review.id)]
+        )
+        self.assertContains(response, '<mark>Hugo</mark>')
+        self.assertContains(response, '&lt;b&gt;absolu&lt;/b&gt;')
+        self.assertEqual(self.search(q='miser')[1], [
+            ('TICKET', self.ticket.id)
+        ])
+        self.assertEqual(self.search(q='hugo', network='1')[1], [
+            ('TICKET', self.ticket.id)
+        ])
+
+        # Pagination par curseur, une page par résultat
+        first = search_posts('hugo', self.alice, page_size=1)
+        second = search_posts(
+            'hugo', self.alice, page_size=1,
+            cursor=decode_search_cursor(first['next_cursor'])
+        )
+        self.assertEqual(
+            [first['posts'][0].id, second['posts'][0].id],
+            [self.ticket.id, self.review.id]
+        )
+        self.assertIsNone(second['next_cursor'])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.ticket.title = "Notre-Dame de Paris"
+        self.ticket.save()
+        self.assertEqual(self.search(q='paris')[1], [
+            ('TICKET', self.ticket.id)
+        ])
+        self.assertEqual(self.search(q='misérables')[1], [])
+
+        self.ticket.delete()
+        self.assertEqual(self.search(q='hugo')[1], [])
+
+
+class FeedApiTests(TestCase):
+    """API JSON du flux : mêmes posts et curseurs que la vue HTML."""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice')
+        bob = User.objects.create_user('bob')
+        UserFollows.objects.create(user=self.alice, followed_user=bob)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                ticket = Ticket.objects.create(user=bob, title=f"Livre {i}")
+            Review.objects.create(
+                ticket=ticket, user=self.alice, rating=4, headline="Bien"
+            )
+        self.client.force_login(self.alice)
+
+    def get(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        body = b''.join(response.streaming_content)
+        return json.loads(body)
+
+    def test_api_feed_matches_html_feed(self):
+        html = self.client.get(reverse('feed'))
+        page = self.get('api_feed', limit=20)
+        self.assertEqual(
+            [(post['type'], post['id']) for post in page['results']],
+            [(post.content_type, post.id) for post in html.context['posts']]
+        )
+        review = page['results'][0]
+        self.assertEqual(
+            (review['user'], review['rating'], review['ticket_title']),
+            ('alice', 4, "Livre 4")
+        )
+
+        # Pages de deux posts et champs réduits
+        first = self.get('api_feed', limit=2, fields='title,headline')
+        second = self.get('api_feed', limit=2, after=first['next'])
+        self.assertEqual(first['results'][0], {
+            'type': 'REVIEW', 'id': review['id'], 'headline': "Bien"
+        })
+        self.assertEqual(
+            [post['id'] for post in second['results']],
+            [post['id'] for post in page['results'][2:4]]
+        )
+        back = self.get('api_feed', limit=2, before=second['previous'])
+        self.assertEqual(
+            [post['id'] for post in back['results']],
+            [post['id'] for post in page['results'][:2]]
+        )
+
+    def test_api_rejects_invalid_parameters_and_anonymous(self):
+        response = self.client.get(reverse('api_posts'), {'fields': 'x'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('api_posts'), {'limit': '0'})
+        self.assertEqual(response.status_code, 400)
+        self.client.logout()
+        self.assertEqual(
+            self.client.get(reverse('api_feed')).status_code, 401
+        )
+
+
+class ExportTests(TestCase):
+    """Export en flux des billets et critiques de l'utilisateur."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.settings_override = self.settings(MEDIA_ROOT=self.media.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.alice = User.objects.create_user('alice')
+        bob = User.objects.create_user('bob')
+        self.ticket = Ticket.objects.create(user=self.alice, title="Livre")
+        other = Ticket.objects.create(user=bob, title="Autre, \"cité\"")
+        Review.objects.create(
+            ticket=other, user=self.alice, rating=4, headline="Bien"
+        )
+        self.client.force_login(self.alice)
+
+    def export(self, export_format):
+        response = self.client.get(
+            reverse('export_posts'), {'format': export_format}
+        )
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        return b''.join(response.streaming_content)
+
+    def test_csv_and_jsonl_exports(self):
+        rows = list(csv.DictReader(
+            io.StringIO(self.export('csv').decode())
+        ))
+        self.assertEqual(
+            [(row['type'], row['title']) for row in rows],
+            [('TICKET', "Livre"), ('REVIEW', "Bien")]
+        )
+        self.assertEqual(rows[1]['ticket_title'], "Autre, \"cité\"")
+
+        lines = self.export('jsonl').decode().splitlines()
+        self.assertEqual(json.loads(lines[1])['rating'], 4)
+        self.assertEqual(
+            self.client.get(reverse('export_posts'), {'format': 'x'})
+            .status_code, 400
+        )
+
+    def test_zip_export_includes_images(self):
+        os.makedirs(os.path.join(self.media.name, 'tickets'))
+        with open(
+            os.path.join(self.media.name, 'tickets', 'livre.jpg'), 'wb'
+        ) as image:
+            image.write(b'\xff\xd8' + os.urandom(200000))
+        Ticket.objects.filter(pk=self.ticket.pk).update(
+            image='tickets/livre.jpg'
+        )
+
+        archive = zipfile.ZipFile(io.BytesIO(self.export('zip')))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(
+            archive.namelist(), ['posts.jsonl', 'images/tickets/livre.jpg']
+        )
+        self.assertEqual(
+            archive.getinfo('images/tickets/livre.jpg').file_size, 200002
+        )
+
+
+class ImportPostsTests(TestCase):
+    """Import en masse par paquets, avec reprise après erreur."""
+
+    ROWS = [
+        {'type': 'ticket', 'id': 't1', 'user': 'alice', 'title': "Livre",
+         'time_created': '2020-01-02T03:04:05'},
+        {'type': 'ticket', 'id': 0, 'user': 'bob', 'title': "Autre"},
+        {'type': 'review', 'ticket': 't1', 'user': 'bob', 'rating': 4,
+         'title': "Bien", 'body': "Très bien"},
+        {'type': 'review', 'ticket': 0, 'user': 'alice', 'rating': 9,
+         'title': "Note invalide"},
+        {'type': 'follow', 'user': 'alice', 'followed_user': 'bob'},
+        {'type': 'follow', 'user': 'alice', 'followed_user': 'bob'},
+        {'type': 'review', 'ticket': 0, 'user': 'alice', 'rating': 2,
+         'title': "Bof"},
+        {'type': 'ticket', 'user': 'bob', 'title': "Sans identifiant"},
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'posts.jsonl')
+        with open(self.path, 'w', encoding='utf-8') as source:
+            for row in self.ROWS:
+                source.write(json.dumps(row) + '\n')
+
+    def run_import(self, **options):
+        stdout = io.StringIO()
+        call_command(
+            'import_posts', self.path, chunk_size=2, create_users=True,
+            stdout=stdout, stderr=io.StringIO(), **options
+        )
+        return stdout.getvalue()
+
+    def test_import_resumes_after_failure(self):
+        original = Importer.import_chunk
+        calls = []
+
+        def failing(importer, records):
+            calls.append(records)
+            if len(calls) == 3:
+                raise RuntimeError("panne")
+            return original(importer, records)
+
+        with mock.patch.object(Importer, 'import_chunk', failing):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        self.assertTrue(os.path.exists(self.path + '.checkpoint'))
+        self.assertEqual(Ticket.objects.count(), 2)
+
+        self.run_import()
+        self.assertFalse(os.path.exists(self.path + '.checkpoint'))
+
+        alice = User.objects.get(username='alice')
+        ticket = Ticket.objects.get(title="Livre")
+        self.assertEqual(ticket.user, alice)
+        self.assertEqual(ticket.time_created.year, 2020)
+        self.assertEqual(ticket.average_rating, 4)
+        self.assertEqual(
+            sorted(Review.objects.values_list('headline', flat=True)),
+            ["Bien", "Bof"]
+        )
+        self.assertEqual(alice.following.count(), 1)
+        alice.refresh_from_db()
+        self.assertEqual((alice.tickets_count, alice.following_count), (1, 1))
+        self.assertTrue(FeedEntry.objects.filter(owner=alice).exists())
+
+        # Rejouer le fichier ne duplique pas les billets déjà importés
+        output = self.run_import(restart=True)
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(Review.objects.count(), 2)
+        self.assertIn(
+            "0 billets, 0 critiques, 0 abonnements, 2 billets déjà "
+            "importés, 4 doublons ignorés, 2 lignes rejetées", output
+        )
+
+    def test_import_refreshes_only_touched_rows(self):
+        carol = User.objects.create_user('carol')
+        User.objects.filter(pk=carol.pk).update(tickets_count=7)
+
+        output = self.run_import()
+        self.assertIn(
+            "2 billets, 2 critiques, 1 abonnements, 0 billets déjà "
+            "importés, 1 doublons ignorés, 2 lignes rejetées", output
+        )
+        # Les compteurs des utilisateurs absents du fichier ne sont pas
+        # recalculés
+        carol.refresh_from_db()
+        self.assertEqual(carol.tickets_count, 7)
+        self.assertEqual(recount(fix=False)['user.tickets_count'], 1)
+        self.assertEqual(
+            AuthorAffinity.objects.get(viewer__username='bob').interactions,
+            1
+        )
+        # Flux remplis paquet par paquet, comme par une reconstruction
+        entries = set(FeedEntry.objects.values_list(
+            'owner_id', 'post_type', 'post_id'
+        ))
+        rebuild_feeds()
+        self.assertEqual(set(FeedEntry.objects.values_list(
+            'owner_id', 'post_type', 'post_id'
+        )), entries)
+
+    @uncached_auth
+    def test_import_invalidates_feed_pages_and_cards(self):
+        cache.clear()
+        alice = User.objects.create_user('alice')
+        bob = User.objects.create_user('bob')
+        UserFollows.objects.create(user=alice, followed_user=bob)
+        self.client.force_login(alice)
+        url = reverse('feed')
+        etag = self.client.get(url)['ETag']
+
+        with open(self.path, 'w', encoding='utf-8') as source:
+            source.write(json.dumps({
+                'type': 'ticket', 'id': 'vieux', 'user': 'bob',
+                'title': "Billet importé", 'time_created': '2001-01-01',
+            }) + '\n')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import()
+        # Billet antidaté : seule la génération du flux change
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Billet importé")
+
+        ticket = Ticket.objects.get(title="Billet importé")
+        with open(self.path, 'w', encoding='utf-8') as source:
+            source.write(json.dumps({
+                'type': 'review', 'ticket': 'vieux', 'user': 'alice',
+                'rating': 5, 'title': "Importée",
+            }) + '\n')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import(restart=True)
+        # Les compteurs corrigés renouvellent la clé du cache des cartes
+        updated = ticket.updated
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.review_count, 1)
+        self.assertGreater(ticket.updated, updated)
+
+
+class StaticFilesTests(TestCase):
+    """Fichiers statiques à empreinte, précompressés et servis par WSGI."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        override = self.settings(STATIC_ROOT=self.root, STORAGES={
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': (
+                'litrevu.staticfiles.CompressedManifestStaticFilesStorage'
+            )},
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.app = StaticFilesApplication(
+            lambda environ, start_response: [b'django']
+        )
+
+    def get(self, path, **headers):
+        response = {}
+
+        def start_response(status, response_headers):
+            response['status'] = status
+            response['headers'] = dict(response_headers)
+
+        body = b''.join(self.app({
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **headers
+        }, start_response))
+        return response.get('status'), response.get('headers'), body
+
+    def test_hashed_files_are_compressed_and_cached_forever(self):
+        url = staticfiles_storage.url('css/base.css')
+        self.assertRegex(url, r'^/static/css/base\.[0-9a-f]{12}\.css$')
+
+        status, headers, body = self.get(
+            url, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', headers['Cache-Control'])
+        with open(os.path.join(self.root, 'css', 'base.css'), 'rb') as css:
+            self.assertEqual(gzip.decompress(body), css.read())
+
+        status, headers, body = self.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', headers)
+        status, _, body = self.get(url, HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+
+        # Nom sans empreinte : cache court ; autres chemins : Django
+        _, headers, _ = self.get('/static/css/base.css')
+        self.assertNotIn('immutable', headers['Cache-Control'])
+        self.assertEqual(self.get('/feed/')[2], b'django')
+
+
+class ImageVariantTests(TestCase):
+    """Variantes WebP des images, srcset et suppression avec l'image."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.bob = User.objects.create_user('bob')
+
+    def upload(self, width, name='cover.png'):
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, width // 2), 'red').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def variant_widths(self, fieldfile):
+        widths = {}
+        for width in (160, 320, 640):
+            name = variant_name(fieldfile.name, width)
+            if fieldfile.storage.exists(name):
+                with Image.open(fieldfile.storage.path(name)) as variant:
+                    self.assertEqual(variant.format, 'WEBP')
+                    widths[width] = variant.width
+        return widths
+
+    def render(self, ticket):
+        return Template(
+            '{% load responsive_images %}'
+            '{% responsive_image ticket.image True "Couverture" '
+            'width=ticket.image_width %}'
+        ).render(Context({'ticket': ticket}))
+
+    def test_variants_and_srcset(self):
+        ticket = Ticket.objects.create(
+            user=self.bob, title="Livre", image=self.upload(1000)
+        )
+        self.assertEqual(build_variants(ticket.image), 1000)
+        self.assertEqual(
+            self.variant_widths(ticket.image), {160: 160, 320: 320, 640: 640}
+        )
+        ticket.image_width = 1000
+        html = self.render(ticket)
+        self.assertIn('srcset="', html)
+        self.assertIn('_640w.webp 640w"', html)
+        self.assertIn('sizes="150px"', html)
+        self.assertIn('loading="lazy"', html)
+
+        # Image étroite : pas d'agrandissement ni de largeur annoncée fausse
+        narrow = Ticket.objects.create(
+            user=self.bob, title="Étroit", image=self.upload(200, 'n.png')
+        )
+        narrow.image_width = build_variants(narrow.image)
+        self.assertEqual(
+            self.variant_widths(narrow.image), {160: 160, 320: 200}
+        )
+        html = self.render(narrow)
+        self.assertIn('_160w.webp 160w, ', html)
+        self.assertIn('_320w.webp 200w"', html)
+        self.assertNotIn('640w', html)
+
+    def test_variants_deleted_with_image(self):
+        ticket = Ticket.objects.create(
+            user=self.bob, title="Livre", image=self.upload(400)
+        )
+        build_variants(ticket.image)
+        old = Ticket.objects.get(pk=ticket.pk).image
+        self.assertEqual(len(self.variant_widths(old)), 3)
+
+        ticket = Ticket.objects.get(pk=ticket.pk)
+        ticket.image = self.upload(400, 'new.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.save()
+        self.assertEqual(self.variant_widths(old), {})
+
+        build_variants(ticket.image)
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+        self.assertEqual(self.variant_widths(ticket.image), {})
+
+
+class MediaTests(TestCase):
+    """Service des fichiers media : Range, ETag et X-Accel-Redirect."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        os.mkdir(os.path.join(media.name, 'tickets'))
+        self.data = bytes(range(256)) * 40
+        with open(os.path.join(media.name, 'tickets', 'a.png'), 'wb') as f:
+            f.write(self.data)
+        self.url = '/media/tickets/a.png'
+
+    def test_full_range_and_conditional_requests(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['Content-Length'], str(len(self.data)))
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            response['Content-Range'], f'bytes 100-199/{len(self.data)}'
+        )
+        self.assertEqual(
+            b''.join(response.streaming_content), self.data[100:200]
+        )
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.data[-10:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=99999-')
+        self.assertEqual(response.status_code, 416)
+        # If-Range périmé : fichier entier
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"ancien"'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(
+            self.client.get('/media/../settings.py').status_code, 404
+        )
+        self.assertEqual(self.client.get('/media/tickets/').status_code, 404)
+
+    def test_transfer_handed_to_front_server(self):
+        with self.settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/tickets/a.png'
+        )
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response.content, b'')
+
+        with self.settings(MEDIA_SENDFILE_HEADER='X-Sendfile'):
+            response = self.client.get(self.url)
+        self.assertTrue(response['X-Sendfile'].endswith('a.png'))
+        self.assertTrue(os.path.isabs(response['X-Sendfile']))
+
+
+class AdminChangelistTests(TestCase):
+    """Listes de l'administration : recherche FTS, filtres, décompte."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', password='x')
+        self.bob = User.objects.create_user('bob')
+        self.carol = User.objects.create_user('carol')
+        UserFollows.objects.create(user=self.bob, followed_user=self.carol)
+        self.hugo = Ticket.objects.create(
+            user=self.bob, title="Les Misérables", description="Hugo"
+        )
+        Ticket.objects.create(user=self.carol, title="Germinal")
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, **params):
+        response = self.client.get(
+            reverse(f'admin:reviews_{model}_changelist'), params
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_depend_on_rows(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.changelist('review')
+            return len(captured)
+
+        Review.objects.create(
+            ticket=self.hugo, user=self.carol, rating=4, headline="Beau"
+        )
+        # Première requête : session et utilisateur mis en cache
+        queries()
+        first = queries()
+        for ticket in Ticket.objects.all():
+            Review.objects.create(
+                ticket=ticket, user=self.admin, rating=3, headline="Bien"
+            )
+        self.assertEqual(queries(), first)
+
+    def test_search_and_autocomplete_filters(self):
+        response = self.changelist('ticket', q='hugo')
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.hugo]
+        )
+        response = self.changelist(
+            'ticket', user__id__exact=self.carol.id
+        )
+        self.assertEqual(
+            [t.title for t in response.context['cl'].result_list],
+            ['Germinal']
+        )
+        self.assertContains(response, 'data-parameter="user__id__exact"')
+        self.assertContains(response, 'admin-autocomplete')
+
+        response = self.changelist('userfollows', q='CAR')
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'reviews', 'model_name': 'ticket',
+            'field_name': 'user', 'term': 'Bo',
+        })
+        self.assertEqual(
+            [user['text'] for user in response.json()['results']], ['bob']
+        )
+
+    def test_large_counts_are_estimated(self):
+        with mock.patch('litrevu.changelists.ADMIN_COUNT_LIMIT', 1):
+            paginator = EstimatedCountPaginator(Ticket.objects.all(), 10)
+            self.assertEqual(paginator.count, Ticket.objects.latest('pk').pk)
+            paginator = EstimatedCountPaginator(
+                Ticket.objects.filter(title__startswith=''), 10
+            )
+            self.assertEqual(paginator.count, 1)
+        self.assertEqual(
+            EstimatedCountPaginator(Ticket.objects.all(), 10).count, 2
+        )
@@ -7,7 +7,23 @@ from . import views
 urlpatterns = [
     # Flux principal
     path('feed/', views.feed, name='feed'),
+    path('feed/more/', views.feed_more, name='feed_more'),
+    path('feed/top/', views.feed_top, name='feed_top'),
+    path('feed/top/more/', views.feed_top_more, name='feed_top_more'),
     path('posts/', views.user_posts, name='user_posts'),
+    path('posts/export/', views.export_posts, name='export_posts'),
+    path(
+        'feed/cache-stats/',
+        views.feed_cache_stats,
+        name='feed_cache_stats'
+    ),
+
+    # API JSON
+    path('api/feed/', views.api_feed, name='api_feed'),
+    path('api/posts/', views.api_posts, name='api_posts'),
+
+    # Recherche
+    path('search/', views.search, name='search'),
 
     # Tickets
     path('ticket/create/', views.create_ticket, name='create_ticket'),
@@ -46,6 +62,7 @@ urlpatterns = [
 
     # Follows
     path('follows/', views.follows, name='follows'),
+    path('follows/search/', views.user_search, name='user_search'),
     path(
         'unfollow/<int:user_id>/',
         views.unfollow_user,
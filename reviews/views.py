@@ -1,22 +1,98 @@
 """
 Vues pour les billets, critiques et abonnements.
 """
-from itertools import chain
-
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib import messages
-from django.db.models import Q
+from django.core.paginator import Paginator
+from django.http import (
+    HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+)
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+from authentication.models import username_prefix_filter
 
-from .models import Ticket, Review, UserFollows
+from .models import Ticket, Review, UserFollows, FeedEntry
 from .forms import TicketForm, ReviewForm, FollowUserForm
+from .api import api_login_required, page_response
+from .export import EXPORT_FORMATS, csv_lines, jsonl_lines, zip_chunks
+from .feed import (
+    FEED_FIRST_PAGE_SIZE, FEED_PAGE_SIZE, page_from_request,
+    cursor_from_request, entry_rows, union_rows, load_posts
+)
+from .ranking import ranked_posts
+from .cache import cached_page, cache_stats, conditional_page
+from .search import search_posts, decode_cursor as decode_search_cursor
 
 
 User = get_user_model()
 
 
+def _newest(queryset):
+    # Une seule ligne lue dans l'index (utilisateur, -time_created)
+    return queryset.order_by('-time_created').values_list(
+        'time_created', flat=True
+    ).first()
+
+
+def _feed_newest(user):
+    return _newest(FeedEntry.objects.filter(owner=user))
+
+
+def _user_posts_newest(user):
+    dates = [
+        date for date in (
+            _newest(Ticket.objects.filter(user=user)),
+            _newest(Review.objects.filter(user=user)),
+        ) if date
+    ]
+    return max(dates, default=None)
+
+
+def _feed_querysets():
+    # has_review et average_rating viennent des compteurs du billet
+    tickets = Ticket.objects.select_related('user')
+    reviews = Review.objects.select_related(
+        'user', 'ticket', 'ticket__user'
+    )
+    return tickets, reviews
+
+
+def _feed_page(request):
+    """
+    Page du flux de l'utilisateur à la position demandée (after/before).
+    La première page est courte : le reste se charge au défilement.
+    """
+    user = request.user
+
+    def build_page():
+        # Le flux matérialisé contient déjà, pour cet utilisateur, les posts
+        # visibles (ses posts, ceux des utilisateurs suivis et les critiques
+        # en réponse à ses billets) : il suffit d'en lire une page.
+        entries = FeedEntry.objects.filter(owner=user)
+        tickets, reviews = _feed_querysets()
+
+        cursor, _ = cursor_from_request(request)
+        page = page_from_request(
+            request, tickets, reviews, entries=entries,
+            page_size=FEED_PAGE_SIZE if cursor else FEED_FIRST_PAGE_SIZE
+        )
+
+        # Marquer chaque post si l'utilisateur en est l'auteur
+        for post in page['posts']:
+            post.is_own = post.user_id == user.id
+        return page
+
+    # Tant que la génération du flux de l'utilisateur ne change pas, la
+    # page est servie depuis le cache sans lire les billets ni critiques.
+    return cached_page(request, 'feed', build_page)
+
+
 @login_required
+@conditional_page('feed', _feed_newest)
 def feed(request):
     """
     Affiche le flux principal de l'utilisateur.
@@ -24,67 +100,164 @@ def feed(request):
     ses propres billets et critiques, et les critiques en réponse
     à ses billets.
     """
-    user = request.user
+    return render(request, 'reviews/feed.html', _feed_page(request))
 
-    # Récupérer les utilisateurs suivis
-    followed_users = UserFollows.objects.filter(
-        user=user
-    ).values_list('followed_user', flat=True)
 
-    # Billets visibles :
-    # - billets de l'utilisateur connecté
-    # - billets des utilisateurs suivis
-    tickets = Ticket.objects.filter(
-        Q(user=user) | Q(user__in=followed_users)
-    )
+@login_required
+@conditional_page('feed_more', _feed_newest)
+def feed_more(request):
+    """
+    Cartes de la page du flux suivant le curseur, sans la mise en page du
+    site : fragment HTML chargé par le défilement infini.
+    """
+    return render(request, 'reviews/feed_cards.html', _feed_page(request))
 
-    # Critiques visibles :
-    # - critiques de l'utilisateur connecté
-    # - critiques des utilisateurs suivis
-    # - critiques en réponse aux billets de l'utilisateur connecté
-    reviews = Review.objects.filter(
-        Q(user=user) |
-        Q(user__in=followed_users) |
-        Q(ticket__user=user)
-    )
 
-    # Combiner et trier par date de création (antéchronologique)
-    posts = sorted(
-        chain(tickets, reviews),
-        key=lambda post: post.time_created,
-        reverse=True
-    )
+def _top_page(request):
+    """
+    Page du flux « À la une » (paramètre page) : posts récents classés par
+    score (voir reviews/ranking.py).
+    """
+    user = request.user
+
+    def build_page():
+        page = Paginator(ranked_posts(user.id), FEED_PAGE_SIZE).get_page(
+            request.GET.get('page')
+        )
+        posts = load_posts(page.object_list, *_feed_querysets())
+        for post in posts:
+            post.is_own = post.user_id == user.id
+        return {
+            'posts': posts,
+            'ranked': True,
+            'next_page': (
+                page.next_page_number() if page.has_next() else None
+            ),
+            'previous_page': (
+                page.previous_page_number() if page.has_previous() else None
+            ),
+        }
+
+    return cached_page(request, 'feed_top', build_page)
 
-    # Marquer chaque post avec son type et si l'utilisateur en est l'auteur
-    for post in posts:
-        post.content_type = 'REVIEW' if isinstance(post, Review) else 'TICKET'
-        post.is_own = post.user == user
-        if post.content_type == 'TICKET':
-            # Vérifier si ce billet a déjà une critique
-            post.has_review = Review.objects.filter(ticket=post).exists()
 
-    return render(request, 'reviews/feed.html', {'posts': posts})
+@login_required
+def feed_top(request):
+    """
+    Affiche le flux « À la une » : les mêmes posts que le flux principal,
+    classés par récence, note, nombre de critiques et affinité avec
+    l'auteur.
+    """
+    return render(request, 'reviews/feed.html', _top_page(request))
+
+
+@login_required
+def feed_top_more(request):
+    """Cartes de la page suivante du flux « À la une » (défilement)."""
+    return render(request, 'reviews/feed_cards.html', _top_page(request))
 
 
 @login_required
+@conditional_page('user_posts', _user_posts_newest)
 def user_posts(request):
     """Affiche les billets et critiques de l'utilisateur connecté."""
     user = request.user
 
-    tickets = Ticket.objects.filter(user=user)
-    reviews = Review.objects.filter(user=user)
+    def build_page():
+        tickets = Ticket.objects.filter(user=user)
+        reviews = Review.objects.filter(user=user).select_related('ticket')
 
-    posts = sorted(
-        chain(tickets, reviews),
-        key=lambda post: post.time_created,
-        reverse=True
+        page = page_from_request(request, tickets, reviews)
+
+        for post in page['posts']:
+            post.is_own = True
+        return page
+
+    page = cached_page(request, 'user_posts', build_page)
+
+    return render(request, 'reviews/user_posts.html', page)
+
+
+@staff_member_required
+def feed_cache_stats(request):
+    """Expose les compteurs de succès/échecs du cache des flux."""
+    return JsonResponse(cache_stats())
+
+
+# ============== API ==============
+
+@api_login_required
+def api_feed(request):
+    """Flux de l'utilisateur au format JSON (mêmes posts que feed)."""
+    cursor, backward = cursor_from_request(request)
+    rows = entry_rows(
+        FeedEntry.objects.filter(owner=request.user), cursor, backward
+    )
+    return page_response(request, rows, cursor, backward)
+
+
+@api_login_required
+def api_posts(request):
+    """Billets et critiques de l'utilisateur au format JSON."""
+    cursor, backward = cursor_from_request(request)
+    rows = union_rows(
+        Ticket.objects.filter(user=request.user),
+        Review.objects.filter(user=request.user),
+        cursor, backward
+    )
+    return page_response(request, rows, cursor, backward)
+
+
+# ============== EXPORT ==============
+
+@login_required
+def export_posts(request):
+    """
+    Télécharge les billets et critiques de l'utilisateur en CSV, en JSON
+    Lines ou en archive ZIP avec les images, produits au fil de l'envoi.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Format d'export inconnu.")
+
+    user = request.user
+    if export_format == 'zip':
+        content, content_type = zip_chunks(user), 'application/zip'
+    elif export_format == 'jsonl':
+        content = jsonl_lines(user)
+        content_type = 'application/x-ndjson; charset=utf-8'
+    else:
+        content, content_type = csv_lines(user), 'text/csv; charset=utf-8'
+
+    filename = 'litrevu-{}-{}.{}'.format(
+        user.username, timezone.localdate().isoformat(), export_format
     )
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = content_disposition_header(
+        True, filename
+    )
+    return response
+
 
-    for post in posts:
-        post.content_type = 'REVIEW' if isinstance(post, Review) else 'TICKET'
-        post.is_own = True
+# ============== RECHERCHE ==============
 
-    return render(request, 'reviews/user_posts.html', {'posts': posts})
+@login_required
+def search(request):
+    """
+    Recherche plein texte dans les billets et critiques, éventuellement
+    limitée aux posts de l'utilisateur et des comptes qu'il suit.
+    """
+    query = request.GET.get('q', '').strip()
+    network = request.GET.get('network') == '1'
+    page = search_posts(
+        query, request.user, network=network,
+        cursor=decode_search_cursor(request.GET.get('after'))
+    )
+    return render(request, 'reviews/search.html', {
+        'query': query,
+        'network': network,
+        **page,
+    })
 
 
 # ============== TICKETS ==============
@@ -273,8 +446,9 @@ def follows(request):
         form = FollowUserForm(request.POST, current_user=user)
         if form.is_valid():
             username = form.cleaned_data['username']
-            user_to_follow = User.objects.get(username=username)
-            UserFollows.objects.create(user=user, followed_user=user_to_follow)
+            UserFollows.objects.create(
+                user=user, followed_user=form.user_to_follow
+            )
             messages.success(
                 request,
                 f"Vous suivez maintenant {username}."
@@ -284,10 +458,14 @@ def follows(request):
         form = FollowUserForm(current_user=user)
 
     # Utilisateurs que je suis
-    following = UserFollows.objects.filter(user=user)
+    following = UserFollows.objects.filter(user=user).select_related(
+        'followed_user'
+    )
 
     # Utilisateurs qui me suivent
-    followers = UserFollows.objects.filter(followed_user=user)
+    followers = UserFollows.objects.filter(
+        followed_user=user
+    ).select_related('user')
 
     return render(request, 'reviews/follows.html', {
         'form': form,
@@ -317,3 +495,36 @@ def unfollow_user(request, user_id):
     return render(request, 'reviews/unfollow_confirm.html', {
         'user_to_unfollow': user_to_unfollow
     })
+
+
+# Nombre de suggestions renvoyées par défaut et au maximum
+USER_SEARCH_LIMIT = 10
+USER_SEARCH_MAX_LIMIT = 20
+
+
+@login_required
+def user_search(request):
+    """
+    Suggestions d'utilisateurs à suivre dont le nom commence par q (sans
+    tenir compte de la casse), au format JSON. L'utilisateur connecté et
+    les comptes qu'il suit déjà sont exclus.
+    """
+    prefix = request.GET.get('q', '').strip()
+    try:
+        limit = int(request.GET.get('limit', USER_SEARCH_LIMIT))
+    except ValueError:
+        limit = USER_SEARCH_LIMIT
+    limit = max(1, min(limit, USER_SEARCH_MAX_LIMIT))
+    if not prefix:
+        return JsonResponse({'results': []})
+
+    # Parcours de l'index des noms sans casse, jusqu'à limit résultats
+    users = User.objects.filter(
+        **username_prefix_filter(prefix), is_active=True
+    ).exclude(id=request.user.id).exclude(
+        id__in=UserFollows.objects.filter(
+            user=request.user
+        ).values('followed_user')
+    ).order_by('username_folded').values('id', 'username')[:limit]
+
+    return JsonResponse({'results': list(users)})
@@ -15,6 +15,12 @@ REM Installer les dépendances
 echo Installation des dépendances...
 pip install -r requirements.txt
 
+REM Générer la clé secrète de développement si elle n'existe pas
+IF NOT EXIST "key.txt" (
+	echo Génération de la clé secrète key.txt...
+	python -c "from django.core.management.utils import get_random_secret_key; print(get_random_secret_key())" > key.txt
+)
+
 REM Appliquer les migrations
 echo Application des migrations...
 set DJANGO_ENV=local
@@ -25,6 +31,15 @@ echo Remplissage des données de test...
 set DJANGO_ENV=local
 python manage.py populate_db
 
+REM Reconstruire les flux matérialisés des données existantes
+echo Reconstruction des flux...
+set DJANGO_ENV=local
+python manage.py rebuild_feed
+
+REM Lancer le worker des tâches d'arrière-plan dans une autre fenêtre
+echo Démarrage du worker des tâches d'arrière-plan...
+start "LITRevu worker" cmd /c "set DJANGO_ENV=local&& python manage.py run_worker"
+
 REM Lancer le serveur Django
 echo Démarrage du serveur de développement Django sur le port 8001...
 set DJANGO_ENV=local
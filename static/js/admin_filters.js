@@ -0,0 +1,17 @@
+// Filtres par autocomplétion de l'administration : recharger la liste avec
+// la valeur choisie (select2 déclenche l'événement change de jQuery)
+(function () {
+    if (!window.django || !django.jQuery) {
+        return;
+    }
+    django.jQuery(function ($) {
+        $('.autocomplete-filter select').on('change', function () {
+            var filter = this.closest('.autocomplete-filter');
+            var params = new URLSearchParams(filter.dataset.queryString);
+            if (this.value) {
+                params.set(filter.dataset.parameter, this.value);
+            }
+            window.location.search = params.toString();
+        });
+    });
+})();
@@ -0,0 +1,58 @@
+// Défilement infini du flux : la page suivante est chargée quand son
+// repère approche du bas de l'écran
+(function () {
+    var container = document.querySelector('.feed-posts');
+    if (!container || !('IntersectionObserver' in window)) {
+        return;
+    }
+
+    // Sans JavaScript, les liens de pagination restent disponibles
+    var pagination = document.querySelector('.pagination');
+    if (pagination) {
+        pagination.hidden = true;
+    }
+
+    var loading = false;
+    var observer = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (entry.isIntersecting && !loading) {
+                load(entry.target);
+            }
+        });
+    }, {rootMargin: '600px'});
+
+    function watch() {
+        var marker = container.querySelector('.feed-more');
+        if (marker) {
+            observer.observe(marker);
+        }
+    }
+
+    function load(marker) {
+        loading = true;
+        observer.unobserve(marker);
+        fetch(marker.dataset.url, {credentials: 'same-origin'})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.text();
+            })
+            .then(function (html) {
+                var fragment = document.createElement('template');
+                fragment.innerHTML = html;
+                marker.replaceWith(fragment.content);
+                loading = false;
+                watch();
+            })
+            .catch(function () {
+                // En cas d'erreur, revenir à la pagination classique
+                loading = false;
+                if (pagination) {
+                    pagination.hidden = false;
+                }
+            });
+    }
+
+    watch();
+})();
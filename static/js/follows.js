@@ -0,0 +1,46 @@
+// Suggestions de noms d'utilisateurs pour le formulaire d'abonnement
+(function () {
+    var input = document.getElementById('id_username');
+    var list = document.getElementById('username-suggestions');
+    if (!input || !list || !input.dataset.searchUrl) {
+        return;
+    }
+
+    var timer = null;
+    var controller = null;
+
+    function fill(results) {
+        list.replaceChildren();
+        results.forEach(function (user) {
+            var option = document.createElement('option');
+            option.value = user.username;
+            list.appendChild(option);
+        });
+    }
+
+    function search() {
+        var query = input.value.trim();
+        if (controller) {
+            controller.abort();
+        }
+        if (!query) {
+            fill([]);
+            return;
+        }
+        controller = new AbortController();
+        var url = input.dataset.searchUrl + '?q=' + encodeURIComponent(query);
+        fetch(url, {
+            credentials: 'same-origin',
+            signal: controller.signal
+        })
+            .then(function (response) { return response.json(); })
+            .then(function (data) { fill(data.results); })
+            .catch(function () {});
+    }
+
+    // Une requête par pause de frappe plutôt qu'une par touche
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        timer = setTimeout(search, 150);
+    });
+})();